@@ -23,7 +23,9 @@
 #       refer to them.
 #   3) Generate all possible win states for a Tic-Tac-Toe board and store these in a hash. We use the board's hash value
 #       to check if the board is a win state.
-#   *) All the above are stored in pickle files and loaded in during start-up.
+#   *) All the above are stored as numpy tables in tables/ and memory-mapped during start-up, so processes share them.
+#       Each file has a header with a format version, a fingerprint of its parameters and a checksum, and is rebuilt
+#       when any of them does not match.
 #
 # These optimisation enabled our AI to reach depth 7 with < 1 second per call to our alpha beta search function.
 #
@@ -34,15 +36,39 @@
 #   2)  We avoid using loops, preferring list comprehensions or better yet, built-ins. Anything that does involve loops
 #       has been cached.
 
+import time
+
+# Time the agent was launched at, for the startup report
+LAUNCHED = time.perf_counter()
+
+import argparse
 import gc
 import socket
 import sys
 from math import ceil
 import numpy as np
-from player.AlphaBeta import AlphaBeta
+from player.AlphaBeta import AlphaBeta, ALGORITHMS, gc_paused
 from player.Heuristic import Heuristic
 from player.Game import Game
 from player.GameTreeNode import GameTreeNode
+from player.MCTS import MCTS
+from player.MoveOrdering import MoveOrdering
+from player.OpeningBook import OpeningBook
+from player.ParallelSearch import ParallelSearch
+from player.Ponder import Ponder
+from player.SearchState import MAX_PLIES
+from player.Solver import Solver
+from player.TableCache import TableCache
+from player.TranspositionTable import TranspositionTable
+
+# Depth of the alpha beta search without a time limit
+DEFAULT_DEPTH = 7
+
+# Search engines the agent can be started with
+ENGINES = ('alphabeta', 'mcts')
+
+# Share of the time limit of a move the endgame solver may use before the search gets the rest
+SOLVER_TIME_SHARE = 0.5
 
 
 class Agent:
@@ -51,13 +77,71 @@ class Agent:
     Attributes:
         game (Game): Game class instance.
         heuristic (Heuristic): Heuristic class instance.
+        depth (int, optional): Depth of the alpha beta search, DEFAULT_DEPTH if not set. Maximum depth when a time limit
+            is set, in which case it defaults to MAX_PLIES so that the search deepens until the time runs out.
+        time_limit (float, optional): Seconds per move. Uses iterative deepening when set.
+        tt_size_mb (int): Memory cap of the transposition table kept between moves.
+        workers (int): Number of processes for the root-parallel search. 1 searches in this process. Ignored when
+            time_limit is set, as the timed search runs in this process.
+        ponder (bool): Search the opponent's most likely reply while they are thinking.
+        engine (str): 'alphabeta' or 'mcts'. MCTS uses time_limit (1 second if not set) per move.
+        endgame_empty_cells (int): The exact solver is tried once at most this many cells are empty. 0 disables it.
+            After a failed attempt it is not tried again until the next game.
+        solver_node_limit (int): Nodes the solver may visit before the agent falls back to the normal search. With a
+            time limit the solver also gives up after SOLVER_TIME_SHARE of it, and the search gets what is left.
+        extension_plies (int): Plies the alpha beta search may look past depth along forcing lines.
+        algorithm (str): Alpha beta search algorithm, one of player.AlphaBeta.ALGORITHMS.
+        lmr_moves (int, optional): Late move reductions after this many moves of a node. None disables them.
+        futility_margin (float, optional): Futility pruning margin of the alpha beta search. None disables it.
+        book (OpeningBook, optional): Opening book that is looked up before searching.
+        reuse_tree (bool): When the opponent plays the reply the last search expected, seed the next search with the
+            rest of its principal variation and its score.
 
     """
 
-    def __init__(self, game: Game, heuristic: Heuristic):
+    def __init__(self, game: Game, heuristic: Heuristic, depth: int = None, time_limit: float = None,
+                 tt_size_mb: int = 32, workers: int = 1, ponder: bool = False, engine: str = 'alphabeta',
+                 endgame_empty_cells: int = 45, solver_node_limit: int = 50000, extension_plies: int = 4,
+                 reuse_tree: bool = False, algorithm: str = 'alphabeta', lmr_moves: int = None,
+                 futility_margin: float = None, book: OpeningBook = None):
+        if engine not in ENGINES:
+            raise ValueError("Unknown engine '{}'. Choose from {}".format(engine, ENGINES))
+        if algorithm not in ALGORITHMS:
+            raise ValueError("Unknown search algorithm '{}'. Choose from {}".format(algorithm, ALGORITHMS))
 
         self._game = game
         self._heuristic = heuristic
+        if depth is None:
+            depth = MAX_PLIES if time_limit is not None else DEFAULT_DEPTH
+        self._depth = depth
+        self._time_limit = time_limit
+        self._tt = TranspositionTable(tt_size_mb)
+        self._ordering = MoveOrdering()
+        self._algorithm = algorithm
+        self._parallel = None
+        if workers > 1:
+            self._parallel = ParallelSearch(workers, algorithm, tt_size_mb, symmetry=True,
+                                            extension_plies=extension_plies, lmr_moves=lmr_moves,
+                                            futility_margin=futility_margin)
+        self._mcts = MCTS(game, heuristic, time_limit or 1.0) if engine == 'mcts' else None
+        self._book = book
+        self._solver = Solver(game, solver_node_limit)
+        self._endgame_empty_cells = endgame_empty_cells
+        self._solver_failed = False
+        self._extension_plies = extension_plies
+        self._lmr_moves = lmr_moves
+        self._futility_margin = futility_margin
+
+        # position expected after our move and the opponent's predicted reply, with the seeds for searching it
+        self._reuse_tree = reuse_tree
+        self._expected = None
+
+        # background search of the position after the predicted opponent reply
+        self._ponder = ponder
+        self._pondering = None
+
+        # the move ordering and transposition table were already aged for the next move, when pondering started
+        self._tables_aged = False
 
         # Global board
         self._boards = np.zeros(shape=(10, 10), dtype='i1')
@@ -72,6 +156,20 @@ class Agent:
         self._games_won = 0
         self._games_drawn = 0
         self._number_moves_made = 0
+        self._ponder_hits = 0
+        self._ponder_misses = 0
+        self._ponder_depth_gained = 0
+        self._solved_moves = 0
+        self._book_moves = 0
+
+        # (position, nodes generated, whether the search was seeded from the previous one) of every alpha beta search
+        self._search_log = []
+
+        # (seconds from receiving a command to sending the reply, seconds of it spent choosing the move) of every reply
+        self._reply_latencies = []
+
+        # seconds the last call to play took
+        self._move_time = 0.0
 
     def set_heuristic_params(self, alpha: int, beta: int, gamma: int, delta: int, win: int, lose: int):
         """ Sets heuristic parameters through the Heuristic class object """
@@ -102,24 +200,185 @@ class Agent:
         self.print_board_row(board, 7,8,9,7,8,9)
         print()
 
-    def play(self):
-        """ Choose a move to play """
+    @property
+    def games_played(self) -> int:
+        """ Int: Number of games started. """
+        return self._games_played
+
+    @property
+    def move_time(self) -> float:
+        """ Float: Seconds the last call to play took. """
+        return self._move_time
+
+    def play(self, pondered: int = None, received: float = None):
+        """ Choose a move to play. The garbage collector is paused until the move is chosen.
+
+        Arguments:
+            pondered (int, optional): Move already found by searching on the opponent's time.
+            received (float, optional): time.perf_counter() value the server's command arrived at. The time limit
+                counts from it, so time the command waited before play was called is taken off the search. Defaults
+                to now.
+
+        """
+        start = time.perf_counter()
+        deadline = None
+        if self._time_limit is not None:
+            deadline = (received if received is not None else start) + self._time_limit
+        try:
+            with gc_paused():
+                return self.__play(pondered, deadline)
+        finally:
+            self._move_time = time.perf_counter() - start
+
+    def __play(self, pondered: int = None, deadline: float = None):
+        """ Chooses and places a move, see play. deadline is the time.perf_counter() value the move is due at. """
         self._number_moves_made += 1    # update game statistics
+        tables_aged, self._tables_aged = self._tables_aged, False
+
+        if pondered is not None:
+            self.place(self._curr, pondered, self._player)
+            return pondered
+
+        if self._book is not None:
+            n = self._book.lookup(self._boards, self._curr)
+            if n is not None and self._boards[self._curr][n] == 0:
+                self._book_moves += 1
+                self.place(self._curr, n, self._player)
+                return n
 
         # convert global board into an array of hash values
         parameterized_state = np.array([self._game.board_to_hash(b) for b in self._boards])
 
+        # Late in the game the position can often be solved exactly, which is both faster and better than searching
+        if not self._solver_failed and np.count_nonzero(self._boards[1:, 1:] == 0) <= self._endgame_empty_cells:
+            solver_deadline = None
+            if deadline is not None:
+                solver_deadline = deadline - (1 - SOLVER_TIME_SHARE) * self._time_limit
+            solved = self._solver.solve(parameterized_state, self._curr, solver_deadline)
+            if solved is not None and solved[1] is not None:
+                self._solved_moves += 1
+                self.place(self._curr, solved[1], self._player)
+                return solved[1]
+            # not retried this game: every later attempt would spend the same budget, usually for nothing
+            self._solver_failed = solved is None
+
+        if self._mcts is not None:
+            # keeps the tree of the previous move if the position is in it
+            self._mcts.set_root(parameterized_state, self._curr)
+            n = self._mcts.run()
+            self.place(self._curr, n, self._player)
+            return n
+
         # create new GameTeeNode with root state
         node = GameTreeNode(parameterized_state, self._curr)
 
-        # Run alpha beta search at depth 7
-        n = AlphaBeta(node, self._game, self._heuristic, 7).run()
+        # re-root onto the position the last search expected, if the opponent played its predicted reply
+        first_move = guess = None
+        expected, self._expected = self._expected, None
+        if expected is not None and self._curr == expected[1] and np.array_equal(self._boards, expected[0]):
+            first_move, guess = expected[2], expected[3]
+
+        # Run alpha beta search at a fixed depth, or deepen until the time limit runs out
+        time_limit = max(deadline - time.perf_counter(), 0) if deadline is not None else None
+        search = AlphaBeta(node, self._game, self._heuristic, self._depth, time_limit=time_limit, tt=self._tt,
+                           ordering=self._ordering, algorithm=self._algorithm, extension_plies=self._extension_plies,
+                           lmr_moves=self._lmr_moves, futility_margin=self._futility_margin, first_move=first_move,
+                           guess=guess, symmetry=True, new_search=not tables_aged)
+        if self._time_limit is not None:
+            n = search.run_iterative_deepening()
+        elif self._parallel is not None:
+            n = self._parallel.run(node, self._game, self._depth)
+        else:
+            n = search.run()
+
+        if self._parallel is None or self._time_limit is not None:
+            position = (self._boards.tobytes(), self._curr)
+            self._search_log.append((position, search.nodes_generated, first_move is not None))
+            if self._reuse_tree:
+                self.__expect(n, search.principal_variation(), search.score)
 
         # Place the next move n
         self.place(self._curr, n, self._player)
 
         return n
 
+    def __expect(self, move: int, pv, score: float):
+        """ Remembers the position the principal variation leads to two plies from now.
+
+        Arguments:
+            move (int): The move we are about to play.
+            pv (list of int): Principal variation of the search that chose it.
+            score (float): Score of that search.
+
+        """
+        if len(pv) < 3 or pv[0] != move or score is None:
+            return
+
+        boards = self._boards.copy()
+        boards[self._curr][pv[0]] = self._player
+        boards[pv[0]][pv[1]] = -self._player
+        self._expected = (boards, pv[1], pv[2], score)
+
+    def start_pondering(self):
+        """ Starts searching the position after the opponent's most likely reply in the background.
+
+        The reply is the best move stored in the transposition table for the position after our move, which the
+        search that chose our move has just written.
+
+        """
+        if not self._ponder or self._pondering is not None:
+            return
+
+        state = np.array([self._game.board_to_hash(b) for b in self._boards])
+        entry = self._tt.probe(self._tt.zobrist.key(self._game, state, self._curr))
+        if entry is None or entry[4] is None:
+            return
+
+        reply = entry[4]
+        boards = self._boards.copy()
+        boards[self._curr][reply] = -self._player
+        node = GameTreeNode(np.array([self._game.board_to_hash(b) for b in boards]), reply, parent=self._curr)
+
+        # nothing to search if the reply ends the game
+        if self._game.is_terminal(node) or not self._game.legal_moves(node.state, reply):
+            return
+
+        # the root moves forward once for the pondered and the actual reply, so the tables are aged here, once, and
+        # neither the background search nor the search after a miss ages them again
+        self._ordering.age()
+        self._tt.new_search()
+        self._tables_aged = True
+
+        search = AlphaBeta(node, self._game, self._heuristic, self._depth, tt=self._tt, ordering=self._ordering,
+                           algorithm=self._algorithm, extension_plies=self._extension_plies, lmr_moves=self._lmr_moves,
+                           futility_margin=self._futility_margin, symmetry=True, new_search=False)
+        self._pondering = Ponder(search, reply)
+
+    def stop_pondering(self, opponent_move: int = None):
+        """ Stops the background search once the opponent has replied.
+
+        Arguments:
+            opponent_move (int, optional): The move the opponent made. None when the game is over.
+
+        Returns:
+            The move found by the background search if it guessed the opponent's move, otherwise None.
+
+        """
+        ponder, self._pondering = self._pondering, None
+        if ponder is None:
+            return None
+
+        if opponent_move is None or opponent_move != ponder.move:
+            ponder.stop()
+            if opponent_move is not None:
+                self._ponder_misses += 1
+            return None
+
+        # the guess was right: the search continues as if it had been started now
+        self._ponder_hits += 1
+        self._ponder_depth_gained += ponder.completed_depth
+        return ponder.wait(self._time_limit)
+
     def place(self, board, num, player):
         """ Place a move in the global boards"""
         self._curr = num
@@ -132,20 +391,49 @@ class Agent:
         """
         print("#####################")
         print("Games played: {}".format(self._games_played))
+        if self._games_played == 0:
+            return
         print("Games won: {}/{}".format(self._games_won, self._games_played))
         if self._games_drawn > 0:
             print("Games drawn: {}/{}".format(self._games_drawn, self._games_played))
         print('Average Number of Moves Made per Game: {}'.format(ceil(self._number_moves_made/self._games_played)))
         print("Win rate: {:.2f}%".format(self._games_won/self._games_played*100))
+        print("Transposition table: {probes} probes, {hits} hits, {cutoffs} cutoffs".format(**self._tt.stats()))
+        if self._ponder_hits + self._ponder_misses > 0:
+            print("Ponder hit rate: {}/{}".format(self._ponder_hits, self._ponder_hits + self._ponder_misses))
+            if self._ponder_hits > 0:
+                print("Average depth completed while pondering: {:.2f}".format(
+                    self._ponder_depth_gained / self._ponder_hits))
+        reused = [nodes for _, nodes, seeded in self._search_log if seeded]
+        fresh = [nodes for _, nodes, seeded in self._search_log if not seeded]
+        if reused and fresh:
+            print("Searches re-rooted on the previous principal variation: {}/{}, average nodes {:.0f} (others {:.0f})"
+                  .format(len(reused), len(self._search_log), sum(reused) / len(reused), sum(fresh) / len(fresh)))
+        if self._book_moves > 0:
+            print("Moves played from the opening book: {}".format(self._book_moves))
+        if self._solved_moves > 0:
+            print("Moves played by the endgame solver: {}".format(self._solved_moves))
+        if self._reply_latencies:
+            latencies = [total for total, _ in self._reply_latencies]
+            overheads = [total - move for total, move in self._reply_latencies]
+            print("Reply latency: average {:.1f} ms, max {:.1f} ms, protocol overhead average {:.3f} ms, max {:.3f} ms"
+                  .format(1000 * sum(latencies) / len(latencies), 1000 * max(latencies),
+                          1000 * sum(overheads) / len(overheads), 1000 * max(overheads)))
 
     def reset_boards(self):
         """ Used when playing multiple games in a row to reset the board """
         self._boards = np.zeros(shape=(10, 10), dtype='i1')
         self._curr = 0
+        self._expected = None
+        self._tables_aged = False
+        self._solver_failed = False
+        self._tt.clear()
         gc.collect()
 
-    def parse(self, string):
-        """ Reads what the server has sent us and only parses the strings that are necessary """
+    def parse(self, string, received: float = None):
+        """ Reads what the server has sent us and only parses the strings that are necessary. received is passed on
+        to play.
+        """
         if "(" in string:
             command, args = string.split("(")
             args = args.split(")")[0]
@@ -153,21 +441,25 @@ class Agent:
         else:
             command, args = string, []
 
+        if command in ("start", "win", "loss", "draw", "end."):
+            self.stop_pondering()
+
         if command == "start":
             self._games_played += 1
             self.reset_boards()
         if command == "second_move":
             self.place(int(args[0]), int(args[1]), -self._player)
-            return self.play()
+            return self.play(received=received)
         elif command == "third_move":
             # place the move that was generated for us
-            self.place(int(args[0]), int(args[1]), -self._player)
+            self.place(int(args[0]), int(args[1]), self._player)
             # place their last move
             self.place(self._curr, int(args[2]), -self._player)
-            return self.play()
+            return self.play(received=received)
         elif command == "next_move":
+            pondered = self.stop_pondering(int(args[0]))
             self.place(self._curr, int(args[0]), -self._player)
-            return self.play()
+            return self.play(pondered, received)
         elif command == "win":
             self._games_won += 1
             print("We won!")
@@ -181,37 +473,85 @@ class Agent:
         return 0
 
     def run(self, port=None):
-        """ Connects to a specified socket and runs the game """
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        port = port or int(sys.argv[2])    # Usage: ./agent.py -p (port)
+        """ Connects to the game server and plays until it sends end. or closes the connection.
 
-        s.connect(('localhost', port))
-        while True:
-            text = s.recv(1024).decode()
-            if not text:
-                continue
-            for line in text.split("\n"):
-                response = self.parse(line)
-                if response == -1:
-                    s.close()
+        The commands are split into lines from a buffer, so a command that arrives in more than one TCP segment is only
+        parsed once it is complete. Replies are sent with TCP_NODELAY, and the time from receiving each command to
+        sending its reply is recorded next to the time spent choosing the move (see print_game_statistics).
+
+        """
+        port = port or int(sys.argv[2])    # Usage: ./agent.py -p (port)
+        s = socket.create_connection(('localhost', port))
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        try:
+            buffer = b''
+            while True:
+                data = s.recv(4096)
+                if not data:
+                    # the server closed the connection
                     return
-                elif response > 0:
-                    s.sendall((str(response) + "\n").encode())
+                received = time.perf_counter()
+
+                *lines, buffer = (buffer + data).split(b'\n')
+                for line in lines:
+                    response = self.parse(line.decode().strip(), received)
+                    if response == -1:
+                        return
+                    elif response > 0:
+                        s.sendall((str(response) + "\n").encode())
+                        self._reply_latencies.append((time.perf_counter() - received, self._move_time))
+                        self.start_pondering()
+        finally:
+            self.stop_pondering()
+            s.close()
 
 
 if __name__ == "__main__":
 
     # Driver code for AI
+    # Usage: ./agent.py -p (port) [-e alphabeta|mcts] [-a alphabeta|pvs|mtdf] [-t seconds per move] [-d depth]
+    #                   [-w workers] [--reuse-tree] [--no-ponder]
+    # Pondering is on by default; --no-ponder keeps the agent idle on the opponent's time, e.g. when several agents
+    # share the cores of one host
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-p', '--port', type=int, required=True)
+    parser.add_argument('-e', '--engine', choices=ENGINES, default='alphabeta')
+    parser.add_argument('-a', '--algorithm', choices=ALGORITHMS, default='alphabeta')
+    parser.add_argument('-t', '--time-limit', type=float, default=None)
+    parser.add_argument('-d', '--depth', type=int, default=None)
+    parser.add_argument('-w', '--workers', type=int, default=1)
+    parser.add_argument('--reuse-tree', action='store_true')
+    parser.add_argument('--ponder', dest='ponder', action='store_true', default=True,
+                        help="search on the opponent's time (default)")
+    parser.add_argument('--no-ponder', dest='ponder', action='store_false', help="stay idle on the opponent's time")
+    args = parser.parse_args()
 
     # Intialiase Heuristic and Game classes.
-    HEURISTIC = Heuristic()
-    GAME = Game()
+    IMPORTED = time.perf_counter()
+    CACHE = TableCache()
+    HEURISTIC = Heuristic(CACHE)
+    GAME = Game(CACHE)
 
-    # Load in precalculated values
+    # Load in precalculated values. The opening book is optional (python -m player.OpeningBook builds it)
     HEURISTIC.load()
     GAME.load()
+    BOOK = OpeningBook()
+    BOOK.load()
 
     # Initialise Agent and run the AI
-    a = Agent(GAME, HEURISTIC)
-    a.run()
+    a = Agent(GAME, HEURISTIC, depth=args.depth, time_limit=args.time_limit, workers=args.workers, ponder=args.ponder,
+              engine=args.engine, reuse_tree=args.reuse_tree, algorithm=args.algorithm,
+              book=BOOK if len(BOOK) else None)
+
+    # the tables and the agent are kept for the whole run, so move them out of the collector's way
+    gc.collect()
+    gc.freeze()
+
+    # Report how long it took from launch to being ready to play
+    print("Ready to play {:.1f} ms after launch (imports {:.1f} ms)".format(
+        (time.perf_counter() - LAUNCHED) * 1000, (IMPORTED - LAUNCHED) * 1000))
+    print(CACHE.report())
+
+    a.run(args.port)
     a.print_game_statistics()
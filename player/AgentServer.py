@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import gc
+import itertools
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from player.AlphaBeta import ALGORITHMS
+from player.Game import Game
+from player.Heuristic import Heuristic
+from player.OpeningBook import OpeningBook
+from player.TableCache import TableCache
+
+# Tables of the worker process, created once by _init_worker, and the Agent of every game pinned to the worker
+_game = None
+_heuristic = None
+_book = None
+_agent_options = None
+_agents = {}
+
+
+def _init_worker(agent_options: dict):
+    """ Loads the precomputed Game and Heuristic tables and the opening book once per worker process. """
+    global _game, _heuristic, _book, _agent_options
+
+    cache = TableCache()
+    _game = Game(cache)
+    _game.load()
+    _heuristic = Heuristic(cache)
+    _heuristic.load()
+
+    _book = OpeningBook()
+    _book.load()
+    _agent_options = agent_options
+
+    # the tables live as long as the process, so the collector never needs to look at them again
+    gc.collect()
+    gc.freeze()
+
+
+def _handle_command(game_id: int, command: str, received: float):
+    """ Passes a command of a game to the Agent of the game in this worker, which is created by the first command.
+
+    Arguments:
+        game_id (int): Game the command belongs to.
+        command (str): Line sent by the game server.
+        received (float): time.time() value the command arrived at. The time it waited for the worker, e.g. behind
+            the search of another game, is taken off the move's time limit.
+
+    Returns:
+        Tuple (response of Agent.parse, seconds spent choosing the move if the response is a move).
+
+    """
+    from agent import Agent
+
+    agent = _agents.get(game_id)
+    if agent is None:
+        agent = _agents[game_id] = Agent(_game, _heuristic, book=_book if len(_book) else None, **_agent_options)
+
+    # wall clock time is the same in every process, perf_counter is what the agent's deadlines use
+    waited = max(time.time() - received, 0.0)
+    response = agent.parse(command, time.perf_counter() - waited)
+    return response, agent.move_time if response > 0 else 0.0
+
+
+def _close_game(game_id: int):
+    """ Prints the statistics of a game's Agent and drops it. """
+    agent = _agents.pop(game_id, None)
+    if agent is not None and agent.games_played > 0:
+        agent.print_game_statistics()
+
+
+class AgentServer:
+    """ Plays many games at once: one asyncio event loop holds the connections to the game servers and a bounded pool
+    of worker processes runs the agents.
+
+    Every game gets its own Agent, with its own boards, transposition table and move ordering. A game is pinned to one
+    worker (games are dealt to the workers in turn), so its Agent stays in that worker between moves, and every worker
+    loads the tables once however many games it plays. The tables are memory-mapped (see player.TableCache), so the
+    workers share one physical copy of them.
+
+    A worker searches one move at a time, so at most `workers` searches run at once and throughput grows with the
+    number of cores. A slow search only delays the games pinned to the same worker; the connections of the others are
+    read and written by the event loop in the meantime. With a time limit, the time a command waits for its worker is
+    taken off the search, so a reply still comes within the time limit of the command arriving. Pondering is off by
+    default, as it would take the worker from the other games pinned to it.
+
+    Attributes:
+        workers (int): Number of worker processes.
+        games_finished (int): Number of connections that have been closed.
+        reply_latencies (list of tuple): (seconds from receiving a command to sending the reply, seconds of it spent
+            choosing the move) of every reply of every game.
+
+    """
+
+    def __init__(self, workers: int = None, **agent_options):
+        """
+        Arguments:
+            workers (int, optional): Number of worker processes. Defaults to the number of cores.
+            agent_options: Keyword arguments of every Agent, e.g. depth or time_limit.
+
+        """
+        self.workers = workers or os.cpu_count()
+        self.games_finished = 0
+        self.reply_latencies = []
+
+        agent_options.setdefault('ponder', False)
+        self._executors = [ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(agent_options,))
+                           for _ in range(self.workers)]
+        # start the workers and load their tables now: a worker forked later would inherit the sockets of the games
+        # already open, and a connection then never reads as closed while the copy in the worker is left open
+        for future in [executor.submit(gc.collect) for executor in self._executors]:
+            future.result()
+        self._game_ids = itertools.count()
+
+    async def play(self, port: int, host: str = 'localhost'):
+        """ Connects to a game server and plays until it sends end. or closes the connection.
+
+        Arguments:
+            port (int): Port of the game server.
+            host (str): Host of the game server.
+
+        """
+        loop = asyncio.get_running_loop()
+        game_id = next(self._game_ids)
+        executor = self._executors[game_id % self.workers]
+
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.endswith(b'\n'):
+                    # the server closed the connection, possibly in the middle of a command
+                    return
+                received = time.perf_counter()
+
+                response, move_time = await loop.run_in_executor(executor, _handle_command, game_id,
+                                                                 line.decode().strip(), time.time())
+                if response == -1:
+                    return
+                elif response > 0:
+                    writer.write((str(response) + "\n").encode())
+                    await writer.drain()
+                    self.reply_latencies.append((time.perf_counter() - received, move_time))
+        finally:
+            writer.close()
+            await loop.run_in_executor(executor, _close_game, game_id)
+            self.games_finished += 1
+
+    async def run(self, ports, host: str = 'localhost'):
+        """ Plays a game against every port at once and returns when all of them are over. """
+        await asyncio.gather(*(self.play(port, host) for port in ports))
+
+    def close(self):
+        """ Shuts the worker processes down. """
+        for executor in self._executors:
+            executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+if __name__ == "__main__":
+    # Usage: python -m player.AgentServer -p PORT [PORT ...] [-w workers] [-d depth] [-t seconds per move]
+    parser = argparse.ArgumentParser(description="Play games against many game servers from one process")
+    parser.add_argument('-p', '--ports', type=int, nargs='+', required=True)
+    parser.add_argument('-w', '--workers', type=int, default=None)
+    parser.add_argument('-d', '--depth', type=int, default=None)
+    parser.add_argument('-t', '--time-limit', type=float, default=None)
+    parser.add_argument('-a', '--algorithm', choices=ALGORITHMS, default='alphabeta')
+    args = parser.parse_args()
+
+    with AgentServer(args.workers, depth=args.depth, time_limit=args.time_limit,
+                     algorithm=args.algorithm) as server:
+        start = time.perf_counter()
+        asyncio.run(server.run(args.ports))
+        elapsed = time.perf_counter() - start
+
+    if server.reply_latencies:
+        latencies = [total for total, _ in server.reply_latencies]
+        print("{} games, {} moves in {:.1f} s with {} workers, average reply latency {:.1f} ms".format(
+            server.games_finished, len(latencies), elapsed, server.workers, 1000 * sum(latencies) / len(latencies)))
@@ -1,91 +1,959 @@
+import gc
 import math
-from player.Game import Game
+import threading
+import time
+from contextlib import contextmanager
+from typing import List
+import numpy as np
+from player.Game import Game, NO_MOVE, PLAYER_DIGIT
 from player.GameTreeNode import GameTreeNode
 from player.Heuristic import Heuristic
+from player.MoveOrdering import MoveOrdering
+from player.SearchState import SearchState, MAX_PLIES
+from player.Symmetry import distinct_moves
+from player.TranspositionTable import TranspositionTable, EXACT, LOWER, UPPER
+
+# Number of nodes searched between checks of the deadline and the cancellation hook
+CHECK_INTERVAL = 1024
+
+# Width of a null window. Scores are heuristic sums divided by depth, so distinct scores are at least 1/81 apart
+NULL_WINDOW = 1e-4
+
+# Search algorithms that can be selected by name
+ALGORITHMS = ('alphabeta', 'pvs', 'mtdf')
+
+# Size of the transposition table MTD(f) creates when it is not given one
+MTDF_TT_SIZE_MB = 16
+
+# Late move reductions are only made at nodes with at least this much depth left
+LMR_MIN_DEPTH = 3
+
+# Default number of nodes each iteration may spend past the nominal depth
+EXTENSION_BUDGET = 2000
+
+# Steps of the loop of the iterative search
+ENTER, NEXT_MOVE, CHILD_SCORE, FINISH, FINISHED = range(5)
+
+# Locals of a node of the iterative search that are kept on its stack, in the order of AlphaBeta._frames
+FRAME_FIELDS = ('alpha', 'beta', 'alpha_orig', 'beta_orig', 'player', 'remaining', 'reduced', 'extending', 'reducible',
+                'searched', 'best_val', 'best_move', 'move', 'index', 'kind')
+
+# How the current move of a node of the iterative search is being searched: at reduced depth, with a null window or
+# with the full window
+REDUCED, NULL, FULL = range(3)
+
+
+class SearchCancelled(Exception):
+    """ Exception that is raised inside the search when the deadline, node budget or cancellation hook stops it.
+
+    """
+    pass
+
+
+@contextmanager
+def gc_paused():
+    """ Disables the cyclic garbage collector while choosing a move.
+
+    The search frees everything it allocates except the transposition table entries, which hold no reference cycles,
+    so a collection in the middle of a move would only scan the tables and delay the reply. Restores the previous
+    state on exit, so it can be nested.
+
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
 
 
 class AlphaBeta:
     """ Wrapper function for Alpha Beta Search.
 
-    Standard minimax search with alpha beta pruning optimisation.
+    Standard minimax search with alpha beta pruning optimisation. The 'pvs' algorithm (Principal Variation Search)
+    searches the first child of every node with the full window and the other children with a null window,
+    re-searching a child only when it fails high. With iterative deepening the root of each 'pvs' iteration is
+    searched with an aspiration window centred on the score of the previous iteration.
+
+    The 'mtdf' algorithm (MTD(f)) only makes null window searches of the root, moving the window towards the minimax
+    value until the upper and lower bounds meet. It needs a transposition table to make the repeated searches cheap
+    and creates one if none is given. The first guess is the score of the previous iteration.
+
+    With extension_plies set, positions at the nominal depth are searched further while the line is forcing: when the
+    player to move can win the board they were sent to straight away (the previous move sent them to a board with an
+    open two), only the winning move is searched, and when they have a single legal move it is played. Extensions stop
+    after extension_plies plies past the nominal depth or once the iteration has used extension_budget nodes.
+
+    Two selective pruning methods can be turned on. With lmr_moves set, every move after the first lmr_moves of an
+    interior node is first searched lmr_reduction plies shallower with a null window, and searched normally only if
+    that search beats alpha (late move reductions). With futility_margin set, a node one ply above the nominal depth is
+    not searched if its static score plus the margin cannot reach alpha (futility pruning). reductions,
+    reduction_researches and futility_prunes count how often each happened.
+
+    A search can be seeded from the previous one when the game has followed its principal variation: first_move is
+    searched first at the root and, for a fixed depth search, guess centres an aspiration window at the root.
 
     Attributes:
         node (GameTreeNode): The root node.
         game (Game): Game class instance.
         eval_cls (Heuristic): Heuristic class instance.
-        depth (int): Depth to run search to.
+        depth (int): Depth to run search to. Maximum depth when using iterative deepening.
+        time_limit (float, optional): Seconds the iterative deepening search is allowed to run for.
+        node_limit (int, optional): Number of nodes the iterative deepening search is allowed to expand.
+        tt (TranspositionTable, optional): Transposition table shared by the searches that use it.
+        ordering (MoveOrdering, optional): Killer, history and counter move tables shared by the searches that use it.
+        algorithm (str): One of ALGORITHMS.
+        aspiration_window (float): Half width of the first aspiration window.
+        root_moves (list of int, optional): Restricts the root to these moves. Used to split the root between workers.
+        extension_plies (int): Maximum number of plies searched past the nominal depth along forcing lines.
+        extension_budget (int): Number of nodes past the nominal depth each iteration may search.
+        lmr_moves (int, optional): Number of moves of a node searched at full depth before reducing. None disables
+            late move reductions.
+        lmr_reduction (int): Plies taken off the depth of a reduced move.
+        futility_margin (float, optional): Largest heuristic gain expected from one move. None disables futility
+            pruning.
+        first_move (int, optional): Root move to search first, e.g. the continuation of the previous principal variation.
+        guess (float, optional): Expected score of the root, e.g. the score of the previous search.
+        symmetry (bool): Skip root moves that lead to a position symmetric to another root move (see
+            player.Symmetry.distinct_moves). Needs a game on base 3 board hashes and has no effect with root_moves.
+        batch_frontier (bool): Score the nodes two plies above the horizon with numpy batches of their children and
+            grandchildren instead of searching them (see __frontier). Needs the numpy tables of Game and Heuristic
+            and is not used when extension_plies is set, as the leaves would no longer be plain evaluations.
+        iterative (bool): Search with a loop over an explicit stack instead of recursion (see __iterative_alpha_beta).
+            Both give the same results.
+        new_search (bool): Age the move ordering and start a new transposition table generation when the search
+            starts. Turned off by callers that have already done so for this move, e.g. the tasks of a root-parallel
+            search.
+        nodes_generated (int): Number of nodes visited by the search.
+        score (float): Value of the root found by the last completed search.
+        completed_depth (int): Deepest iteration that was searched to completion.
+        researches (int): Number of null window searches that failed high and were searched again.
+        aspiration_researches (int): Number of root searches repeated because the aspiration window failed.
+        mtdf_passes (int): Number of null window searches of the root made by MTD(f).
+        reductions (int): Number of moves searched at reduced depth.
+        reduction_researches (int): Number of reduced moves that beat alpha and were searched again at full depth.
+        futility_prunes (int): Number of frontier nodes skipped by futility pruning.
+        extensions (int): Number of nodes searched past the nominal depth.
 
     """
 
-    def __init__(self, node: GameTreeNode, game: Game, eval_cls: Heuristic, depth: int):
+    def __init__(self, node: GameTreeNode, game: Game, eval_cls: Heuristic, depth: int, time_limit: float = None,
+                 node_limit: int = None, tt: TranspositionTable = None, ordering: MoveOrdering = None,
+                 algorithm: str = 'alphabeta', aspiration_window: float = 25, root_moves: List[int] = None,
+                 extension_plies: int = 0, extension_budget: int = EXTENSION_BUDGET, lmr_moves: int = None,
+                 lmr_reduction: int = 1, futility_margin: float = None, first_move: int = None, guess: float = None,
+                 symmetry: bool = False, batch_frontier: bool = False, iterative: bool = False,
+                 new_search: bool = True):
+        if algorithm not in ALGORITHMS:
+            raise ValueError("Unknown search algorithm '{}'. Choose from {}".format(algorithm, ALGORITHMS))
+
         self._node = node
         self._game = game
         self._eval_cls = eval_cls
         self._depth = depth
 
-    def run(self):
+        # depth of the iteration currently being searched
+        self._search_depth = depth
+
+        # limits used by the anytime search
+        self._time_limit = time_limit
+        self._node_limit = node_limit
+        self._deadline = None
+        self._next_check = math.inf
+        self._cancelled = threading.Event()
+
+        self._pvs = algorithm == 'pvs'
+        self._mtdf = algorithm == 'mtdf'
+
+        self._tt = tt if tt is not None or not self._mtdf else TranspositionTable(MTDF_TT_SIZE_MB)
+        self._ordering = ordering
+        self._new_search = new_search
+
+        self._aspiration_window = aspiration_window
+        self._root_moves = root_moves
+        if symmetry and root_moves is None:
+            moves = game.legal_moves(node.state, node.get_board_num())
+            distinct = distinct_moves(node.state, node.get_board_num(), moves)
+            if len(distinct) < len(moves):
+                self._root_moves = distinct
+
+        # move list of every ply, filled in place by the nodes at that ply
+        self._moves = [[] for _ in range(MAX_PLIES + 1)]
+
+        # stack of the iterative search: one list per local of a node, indexed by ply
+        self._iterative = iterative
+        self._frames = tuple([None] * (MAX_PLIES + 1) for _ in FRAME_FIELDS) if iterative else None
+
+        self._extension_plies = extension_plies
+        self._extension_budget = extension_budget
+        self._extensions_left = extension_budget
+
+        self._lmr_moves = lmr_moves
+        self._lmr_reduction = lmr_reduction
+        self._futility_margin = futility_margin
+        self._batch_frontier = batch_frontier and not extension_plies
+        if self._batch_frontier:
+            # plain ndarray views, as indexing a memmap goes through its Python __getitem__
+            self._child_hash = np.asarray(game.child_hash)
+            self._win_states = np.asarray(game.win_states)
+
+        # seeds from the previous search
+        self._first_move = first_move
+        self._guess = guess
+
+        self.nodes_generated = 0
+        self.score = None
+        self.completed_depth = 0
+        self.researches = 0
+        self.aspiration_researches = 0
+        self.mtdf_passes = 0
+        self.reductions = 0
+        self.reduction_researches = 0
+        self.futility_prunes = 0
+        self.extensions = 0
+
+    def cancel(self):
+        """ Stops a running search. Safe to call from another thread.
+
+        The iteration in progress is abandoned and the best move of the deepest completed iteration is returned.
+
+        """
+        self._cancelled.set()
+
+    def run(self, alpha: float = -math.inf):
         """ Run the minimax search with alpha-beta pruning
 
+        Args:
+            alpha (float): Score the root has to beat. Root moves that cannot beat it only get an upper bound.
+
         Returns:
               Int that represents the best move found.
 
         """
         player = 1  # Assume that we are player
         depth = 0   # start at depth 0 and increment to desired depth as search continues
-        self.__alpha_beta(self._node, depth, -math.inf, math.inf, player)
+        self._extensions_left = self._extension_budget
+        state = self.__new_search()
+        if self._mtdf:
+            self.score, best_move = self.__mtdf(state, self._first_move, self._guess or 0, alpha)
+            self.completed_depth = self._depth
+            return best_move
+
+        if self._guess is not None and alpha == -math.inf:
+            self.score = self.__aspiration_search(state, self._first_move, self._guess)
+        else:
+            self.score = self.__search_root(state, depth, alpha, math.inf, player, self._first_move)
         best_move = max(self._node.children, key=lambda c: c.alpha)
+        self.completed_depth = self._depth
         return best_move.move
 
-    def __alpha_beta(self, node: GameTreeNode, depth: int, alpha: float, beta: float, player: int):
+    def run_iterative_deepening(self):
+        """ Run the alpha-beta search at depth 1, 2, 3... until the deadline or node budget runs out.
+
+        The best move of each iteration is searched first in the next one. The search stops when depth reaches
+        self._depth, when the time or node limit is reached or when cancel() is called. The limits are only checked
+        once depth 1 has completed, so that even without time left the move is chosen by a search.
+
+        Returns:
+              Int that represents the best move found by the deepest completed iteration.
+
+        """
+        if self._time_limit is not None:
+            self._deadline = time.perf_counter() + self._time_limit
+        # depth 1 takes well under a millisecond and is always completed
+        self._next_check = math.inf
+
+        state = self.__new_search()
+        best_move = self._first_move
+        score = None
+        for depth in range(1, self._depth + 1):
+            self._search_depth = depth
+            self._extensions_left = self._extension_budget
+            try:
+                if self._mtdf:
+                    score, move = self.__mtdf(state, best_move, score if score is not None else 0)
+                elif self._pvs and score is not None:
+                    score = self.__aspiration_search(state, best_move, score)
+                else:
+                    self._node.children = []
+                    score = self.__search_root(state, 0, -math.inf, math.inf, 1, best_move)
+            except SearchCancelled:
+                break
+
+            # terminal root or no legal moves
+            if not self._node.children:
+                best_move = None
+                break
+
+            if not self._mtdf:
+                move = max(self._node.children, key=lambda c: c.alpha).move
+            best_move = move
+            self.score = score
+            self.completed_depth = depth
+            if depth == 1:
+                self._next_check = 0
+
+        if best_move is None:
+            # no iteration was run, so play any legal move
+            best_move = (self._root_moves or self._game.legal_moves(self._node.state, self._node.get_board_num()))[0]
+
+        return best_move
+
+    def principal_variation(self) -> List[int]:
+        """ Follows the best moves stored in the transposition table from the root.
+
+        Returns:
+            List of moves, starting with the move for the root. Empty if the root has not been searched. Without a
+            transposition table only the best root move is known.
+
+        """
+        if not self._node.children:
+            return []
+
+        best = max(self._node.children, key=lambda c: c.alpha).move
+        if self._tt is None:
+            return [best]
+
+        game = self._game
+        zobrist = self._tt.zobrist
+        state = [int(b) for b in self._node.state]
+        board = self._node.get_board_num()
+        key = zobrist.key(game, state, board)
+        player = 1
+        pv = []
+
+        move = best
+        while move is not None and move in game.empty_cells(state[board]) and len(pv) < self._search_depth:
+            pv.append(move)
+            key ^= zobrist.board_in_play(board) ^ zobrist.move(board, move, player) ^ zobrist.board_in_play(move)
+            state[board] = game.play_move(state[board], move, player)
+            if game.is_win(state[board]):
+                break
+
+            board, player = move, -player
+            entry = self._tt.probe(key)
+            move = entry[4] if entry is not None else None
+
+        return pv
+
+    def __mtdf(self, state: SearchState, first_move: int, guess: float, alpha: float = -math.inf):
+        """ Converges on the value of the root with null window searches.
+
+        Args:
+            state (SearchState): Position of the root.
+            first_move (int): Root move to search first.
+            guess (float): First estimate of the score.
+            alpha (float): Score the root has to beat. If it cannot, an upper bound is returned.
+
+        Returns:
+            Tuple (score, best move). The move is the one that raised the lower bound last, or the root move with the
+            highest upper bound if the score is no better than alpha.
+
+        """
+        lower, upper = alpha, math.inf
+        score = max(guess, alpha)
+        best_move = None
+
+        while lower < upper:
+            beta = score + NULL_WINDOW if score == lower else score
+            self._node.children = []
+            score = self.__search_root(state, 0, beta - NULL_WINDOW, beta, 1, first_move)
+            self.mtdf_passes += 1
+
+            if not self._node.children:
+                return score, None
+
+            if score < beta:
+                upper = score
+            else:
+                lower = score
+                best_move = first_move = max(self._node.children, key=lambda c: c.alpha).move
+
+            # no finite window separates infinite scores
+            if score in (math.inf, -math.inf):
+                break
+
+        if best_move is None:
+            best_move = max(self._node.children, key=lambda c: c.alpha).move
+
+        return score, best_move
+
+    def __aspiration_search(self, state: SearchState, first_move: int, guess: float) -> float:
+        """ Searches the root with a narrow window around guess, widening the side that fails until it succeeds.
+
+        Args:
+            state (SearchState): Position of the root.
+            first_move (int): Best move of the previous iteration.
+            guess (float): Score of the previous iteration.
+
+        Returns:
+            The score of the root.
+
+        """
+        if guess in (math.inf, -math.inf):
+            self._node.children = []
+            return self.__search_root(state, 0, -math.inf, math.inf, 1, first_move)
+
+        low = high = self._aspiration_window
+        while True:
+            alpha, beta = guess - low, guess + high
+            self._node.children = []
+            score = self.__search_root(state, 0, alpha, beta, 1, first_move)
+
+            if score <= alpha and alpha > -math.inf:
+                low = low * 4 if low < self._aspiration_window * 16 else math.inf
+            elif score >= beta and beta < math.inf:
+                high = high * 4 if high < self._aspiration_window * 16 else math.inf
+            else:
+                return score
+
+            self.aspiration_researches += 1
+
+    def __search_root(self, state: SearchState, depth: int, alpha: float, beta: float, player: int,
+                      first_move: int = None) -> float:
+        """ Searches the root with the recursive or the iterative search. """
+        if self._iterative:
+            return self.__iterative_alpha_beta(state, depth, alpha, beta, player, first_move)
+        return self.__alpha_beta(state, depth, alpha, beta, player, first_move)
+
+    def __check_limits(self):
+        """ Raises SearchCancelled once a limit has been reached. """
+        if self._cancelled.is_set():
+            raise SearchCancelled()
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise SearchCancelled()
+        if self._node_limit is not None and self.nodes_generated >= self._node_limit:
+            raise SearchCancelled()
+
+        self._next_check = self.nodes_generated + CHECK_INTERVAL
+        if self._node_limit is not None:
+            self._next_check = min(self._next_check, self._node_limit)
+
+    def __new_search(self):
+        """ Starts a new search in the shared tables and returns the SearchState of the root. """
+        if self._ordering is not None and self._new_search:
+            self._ordering.age()
+
+        zobrist = None
+        if self._tt is not None:
+            if self._new_search:
+                self._tt.new_search()
+            zobrist = self._tt.zobrist
+
+        return SearchState(self._game, self._eval_cls, self._node.state, self._node.get_board_num(), self._node.parent,
+                           zobrist)
+
+    def __forcing_move(self, state: SearchState, remaining: int, player: int):
+        """ Returns the move to extend a node at or past the nominal depth with, or None to evaluate it.
+
+        Args:
+            state (SearchState): Position at or past the nominal depth.
+            remaining (int): Depth left below the node, 0 or negative.
+            player (int): The player to move.
+
+        """
+        if -remaining >= self._extension_plies or self._extensions_left <= 0:
+            return None
+
+        board_hash = state.boards[state.board]
+
+        # the opponent sent us to a board with an open two
+        wins = self._game.winning_cells(board_hash, player)
+        if wins:
+            return wins[0]
+
+        cells = self._game.empty_cells(board_hash)
+        if len(cells) == 1:
+            return cells[0]
+
+        return None
+
+    def __futile(self, state: SearchState, depth: int, alpha: float, beta: float, player: int):
+        """ Returns a bound for a frontier node that cannot get back inside the window, or None to search it.
+
+        The children of a frontier node are evaluated one ply deeper, and one move changes the heuristic sum by less
+        than the futility margin unless it wins the board.
+
+        Args:
+            state (SearchState): Position one ply above the nominal depth.
+            depth (int): The depth of the node.
+            alpha (float): The best value found for current player.
+            beta (float): The best value found for the opponent.
+            player (int): The player to move.
+
+        """
+        if self._game.winning_cells(state.boards[state.board], player):
+            return None
+
+        static = state.heuristic(depth + 1)
+        margin = self._futility_margin / (depth + 1)
+
+        if player == 1 and static + margin <= alpha:
+            return static + margin
+        if player == -1 and static - margin >= beta:
+            return static - margin
+
+        return None
+
+    def __frontier(self, state: SearchState, depth: int, player: int):
+        """ Scores a node two plies above the horizon without searching its children and grandchildren one by one.
+
+        The hashes of the grandchildren are looked up in the child hash table as one numpy array of shape (moves, 10),
+        and their heuristic sums are the sum of the node changed by the two boards that moved. Every leaf is scored by
+        the same division as Heuristic.compute_heuristic, and the minimax of the two plies is taken with numpy
+        reductions instead of alpha beta. A child that wins its board is a leaf, and a child that has no moves scores
+        -inf or inf as in the search.
+
+        Args:
+            state (SearchState): Position of the node.
+            depth (int): The depth of the node.
+            player (int): The player to move.
+
+        Returns:
+            Tuple (exact value of the node, best move or None if there are no moves).
+
+        """
+        boards = state.boards
+        curr_board = state.board
+        board_hash = boards[curr_board]
+
+        moves = self._game.empty_cells(board_hash)
+        if not moves:
+            return (-math.inf if player == 1 else math.inf), None
+
+        # hash of each child board, and of the board it sends the opponent to as it is after the move
+        child_hashes = [board_hash + PLAYER_DIGIT[m][player] for m in moves]
+        next_hashes = [boards[m] for m in moves]
+        if curr_board in moves:
+            i = moves.index(curr_board)
+            next_hashes[i] = child_hashes[i]
+
+        values = self._eval_cls.board_values
+        child_hashes = np.array(child_hashes)
+        next_hashes = np.array(next_hashes)
+        won = self._win_states[child_hashes]
+        sums = state.value - values[board_hash] + values[child_hashes]
+
+        grandchild_hashes = self._child_hash[next_hashes, :, -player]
+        leaves = (grandchild_hashes != NO_MOVE) & ~won[:, None]
+        self.nodes_generated += len(moves) + int(np.count_nonzero(leaves))
+
+        scores = ((sums - values[next_hashes])[:, None] + values[grandchild_hashes]) / (depth + 2)
+        if player == 1:
+            replies = np.where(leaves, scores, math.inf).min(axis=1)
+        else:
+            replies = np.where(leaves, scores, -math.inf).max(axis=1)
+        scores = np.where(won, sums / (depth + 1), replies)
+
+        best = int(scores.argmax() if player == 1 else scores.argmin())
+        return float(scores[best]), moves[best]
+
+    def __enter_node(self, state: SearchState, depth: int, alpha: float, beta: float, player: int, first_move: int,
+                     reduced: int):
+        """ Enters a node for __alpha_beta and __iterative_alpha_beta, up to the search of its moves.
+
+        The node is counted, and it is scored without searching its moves if it is terminal, past the nominal depth
+        with no forcing move, futile, decided by the transposition table or scored by the frontier batch. Otherwise the
+        moves to search, in order, are put in self._moves[depth].
+
+        Args:
+            state (SearchState): The position of the node.
+            depth (int): The depth of the node.
+            alpha (float): The best value found for current player.
+            beta (float): The best value found for the opponent.
+            player (int) : Can take either 1 or -1 (Current player == 1 and Opponent == -1)
+            first_move (int): Move to search before the others, or None for the transposition table move.
+            reduced (int): Plies taken off the depth of this line by late move reductions.
+
+        Returns:
+            Tuple (value of the node, or None if its moves must be searched, alpha and beta narrowed by the
+            transposition table, depth left below the node, whether only a forcing move is searched past the nominal
+            depth).
+
+        """
+        self.nodes_generated += 1
+        if self.nodes_generated >= self._next_check:
+            self.__check_limits()
+
+        remaining = self._search_depth - depth - reduced
+        if state.is_terminal():
+            return state.heuristic(depth), alpha, beta, remaining, False
+
+        curr_board = state.board
+
+        # past the nominal depth only forcing moves are searched
+        extending = remaining <= 0
+        if extending:
+            forced = self.__forcing_move(state, remaining, player) if self._extension_plies else None
+            if forced is None:
+                return state.heuristic(depth), alpha, beta, remaining, extending
+            self._extensions_left -= 1
+            self.extensions += 1
+        elif remaining == 1 and depth > 0 and self._futility_margin is not None:
+            bound = self.__futile(state, depth, alpha, beta, player)
+            if bound is not None:
+                self.futility_prunes += 1
+                return bound, alpha, beta, remaining, extending
+
+        if self._tt is not None:
+            entry = self._tt.probe(state.key)
+            if entry is not None:
+                if first_move is None:
+                    first_move = entry[4]
+
+                # scores are only comparable within the same search, and the root must always expand its children
+                if depth > 0 and entry[5] == self._tt.generation and entry[1] >= remaining:
+                    score, bound = entry[3], entry[2]
+                    if bound == EXACT:
+                        self._tt.cutoffs += 1
+                        return score, alpha, beta, remaining, extending
+                    elif bound == LOWER:
+                        alpha = max(alpha, score)
+                    else:
+                        beta = min(beta, score)
+                    if beta <= alpha:
+                        self._tt.cutoffs += 1
+                        return score, alpha, beta, remaining, extending
+
+        if self._batch_frontier and depth > 0 and remaining == 2:
+            best_val, best_move = self.__frontier(state, depth, player)
+
+            if self._ordering is not None and best_move is not None and \
+                    (best_val >= beta if player == 1 else best_val <= alpha):
+                self._ordering.cutoff(best_move, depth, curr_board, player, remaining, state.parent)
+            if self._tt is not None:
+                # the batch is a full minimax of the last plies, so its value is exact whatever the window
+                self._tt.store(state.key, remaining, EXACT, best_val, best_move)
+            return best_val, alpha, beta, remaining, extending
+
+        # the moves of each ply are kept in a list reused by every node at that ply
+        moves = self._moves[depth]
+        if extending:
+            moves.clear()
+            moves.append(forced)
+        else:
+            if depth == 0 and self._root_moves is not None:
+                moves[:] = self._root_moves
+            else:
+                moves[:] = self._game.empty_cells(state.boards[curr_board])
+
+            if self._ordering is not None:
+                self._ordering.order(moves, depth, curr_board, player, state.parent, first_move)
+            elif first_move is not None and first_move in moves:
+                moves.remove(first_move)
+                moves.insert(0, first_move)
+
+        return None, alpha, beta, remaining, extending
+
+    def __first_search(self, late: bool, has_best: bool, alpha: float, beta: float, player: int):
+        """ Returns how a move is searched first: REDUCED, with a NULL window or with the FULL window.
+
+        A late move is expected to fail low (high for player -1), which a shallower null window search can show. With
+        PVS, every move after the first is only proven to be no better than the best one, and searched properly if it
+        is.
+
+        Args:
+            late (bool): Whether the move is a late move of a node that late move reductions apply to.
+            has_best (bool): Whether a move of the node has already been searched.
+            alpha (float): The best value found for current player.
+            beta (float): The best value found for the opponent.
+            player (int): The player to move at the node.
+
+        """
+        if alpha > -math.inf if player == 1 else beta < math.inf:
+            if late:
+                return REDUCED
+            if self._pvs and has_best:
+                return NULL
+        return FULL
+
+    @staticmethod
+    def __null_window(alpha: float, beta: float, player: int):
+        """ Returns the null window (alpha, beta) at the bound the player has to beat. """
+        if player == 1:
+            return alpha, alpha + NULL_WINDOW
+        return beta - NULL_WINDOW, beta
+
+    def __store(self, state: SearchState, remaining: int, value: float, alpha_orig: float, beta_orig: float,
+                best_move: int):
+        """ Stores the value of a searched node in the transposition table, as a bound if it fell outside the window
+        (alpha_orig, beta_orig) the node was entered with. """
+        if self._tt is None:
+            return
+
+        if value <= alpha_orig:
+            bound = UPPER
+        elif value >= beta_orig:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self._tt.store(state.key, remaining, bound, value, best_move)
+
+    def __alpha_beta(self, state: SearchState, depth: int, alpha: float, beta: float, player: int,
+                     first_move: int = None, reduced: int = 0):
         """ Search game to determine best action; uses negamax implementation and alpha-beta pruning.
 
+        Children are searched by making the move on state and taking it back afterwards. Only the children of the root
+        are kept, as GameTreeNodes in self._node.children.
+
         Args:
-            node (GameTreeNode): The root or parent node.
+            state (SearchState): The position of the node. It is the same as on entry when the search returns.
             depth (int): The depth of the current search.
             alpha (float): The best value found for current player.
             beta (float): The best value found for the opponent.
             player (int) : Can take either 1 or -1 (Current player == 1 and Opponent == -1)
+            first_move (int, optional): Move to search before the others. Defaults to the transposition table move.
+            reduced (int): Plies taken off the depth of this line by late move reductions.
 
         Returns:
             A number (float) representing the best move possible for the player.
 
         """
-        if self._game.is_terminal(node) or depth == self._depth:
-            return self._eval_cls.compute_heuristic(node.state, depth)
+        alpha_orig, beta_orig = alpha, beta
+        value, alpha, beta, remaining, extending = self.__enter_node(state, depth, alpha, beta, player, first_move,
+                                                                     reduced)
+        if value is not None:
+            return value
 
-        if player == 1:
+        moves = self._moves[depth]
+        curr_board = state.board
+
+        # late moves of interior nodes may be searched to a reduced depth first, and with PVS every move after the first
+        # with a null window
+        reducible = self._lmr_moves is not None and depth > 0 and remaining >= LMR_MIN_DEPTH
+        narrowed = reducible or self._pvs
+        searched = 0
 
-            best_val = -math.inf
+        best_move = None
+        best_val = -math.inf if player == 1 else math.inf
 
-            # generate children and recursively apply the alpha beta search to each child
-            for child in self._game.generate_moves(node.state, node.get_board_num(), player):
+        # make each move and recursively apply the alpha beta search to the resulting position
+        for move in moves:
+            state.make_move(move, player)
 
-                ret_val = self.__alpha_beta(child, depth + 1, alpha, beta, -player)
-                best_val = max(best_val, ret_val)
+            kind = FULL
+            if narrowed:
+                kind = self.__first_search(reducible and searched >= self._lmr_moves, best_move is not None, alpha,
+                                           beta, player)
+            if kind == REDUCED:
+                self.reductions += 1
+                null_alpha, null_beta = self.__null_window(alpha, beta, player)
+                ret_val = self.__alpha_beta(state, depth + 1, null_alpha, null_beta, -player, None,
+                                            reduced + self._lmr_reduction)
+                if ret_val > alpha if player == 1 else ret_val < beta:
+                    # the reduced search did not show that the move is worse, so search it at full depth
+                    self.reduction_researches += 1
+                    kind = self.__first_search(False, best_move is not None, alpha, beta, player)
+
+            if kind == NULL:
+                null_alpha, null_beta = self.__null_window(alpha, beta, player)
+                ret_val = self.__alpha_beta(state, depth + 1, null_alpha, null_beta, -player, None, reduced)
+                if alpha < ret_val < beta:
+                    # the move is better than the best one so far, so search it properly
+                    self.researches += 1
+                    kind = FULL
+
+            if kind == FULL:
+                ret_val = self.__alpha_beta(state, depth + 1, alpha, beta, -player, None, reduced)
+            searched += 1
+
+            # We only need keep track of the children generated right below the root
+            # so that we can find the best move
+            if depth == 0 and player == 1:
+                self.__keep_root_child(state, ret_val)
+            state.unmake_move()
+
+            if player == 1:
+                if ret_val > best_val or best_move is None:
+                    best_val = ret_val
+                    best_move = move
                 alpha = max(alpha, best_val)
+            else:
+                if ret_val < best_val or best_move is None:
+                    best_val = ret_val
+                    best_move = move
+                beta = min(beta, best_val)
 
-                # We only need keep track of the children generated right below the root
-                # so that we can find the best move
-                if depth == 0:
-                    node.children.append(child)
-                    child.alpha = ret_val
+            # we can prune on this condition
+            if beta <= alpha:
+                if self._ordering is not None and not extending:
+                    self._ordering.cutoff(move, depth, curr_board, player, remaining, state.parent)
+                break
 
-                # we can prune on this condition
-                if beta <= alpha:
-                    return best_val
+        self.__store(state, remaining, best_val, alpha_orig, beta_orig, best_move)
+        return best_val
 
-            return best_val
+    def __iterative_alpha_beta(self, state: SearchState, depth: int, alpha: float, beta: float, player: int,
+                               first_move: int = None, reduced: int = 0):
+        """ Same search as __alpha_beta, driven by a loop over an explicit stack instead of recursion.
 
-        else:
+        The locals of every node that has children left to search live in the per-ply lists of self._frames, one for
+        each of FRAME_FIELDS, and the loop moves between entering a node (ENTER), searching the next move of the node on
+        top of the stack (NEXT_MOVE), handling the score a child returned (CHILD_SCORE) and storing the result of a node
+        (FINISH). Entering a node and choosing how to search a move are shared with __alpha_beta. Leaves are scored by
+        NEXT_MOVE without being entered. There is no limit on depth other than the length of the stack, MAX_PLIES.
+
+        Args:
+            state (SearchState): The position of the node. It is the same as on entry when the search returns.
+            depth (int): The depth of the current search.
+            alpha (float): The best value found for current player.
+            beta (float): The best value found for the opponent.
+            player (int) : Can take either 1 or -1 (Current player == 1 and Opponent == -1)
+            first_move (int, optional): Move to search before the others. Defaults to the transposition table move.
+            reduced (int): Plies taken off the depth of this line by late move reductions.
+
+        Returns:
+            A number (float) representing the best move possible for the player.
 
-            best_val = math.inf
+        """
+        (f_alpha, f_beta, f_alpha_orig, f_beta_orig, f_player, f_remaining, f_reduced, f_extending, f_reducible,
+         f_searched, f_best_val, f_best_move, f_move, f_index, f_kind) = self._frames
+        all_moves = self._moves
+        ordering = self._ordering
+        lmr_moves = self._lmr_moves
+        lmr_reduction = self._lmr_reduction
+        pvs = self._pvs
+        extension_plies = self._extension_plies
 
-            for child in self._game.generate_moves(node.state, node.get_board_num(), player):
-                best_val = min(best_val, self.__alpha_beta(child, depth + 1, alpha, beta, -player))
-                beta = min(beta, best_val)
+        root_depth = depth
+        action = ENTER
+        value = None
 
+        while True:
+            if action == FINISHED:
+                # value is the score of the node at depth
+                if depth == root_depth:
+                    return value
+                depth -= 1
+                action = CHILD_SCORE
+
+            if action == CHILD_SCORE:
+                # value is the score of the current move of the node at depth
+                player = f_player[depth]
+                alpha, beta = f_alpha[depth], f_beta[depth]
+                reduced = f_reduced[depth]
+                kind = f_kind[depth]
+
+                if kind == REDUCED and (value > alpha if player == 1 else value < beta):
+                    # the reduced search did not show that the move is worse, so search it at full depth
+                    self.reduction_researches += 1
+                    kind = f_kind[depth] = self.__first_search(False, f_best_move[depth] is not None, alpha, beta,
+                                                               player)
+                    if kind == NULL:
+                        alpha, beta = self.__null_window(alpha, beta, player)
+                    depth += 1
+                    player = -player
+                    first_move = None
+                    action = ENTER
+                    continue
+
+                if kind == NULL and alpha < value < beta:
+                    self.researches += 1
+                    f_kind[depth] = FULL
+                    depth += 1
+                    player = -player
+                    first_move = None
+                    action = ENTER
+                    continue
+
+                f_searched[depth] += 1
+                move = f_move[depth]
+                if depth == 0 and player == 1:
+                    self.__keep_root_child(state, value)
+                state.unmake_move()
+
+                if player == 1:
+                    if value > f_best_val[depth] or f_best_move[depth] is None:
+                        f_best_val[depth] = value
+                        f_best_move[depth] = move
+                    alpha = f_alpha[depth] = max(alpha, f_best_val[depth])
+                else:
+                    if value < f_best_val[depth] or f_best_move[depth] is None:
+                        f_best_val[depth] = value
+                        f_best_move[depth] = move
+                    beta = f_beta[depth] = min(beta, f_best_val[depth])
+
+                action = NEXT_MOVE
                 if beta <= alpha:
-                    return best_val
+                    if ordering is not None and not f_extending[depth]:
+                        ordering.cutoff(move, depth, state.board, player, f_remaining[depth], state.parent)
+                    action = FINISH
+
+            if action == NEXT_MOVE:
+                moves = all_moves[depth]
+                index = f_index[depth]
+                if index == len(moves):
+                    action = FINISH
+                else:
+                    move = moves[index]
+                    f_index[depth] = index + 1
+                    f_move[depth] = move
+                    player = f_player[depth]
+                    alpha, beta = f_alpha[depth], f_beta[depth]
+                    reduced = f_reduced[depth]
+                    state.make_move(move, player)
+
+                    kind = FULL
+                    if pvs or f_reducible[depth]:
+                        kind = self.__first_search(f_reducible[depth] and f_searched[depth] >= lmr_moves,
+                                                   f_best_move[depth] is not None, alpha, beta, player)
+                    f_kind[depth] = kind
+                    if kind != FULL:
+                        alpha, beta = self.__null_window(alpha, beta, player)
+                        if kind == REDUCED:
+                            self.reductions += 1
+                            reduced += lmr_reduction
+
+                    # most children are leaves, which are scored here without entering them
+                    if (self._search_depth - depth - 1 - reduced <= 0 and not extension_plies) or state.is_terminal():
+                        self.nodes_generated += 1
+                        if self.nodes_generated >= self._next_check:
+                            self.__check_limits()
+                        value = state.value / (depth + 1)
+                        action = CHILD_SCORE
+                        continue
+
+                    depth += 1
+                    player = -player
+                    first_move = None
+                    action = ENTER
+
+            if action == FINISH:
+                # every move of the node at depth has been searched, or one caused a cutoff
+                value = f_best_val[depth]
+                self.__store(state, f_remaining[depth], value, f_alpha_orig[depth], f_beta_orig[depth],
+                             f_best_move[depth])
+                action = FINISHED
+                continue
+
+            if action == ENTER:
+                # a node at depth with the window (alpha, beta), player to move, first_move and reduced
+                alpha_orig, beta_orig = alpha, beta
+                value, alpha, beta, remaining, extending = self.__enter_node(state, depth, alpha, beta, player,
+                                                                             first_move, reduced)
+                action = FINISHED
+                if value is not None:
+                    continue
 
-            return best_val
+                # the node has moves to search, so its locals go on the stack
+                f_alpha[depth] = alpha
+                f_beta[depth] = beta
+                f_alpha_orig[depth] = alpha_orig
+                f_beta_orig[depth] = beta_orig
+                f_player[depth] = player
+                f_remaining[depth] = remaining
+                f_reduced[depth] = reduced
+                f_extending[depth] = extending
+                f_reducible[depth] = lmr_moves is not None and depth > 0 and remaining >= LMR_MIN_DEPTH
+                f_searched[depth] = 0
+                f_best_val[depth] = -math.inf if player == 1 else math.inf
+                f_best_move[depth] = None
+                f_index[depth] = 0
+                action = NEXT_MOVE
 
+    def __keep_root_child(self, state: SearchState, score: float):
+        """ Records a searched move of the root as a child of the root node, with its score as alpha. """
+        child = GameTreeNode(list(state.boards), state.board, parent=state.parent)
+        child.alpha = score
+        self._node.children.append(child)
@@ -0,0 +1,365 @@
+import argparse
+import random
+import time
+import numpy as np
+from player.AlphaBeta import AlphaBeta, ALGORITHMS
+from player.BitBoard import BitBoardGame, BitBoardHeuristic
+from player.Game import Game
+from player.GameTreeNode import GameTreeNode
+from player.Heuristic import Heuristic
+from player.MCTS import MCTS
+from player.MoveOrdering import MoveOrdering
+from player.ParallelSearch import ParallelSearch
+from player.Symmetry import canonical_state
+from player.TranspositionTable import TranspositionTable, Zobrist
+
+# Positions from tests/test_alphabeta.py: (global board, board in play)
+POSITIONS = {
+    'opening': (np.array([[0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                          [0, 0, -1, -1, 0, 0, 0, 0, 0, 0],
+                          [0, 0, 0, 0, 0, 1, 0, 0, 0, 0],
+                          [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                          [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                          [0, 1, 0, 0, 0, -1, 0, 0, 0, 0],
+                          [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                          [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                          [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                          [0, 0, 0, 0, 0, 0, 0, 0, 0, 0]], dtype='i1'), 3),
+    'sparse': (np.array([[0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                         [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                         [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                         [0, 0, 0, 0, 0, 0, 0, 1, 0, 0],
+                         [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                         [0, 0, 0, 0, 0, 0, 0, 0, 0, -1],
+                         [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                         [0, -1, 0, -1, 0, 1, 0, 0, 0, 0],
+                         [0, 0, 0, 0, 0, 0, 0, -1, 0, 0],
+                         [0, 0, 0, 0, 0, 0, 0, 1, 0, 0]], dtype='i1'), 1),
+    'midgame': (np.array([[0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                          [0, -1, 0, 1, 0, 0, 0, 1, 0, -1],
+                          [0, 0, 0, 0, -1, 1, 0, -1, 0, 1],
+                          [0, 0, 1, -1, 0, 0, -1, 0, 0, 0],
+                          [0, 0, 0, 0, -1, 1, 0, 0, 1, 0],
+                          [0, 1, 0, 0, 0, -1, -1, 0, 0, 0],
+                          [0, 0, 0, 0, 0, 0, 0, 0, 1, 1],
+                          [0, 0, -1, -1, 1, 0, 0, 0, 0, 0],
+                          [0, 1, -1, 0, 0, 0, 0, 0, -1, 0],
+                          [0, -1, 1, 1, 0, 0, 0, 0, 0, -1]], dtype='i1'), 3),
+    'late': (np.array([[0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                       [0, 1, -1, -1, 0, 1, 0, -1, 0, 0],
+                       [0, 0, 0, 1, -1, 0, -1, 1, 0, 0],
+                       [0, 0, 1, 1, 0, -1, 0, 0, 0, -1],
+                       [0, 0, -1, 0, 1, 0, 0, 0, -1, 0],
+                       [0, -1, 0, 0, 0, 1, 1, -1, 0, -1],
+                       [0, -1, 1, 0, 0, 0, 0, -1, 1, 0],
+                       [0, 1, 0, 0, 0, -1, 1, 0, -1, 1],
+                       [0, 0, 0, 0, -1, 1, 0, 0, 0, 1],
+                       [0, 1, 0, -1, 1, 0, -1, 0, 0, 0]], dtype='i1'), 4),
+}
+
+
+def make_node(game: Game, name: str) -> GameTreeNode:
+    """ Creates the root GameTreeNode of a benchmark position. """
+    boards, curr = POSITIONS[name]
+    return GameTreeNode(np.array([game.board_to_hash(b) for b in boards]), curr)
+
+
+def compare_algorithms(game: Game, heuristic: Heuristic, depth: int):
+    """ Prints the move, node count and time of every search algorithm on every benchmark position.
+
+    Each algorithm runs iterative deepening to depth with a fresh transposition table and move ordering.
+
+    """
+    print("{:<10} {:<10} {:>5} {:>10} {:>9}".format('position', 'algorithm', 'move', 'nodes', 'seconds'))
+    for name in POSITIONS:
+        for algorithm in ALGORITHMS:
+            search = AlphaBeta(make_node(game, name), game, heuristic, depth, tt=TranspositionTable(),
+                               ordering=MoveOrdering(), algorithm=algorithm)
+            start = time.perf_counter()
+            move = search.run_iterative_deepening()
+            elapsed = time.perf_counter() - start
+            print("{:<10} {:<10} {:>5} {:>10} {:>9.3f}".format(name, algorithm, move, search.nodes_generated, elapsed))
+
+
+def representations(game: Game, heuristic: Heuristic, depth: int):
+    """ Prints the nodes per second of the search on the numpy board hashes and on bitboards.
+
+    Both run iterative deepening to depth with a fresh transposition table and move ordering, and should find the
+    same move with the same number of nodes.
+
+    """
+    bit_game = BitBoardGame()
+    bit_heuristic = BitBoardHeuristic()
+    bit_heuristic.load(heuristic)
+
+    print("{:<10} {:<9} {:>5} {:>10} {:>9} {:>12}".format('position', 'board', 'move', 'nodes', 'seconds', 'nodes/s'))
+    for name in POSITIONS:
+        boards, curr = POSITIONS[name]
+        roots = (('numpy', game, heuristic, make_node(game, name)),
+                 ('bitboard', bit_game, bit_heuristic,
+                  GameTreeNode([bit_game.board_to_hash(b) for b in boards], curr)))
+        for label, g, h, node in roots:
+            search = AlphaBeta(node, g, h, depth, tt=TranspositionTable(), ordering=MoveOrdering())
+            start = time.perf_counter()
+            move = search.run_iterative_deepening()
+            elapsed = time.perf_counter() - start
+            print("{:<10} {:<9} {:>5} {:>10} {:>9.3f} {:>12.0f}".format(
+                name, label, move, search.nodes_generated, elapsed, search.nodes_generated / elapsed))
+
+
+def search_drivers(game: Game, heuristic: Heuristic, depth: int):
+    """ Prints the nodes per second of the recursive and the iterative alpha beta search.
+
+    Both run iterative deepening to depth with a fresh transposition table and move ordering, and should find the
+    same move with the same number of nodes.
+
+    """
+    print("{:<10} {:<10} {:>5} {:>10} {:>9} {:>12}".format('position', 'search', 'move', 'nodes', 'seconds', 'nodes/s'))
+    for name in POSITIONS:
+        for label, iterative in (('recursive', False), ('iterative', True)):
+            search = AlphaBeta(make_node(game, name), game, heuristic, depth, tt=TranspositionTable(),
+                               ordering=MoveOrdering(), iterative=iterative)
+            start = time.perf_counter()
+            move = search.run_iterative_deepening()
+            elapsed = time.perf_counter() - start
+            print("{:<10} {:<10} {:>5} {:>10} {:>9.3f} {:>12.0f}".format(
+                name, label, move, search.nodes_generated, elapsed, search.nodes_generated / elapsed))
+
+
+def selective_pruning(game: Game, heuristic: Heuristic, depth: int, lmr_moves: int = None, lmr_reduction: int = 1,
+                      futility_margin: float = None):
+    """ Prints what late move reductions and futility pruning save and how often a reduction had to be searched again.
+
+    Every position is searched by iterative deepening to depth with and without the pruning. A reduction was wrong
+    when the reduced search beat alpha and the move had to be searched again at full depth.
+
+    """
+    print("{:<10} {:>5} {:>5} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+        'position', 'move', 'same', 'full', 'pruned', 'reductions', 're-search', 'futility'))
+    for name in POSITIONS:
+        searches = []
+        for selective in (False, True):
+            kwargs = {'lmr_moves': lmr_moves, 'lmr_reduction': lmr_reduction,
+                      'futility_margin': futility_margin} if selective else {}
+            search = AlphaBeta(make_node(game, name), game, heuristic, depth, tt=TranspositionTable(),
+                               ordering=MoveOrdering(), **kwargs)
+            searches.append((search.run_iterative_deepening(), search))
+
+        (full_move, full), (move, pruned) = searches
+        rate = pruned.reduction_researches / pruned.reductions if pruned.reductions else 0.0
+        print("{:<10} {:>5} {:>5} {:>10} {:>10} {:>10} {:>9.1%} {:>10}".format(
+            name, move, 'yes' if move == full_move else 'no', full.nodes_generated, pruned.nodes_generated,
+            pruned.reductions, rate, pruned.futility_prunes))
+
+
+def frontier_batching(game: Game, heuristic: Heuristic, depth: int):
+    """ Prints the time of iterative deepening to depth with and without the numpy batches of the last two plies.
+
+    Both use a fresh transposition table and move ordering and should find the same move and score. The batched
+    search counts every leaf of a batch as a node, as it does not prune them.
+
+    """
+    print("{:<10} {:<10} {:>5} {:>5} {:>10} {:>10} {:>9} {:>9}".format(
+        'position', 'algorithm', 'move', 'same', 'nodes', 'batched', 'seconds', 'batched'))
+    for name in POSITIONS:
+        for algorithm in ALGORITHMS:
+            results = []
+            for batch in (False, True):
+                search = AlphaBeta(make_node(game, name), game, heuristic, depth, tt=TranspositionTable(),
+                                   ordering=MoveOrdering(), algorithm=algorithm, batch_frontier=batch)
+                start = time.perf_counter()
+                move = search.run_iterative_deepening()
+                results.append((move, search.score, search.nodes_generated, time.perf_counter() - start))
+
+            (move, score, nodes, seconds), (batch_move, batch_score, batch_nodes, batch_seconds) = results
+            same = move == batch_move and score == batch_score
+            print("{:<10} {:<10} {:>5} {:>5} {:>10} {:>10} {:>9.3f} {:>9.3f}".format(
+                name, algorithm, move, 'yes' if same else 'no', nodes, batch_nodes, seconds, batch_seconds))
+
+
+def symmetry_collapse(game: Game, plies: int):
+    """ Prints how many of the positions reachable from the empty board are distinct and how many are left once
+    symmetric positions are counted once (see player.Symmetry.canonical_state).
+
+    The first move may be made on any board, so ply 0 is the empty board with each of the 9 boards in play.
+
+    """
+    zobrist = Zobrist()
+    positions = {((0,) * 10, curr) for curr in range(1, 10)}
+    player = 1
+
+    print("{:<5} {:>10} {:>10} {:>8}".format('ply', 'positions', 'canonical', 'ratio'))
+    for ply in range(plies + 1):
+        keys = {canonical_state(zobrist, state, curr)[0] for state, curr in positions}
+        print("{:<5} {:>10} {:>10} {:>7.2f}x".format(ply, len(positions), len(keys), len(positions) / len(keys)))
+        if ply == plies:
+            break
+
+        children = set()
+        for state, curr in positions:
+            for cell in game.legal_moves(state, curr):
+                child = list(state)
+                child[curr] = game.play_move(state[curr], cell, player)
+                if not game.is_win(child[curr]):
+                    children.add((tuple(child), cell))
+        positions = children
+        player = -player
+
+
+def parallel_speedup(game: Game, heuristic: Heuristic, depth: int, workers=(1, 2, 4, 8)):
+    """ Prints the time of a fixed depth root-parallel search on every benchmark position for each worker count.
+
+    The pool is started (and the tables loaded) before the clock starts.
+
+    """
+    print("{:<8} {:>10} {:>9} {:>8}".format('workers', 'nodes', 'seconds', 'speedup'))
+    baseline = None
+    for count in workers:
+        with ParallelSearch(count) as search:
+            # warm the pool up so that every worker has loaded its tables
+            search.run(make_node(game, 'late'), game, 2)
+
+            nodes = 0
+            start = time.perf_counter()
+            for name in POSITIONS:
+                search.run(make_node(game, name), game, depth)
+                nodes += search.nodes_generated
+            elapsed = time.perf_counter() - start
+
+        baseline = baseline or elapsed
+        print("{:<8} {:>10} {:>9.3f} {:>7.2f}x".format(count, nodes, elapsed, baseline / elapsed))
+
+
+def play_match(agent_a, agent_b, games: int, seed: int = 0):
+    """ Plays games between two agents without the server.
+
+    The agents take turns to move first. The first move of every game is random, like the server's.
+
+    Returns:
+        Tuple (games won by agent_a, games won by agent_b, draws).
+
+    """
+    rng = random.Random(seed)
+    results = [0, 0, 0]
+
+    for g in range(games):
+        first, second = (agent_a, agent_b) if g % 2 == 0 else (agent_b, agent_a)
+        sign = {id(first): 1, id(second): -1}
+        first.parse("start(x)")
+        second.parse("start(o)")
+
+        boards = np.zeros((10, 10), dtype='i1')
+        curr, move = rng.randint(1, 9), rng.randint(1, 9)
+        first.place(curr, move, first._player)
+        boards[curr][move] = 1
+
+        mover, reply = second, second.parse("second_move({},{})".format(curr, move))
+        curr = move
+        while True:
+            boards[curr][reply] = sign[id(mover)]
+            if Game.is_terminal_node(boards[curr]):
+                results[0 if mover is agent_a else 1] += 1
+                break
+
+            curr = reply
+            if not (boards[curr][1:] == 0).any():
+                results[2] += 1
+                break
+
+            mover = first if mover is second else second
+            reply = mover.parse("next_move({})".format(reply))
+
+    return tuple(results)
+
+
+def tree_reuse(game: Game, heuristic: Heuristic, depth: int, games: int = 1):
+    """ Prints the nodes every move takes with and without re-rooting on the previous principal variation.
+
+    For each game, two agents, one of each kind, play the same opponent from the same random first move. Moves are
+    compared until the games differ, which can happen when two root moves have the same score.
+
+    """
+    from agent import Agent
+
+    print("{:<5} {:<5} {:>10} {:>10} {:>8} {:>7}".format('game', 'move', 'fresh', 're-rooted', 'saved', 'seeded'))
+    total_fresh = total_reused = 0
+    for g in range(games):
+        logs = []
+        for reuse in (False, True):
+            agent = Agent(game, heuristic, depth, endgame_empty_cells=0, reuse_tree=reuse)
+            play_match(agent, Agent(game, heuristic, depth, endgame_empty_cells=0), 1, seed=g)
+            logs.append(agent._search_log)
+
+        for i, (fresh, reused) in enumerate(zip(*logs), 1):
+            if fresh[0] != reused[0]:
+                print("{:<5} games differ from move {}".format(g, i))
+                break
+
+            total_fresh += fresh[1]
+            total_reused += reused[1]
+            print("{:<5} {:<5} {:>10} {:>10} {:>8} {:>7}".format(g, i, fresh[1], reused[1], fresh[1] - reused[1],
+                                                               'yes' if reused[2] else 'no'))
+
+    print("total {:>16} {:>10} {:>8}".format(total_fresh, total_reused, total_fresh - total_reused))
+
+
+def mcts_vs_alphabeta(game: Game, heuristic: Heuristic, games: int, time_limit: float):
+    """ Prints MCTS playouts per second and the result of a match against alpha beta at the same time per move. """
+    from agent import Agent
+
+    for name in POSITIONS:
+        search = MCTS(game, heuristic, time_limit)
+        node = make_node(game, name)
+        search.set_root(node.state, node.get_board_num())
+        search.run()
+        print("{:<10} {:>8.0f} playouts per second".format(name, search.playouts_per_second))
+
+    mcts = Agent(game, heuristic, time_limit=time_limit, engine='mcts')
+    alphabeta = Agent(game, heuristic, depth=20, time_limit=time_limit)
+
+    mcts_wins, alphabeta_wins, draws = play_match(mcts, alphabeta, games)
+
+    print("MCTS {} - {} alpha beta, {} draws ({:.2f}s per move)".format(mcts_wins, alphabeta_wins, draws,
+                                                                       time_limit))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search benchmarks on fixed positions")
+    parser.add_argument('--depth', type=int, default=7)
+    parser.add_argument('--parallel', action='store_true', help="measure the root-parallel search speedup")
+    parser.add_argument('--bitboard', action='store_true', help="compare the numpy and bitboard representations")
+    parser.add_argument('--mcts', type=int, metavar='GAMES', help="play MCTS against alpha beta")
+    parser.add_argument('--iterative', action='store_true', help="compare the recursive and iterative searches")
+    parser.add_argument('--batch', action='store_true', help="compare searches with and without frontier batches")
+    parser.add_argument('--lmr', type=int, metavar='MOVES', help="late move reductions after MOVES moves")
+    parser.add_argument('--lmr-reduction', type=int, default=1)
+    parser.add_argument('--futility', type=float, metavar='MARGIN', help="futility pruning margin")
+    parser.add_argument('--reuse', type=int, metavar='GAMES', help="measure the nodes saved by re-rooting between moves")
+    parser.add_argument('--symmetry', type=int, metavar='PLIES',
+                        help="count the positions up to PLIES that symmetry collapses")
+    parser.add_argument('--time-limit', type=float, default=0.5, help="seconds per move for --mcts")
+    args = parser.parse_args()
+
+    g = Game()
+    h = Heuristic()
+    g.load()
+    h.load()
+
+    if args.parallel:
+        parallel_speedup(g, h, args.depth)
+    elif args.bitboard:
+        representations(g, h, args.depth)
+    elif args.iterative:
+        search_drivers(g, h, args.depth)
+    elif args.batch:
+        frontier_batching(g, h, args.depth)
+    elif args.lmr is not None or args.futility is not None:
+        selective_pruning(g, h, args.depth, args.lmr, args.lmr_reduction, args.futility)
+    elif args.reuse:
+        tree_reuse(g, h, args.depth, args.reuse)
+    elif args.symmetry is not None:
+        symmetry_collapse(g, args.symmetry)
+    elif args.mcts:
+        mcts_vs_alphabeta(g, h, args.mcts, args.time_limit)
+    else:
+        compare_algorithms(g, h, args.depth)
@@ -0,0 +1,214 @@
+import numpy as np
+from player.GameTreeNode import GameTreeNode
+from player.Heuristic import Heuristic
+
+# A bitboard packs a sub-board into one int: bit c-1 is set if player 1 holds cell c (the X mask) and bit c+8 if
+# player -1 holds it (the O mask). PLAYER_BIT[cell][player] is the bit placing player in cell sets, so that
+# play_move has the same form as with the base 3 hashes of player.Game.
+FULL = 0x1FF
+PLAYER_BIT = [[0, 1 << (cell - 1), 1 << (cell + 8)] if cell else [0, 0, 0] for cell in range(10)]
+
+# Rows, columns and diagonals as 9-bit masks
+LINES = tuple(sum(1 << (c - 1) for c in line) for line in ((1, 2, 3), (4, 5, 6), (7, 8, 9), (1, 4, 7), (2, 5, 8),
+                                                          (3, 6, 9), (1, 5, 9), (3, 5, 7)))
+
+# Weight of each cell in a 9-bit mask, used to pack numpy boards
+CELL_BITS = 1 << np.arange(9)
+
+
+def _mask_tables():
+    """ Builds the tables indexed by a 9-bit mask.
+
+    Returns:
+        Tuple (cells, wins, threats): the cells (1-9) set in the mask, whether the mask has three in a row, and the
+        mask of the cells that would complete three in a row if added to the mask.
+
+    """
+    cells = [tuple(c for c in range(1, 10) if mask >> (c - 1) & 1) for mask in range(FULL + 1)]
+    wins = [any(mask & line == line for line in LINES) for mask in range(FULL + 1)]
+    threats = [sum(1 << (c - 1) for c in range(1, 10) if wins[mask | 1 << (c - 1)]) for mask in range(FULL + 1)]
+    return cells, wins, threats
+
+
+CELLS, WINS, THREATS = _mask_tables()
+
+
+def _base3_to_bitboard():
+    """ Maps every base 3 board hash of player.Game to its bitboard. """
+    bitboards = [0]
+    for cell in range(9, 0, -1):
+        # cell 9 is the least significant base 3 digit, so prepending a digit for each cell in reverse order
+        # enumerates the hashes in increasing order
+        bitboards = [b | PLAYER_BIT[cell][player] for player in (0, 1, -1) for b in bitboards]
+    return bitboards
+
+
+# BASE3_TO_BITBOARD[board_hash] is the bitboard of a base 3 board hash
+BASE3_TO_BITBOARD = _base3_to_bitboard()
+
+
+class BitBoardGame:
+    """ Game on bitboards. Same interface as player.Game, with bitboards in place of the base 3 board hashes.
+
+    Every query is a lookup into tables indexed by a 9-bit mask of one player's pieces or of the empty cells, so
+    there is nothing to load. The global state is a list of the 10 bitboards, and generating a move sets a single
+    bit instead of going through a numpy board and the bytes-keyed hash dict.
+
+    """
+
+    def load(self):
+        """ Present for compatibility with Game. The tables are built when the module is imported. """
+        pass
+
+    @staticmethod
+    def board_to_hash(board: np.ndarray) -> int:
+        """ Returns the bitboard of a board.
+
+        Arguments:
+            board (numpy array): Numpy array of shape (10,) representing state of a board.
+
+        """
+        cells = board[1:]
+        return int(CELL_BITS @ (cells == 1)) | int(CELL_BITS @ (cells == -1)) << 9
+
+    @staticmethod
+    def hash_to_board(board_hash: int) -> np.ndarray:
+        """ Converts a bitboard back into a numpy board of shape (10,). """
+        board = np.zeros(10, dtype='i1')
+        board[list(CELLS[board_hash & FULL])] = 1
+        board[list(CELLS[board_hash >> 9])] = -1
+        return board
+
+    @staticmethod
+    def play_move(board_hash: int, cell: int, player: int) -> int:
+        """ Returns the bitboard of a board after player places a piece in an empty cell.
+
+        Arguments:
+            board_hash (int): Bitboard before the move.
+            cell (int): Empty cell (1-9) the piece is placed in.
+            player (int): 1 or -1.
+
+        """
+        return board_hash | PLAYER_BIT[cell][player]
+
+    @staticmethod
+    def is_win(board_hash: int) -> bool:
+        """ Checks if a board has three in a row.
+
+        Arguments:
+            board_hash (int): Bitboard of the board.
+
+        """
+        return WINS[board_hash & FULL] or WINS[board_hash >> 9]
+
+    @staticmethod
+    def empty_cells(board_hash: int):
+        """ Returns the empty cells of a board as a tuple of ints (1-9) in cell order. """
+        return CELLS[FULL & ~(board_hash | board_hash >> 9)]
+
+    @staticmethod
+    def winning_cells(board_hash: int, player: int):
+        """ Returns the empty cells of a board where player would complete three in a row.
+
+        Arguments:
+            board_hash (int): Bitboard of the board.
+            player (int): 1 or -1.
+
+        Returns:
+            Tuple of ints (1-9) in cell order.
+
+        """
+        own = board_hash & FULL if player == 1 else board_hash >> 9
+        return CELLS[THREATS[own] & FULL & ~(board_hash | board_hash >> 9)]
+
+    def is_terminal(self, node: GameTreeNode):
+        """ Checks if the board the last move was made on has three in a row.
+
+        Arguments:
+            node (GameTreeNode): The node that represents current board state.
+
+        """
+        if not node.parent:
+            board_hash = node.board
+        else:
+            board_hash = node.state[node.parent]
+
+        return WINS[board_hash & FULL] or WINS[board_hash >> 9]
+
+    def legal_moves(self, state, curr_board: int):
+        """ Returns the empty squares of the board in play as a list of ints (1-9) in cell order.
+
+        Arguments:
+            state (list of int): The 10 bitboards of the global state.
+            curr_board (int): The current board that the next player must be made on.
+
+        """
+        return list(self.empty_cells(state[curr_board]))
+
+    def generate_moves(self, state, curr_board: int, player: int, moves=None):
+        """ Generates the children of a position, one per empty square of the board in play.
+
+        As with Game.generate_moves the children share one copy of the state, so a child is only valid until the
+        next one is generated.
+
+        Arguments:
+            state (list of int): The 10 bitboards of the global state.
+            curr_board (int): The current board that the next player must be made on.
+            player (int): The current player.
+            moves (list of int, optional): Empty squares in the order they should be generated. Defaults to cell order.
+
+        """
+        updated_state = list(state)
+        board_hash = updated_state[curr_board]
+
+        if moves is None:
+            moves = CELLS[FULL & ~(board_hash | board_hash >> 9)]
+
+        for i in moves:
+            updated_state[curr_board] = board_hash | PLAYER_BIT[i][player]
+            yield GameTreeNode(updated_state, i, parent=curr_board)
+
+        updated_state[curr_board] = board_hash
+
+
+class BitBoardHeuristic:
+    """ Heuristic of a global state of bitboards.
+
+    The values are the precalculated board heuristics of player.Heuristic, moved from base 3 hashes to a list indexed
+    by bitboard.
+
+    """
+
+    def __init__(self):
+        self._values = None
+
+    def load(self, heuristic: Heuristic = None):
+        """ Builds the value list from a Heuristic, or from a default one loaded from disk.
+
+        Arguments:
+            heuristic (Heuristic, optional): Heuristic with the parameters to use. Loaded if needed.
+
+        """
+        if heuristic is None:
+            heuristic = Heuristic()
+        heuristic.load()
+
+        values = [0] * (1 << 18)
+        for board_hash, bitboard in enumerate(BASE3_TO_BITBOARD):
+            values[bitboard] = heuristic.board_heuristic(board_hash)
+        self._values = values
+
+    def board_heuristic(self, board_hash: int) -> int:
+        """ Returns the precalculated heuristic value of a single bitboard. """
+        return self._values[board_hash]
+
+    def compute_heuristic(self, global_board, depth: int) -> float:
+        """ Calculates the total heuristic value for the global board, as Heuristic.compute_heuristic.
+
+        Arguments:
+            global_board (list of int): The 10 bitboards of the global state.
+            depth (int): Depth that heuristic was calculated at.
+
+        """
+        values = self._values
+        return sum([values[b] for b in global_board]) / depth
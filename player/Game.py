@@ -1,11 +1,29 @@
-import itertools
 import os
-import pickle
 import numpy as np
 from player.GameTreeNode import GameTreeNode
+from player.TableCache import TableCache, fingerprint
 
 SAVE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# A board's hash is its base 3 number with cell 1 as the most significant digit and digits 0 (empty), 1 (player 1)
+# and 2 (player -1). PLAYER_DIGIT[cell][player] is what placing player in cell adds to the hash.
+PLAYER_DIGIT = [[0, 3 ** (9 - cell), 2 * 3 ** (9 - cell)] for cell in range(10)]
+
+# Weight of each cell's digit in the hash. The digit of a cell value is the value modulo 3, so -1 is digit 2
+CELL_WEIGHTS = np.array([0] + [3 ** (9 - cell) for cell in range(1, 10)], dtype=np.int64)
+
+# Number of distinct board hashes
+NUM_HASHES = 3 ** 9
+
+# Entry of the child hash table for a cell that is not empty (or cell and player index 0)
+NO_MOVE = -1
+
+# Rows, columns and diagonals of a board
+LINES = ((1, 2, 3), (4, 5, 6), (7, 8, 9), (1, 4, 7), (2, 5, 8), (3, 6, 9), (1, 5, 9), (3, 5, 7))
+
+# Fingerprint of everything the Game tables are built from
+GAME_FINGERPRINT = fingerprint(PLAYER_DIGIT, LINES, NO_MOVE)
+
 
 class ClassNotLoaded(Exception):
     """ Exception that is thrown when pre-generated files cannot be loaded form the current directory.
@@ -17,44 +35,89 @@ class ClassNotLoaded(Exception):
 class Game:
     """ Checks state of GameTreeNodes and generates Children.
 
+    The tables are dense numpy arrays indexed by board hash, memory-mapped from a TableCache and rebuilt there when
+    they are missing or out of date. load() only maps the tables the search needs. The others are mapped the first
+    time they are used.
+
     Attributes:
-        _win_states (dict of int: bool): Dictionary that maps board states (hashed) to a bool value
-        _board_hashs (dict of str: int): Dictionary that maps board states to a hash value
-        _hash_to_board (dict of int: str): Dictionary that maps board hashes (int) to their board state.
+        cache (TableCache): Cache the tables are loaded from.
+        win_states (numpy array): Bool table, True if the board of a hash has three in a row.
+        empty_masks (numpy array): Bit c of empty_masks[board_hash] is set if cell c is empty.
 
     """
 
-    def __init__(self):
-        self._win_states = None
-        self._board_hashes = None
-        self._hash_to_board = None
+    def __init__(self, cache: TableCache = None):
+        self.cache = cache if cache is not None else TableCache()
+        self._winning_cells = {1: {}, -1: {}}
+
+        self.win_states = None
+        self.empty_masks = None
+        self._boards = None
+        self._child_hash = None
+        self._child_wins = None
+
+        # every table, when one had to be built
+        self._built = None
+
+        # Python list views of the tables for the per-node lookups of the search
+        self._wins = None
+        self._empty_cells = None
 
     def load(self):
         """ Loads necessary precomputed values into class for later access """
-        if not self._win_states:
-            try:
-                # load board dict mapping numpy board states -> internal hash value
-                with open(os.path.join(SAVE_PATH, 'board_hashes.pickle'), 'rb') as file:
-                    self._board_hashes = pickle.load(file)
+        if self._wins is None:
+            self.win_states = self.__load_table('win_states')
+            self.empty_masks = self.__load_table('empty_masks')
+
+            self._wins = self.win_states.tolist()
+            cells_of_mask = [tuple(c for c in range(1, 10) if mask >> c & 1) for mask in range(1 << 10)]
+            self._empty_cells = [cells_of_mask[mask] for mask in self.empty_masks.tolist()]
+
+    @property
+    def boards(self) -> np.ndarray:
+        """ Numpy array: Table of shape (NUM_HASHES, 10) of the board of every hash. """
+        if self._boards is None:
+            self._boards = self.__load_table('boards')
+        return self._boards
+
+    @property
+    def child_hash(self) -> np.ndarray:
+        """ Numpy array: Dense table indexed by [board_hash, cell, player] of the hash after the move, or NO_MOVE if
+        the cell is not empty. Player -1 is index 2.
 
-                # load heuristic_values dict mapping hash values -> heuristic values
-                with open(os.path.join(SAVE_PATH, 'win_states.pickle'), 'rb') as file:
-                    self._win_states = pickle.load(file)
+        """
+        if self._child_hash is None:
+            self._child_hash = self.__load_table('child_hash')
+        return self._child_hash
+
+    @property
+    def child_wins(self) -> np.ndarray:
+        """ Numpy array: Dense bool table indexed by [board_hash, cell, player], True if the move makes three in a
+        row.
 
-            except FileNotFoundError:
-                self.__precompute_board_hash()
-                self.__precompute_win_states()
+        """
+        if self._child_wins is None:
+            self._child_wins = self.__load_table('child_wins')
+        return self._child_wins
 
-            self._hash_to_board = {v: k for k, v in self._board_hashes.items()}
+    def __load_table(self, name: str) -> np.ndarray:
+        """ Maps one of the tables, building all of them once if it is out of date. """
+        def build():
+            if self._built is None:
+                self._built = self.__precompute_tables()
+            return self._built[name]
 
-    def board_to_hash(self, board: np.ndarray):
+        return self.cache.load(name, GAME_FINGERPRINT, build)
+
+    @staticmethod
+    def board_to_hash(board: np.ndarray) -> int:
         """ Returns the corresponding hash value for a board
 
         Arguments:
             board (numpy array): Numpy array representing state of a board.
 
         """
-        return self._board_hashes[board.tostring()]
+        return int(CELL_WEIGHTS @ (board % 3))
 
     def hash_to_board(self, hash: int):
         """ Converts a hash value back into its original board
@@ -66,7 +129,59 @@ class Game:
              Read-only numpy array
 
         """
-        return np.frombuffer(self._hash_to_board[hash], dtype='i1')
+        return self.boards[hash]
+
+    @staticmethod
+    def play_move(board_hash: int, cell: int, player: int) -> int:
+        """ Returns the hash of a board after player places a piece in an empty cell.
+
+        Arguments:
+            board_hash (int): Hash of the board before the move.
+            cell (int): Empty cell (1-9) the piece is placed in.
+            player (int): 1 or -1.
+
+        """
+        return board_hash + PLAYER_DIGIT[cell][player]
+
+    def is_win(self, board_hash: int) -> bool:
+        """ Checks if a board has three in a row.
+
+        Arguments:
+            board_hash (int): Int value that represents a particular board state.
+
+        """
+        return self._wins[board_hash]
+
+    def empty_cells(self, board_hash: int):
+        """ Returns the empty cells of a board.
+
+        Arguments:
+            board_hash (int): Int value that represents a particular board state.
+
+        Returns:
+            Tuple of ints (1-9) in cell order.
+
+        """
+        return self._empty_cells[board_hash]
+
+    def winning_cells(self, board_hash: int, player: int):
+        """ Returns the empty cells of a board where player would complete three in a row. Results are cached.
+
+        Arguments:
+            board_hash (int): Int value that represents a particular board state.
+            player (int): 1 or -1.
+
+        Returns:
+            Tuple of ints (1-9) in cell order.
+
+        """
+        cache = self._winning_cells[player]
+        cells = cache.get(board_hash)
+        if cells is None:
+            wins = self.child_wins[board_hash, :, player]
+            cells = tuple(c for c in self._empty_cells[board_hash] if wins[c])
+            cache[board_hash] = cells
+        return cells
 
     def is_terminal(self, node: GameTreeNode):
         """ Checks if there is a terminal node in a given board.
@@ -83,7 +198,7 @@ class Game:
         else:
             board = node.state[node.parent]
 
-        return self._win_states[board]
+        return self._wins[board]
 
     @staticmethod
     def is_terminal_node(board: np.ndarray):
@@ -108,76 +223,77 @@ class Game:
         diagonals = any([check_equal(board[[1, 5, 9]]), check_equal(board[[3, 5, 7]])])
         return any([rows, columns, diagonals])
 
-    def __precompute_board_hash(self):
-        """ Function generates a dictionary containing all possible board variations and assigns each board a hash
-            The hash value is used to represent the board during the search and for calculating the heuristic without
-            having the need to store the entire board.
+    @staticmethod
+    def __precompute_tables():
+        """ Builds the tables of every board hash.
+
+        Returns:
+            Dictionary of the tables by name.
 
         """
-        # generate all possible states
-        num_to_select = 9  # number of squares in tic-tac-toe board
-        possible_values = [0, 1, -1]
-        result = itertools.product(possible_values, repeat=num_to_select)  # creates a generator
+        hashes = np.arange(NUM_HASHES)
 
-        board_hash = {}
-        for counter, i in enumerate(result):
-            i = list(i)
-            i.insert(0, 0)  # add leading zero to match formatting of np.array in agent.py
-            if i.count(1) < 5 or i.count(-1) < 5:
-                # creates dictionary mapping board states to a unique hash value
-                board_hash[np.array(i, dtype='i1').tostring()] = counter
+        # digits[h, c] is the base 3 digit of cell c in hash h. Column 0 is unused and never empty
+        digits = np.ones((NUM_HASHES, 10), dtype=np.int64)
+        for cell in range(1, 10):
+            digits[:, cell] = hashes // 3 ** (9 - cell) % 3
+        empty = digits == 0
 
-        with open(os.path.join(SAVE_PATH, 'board_hashes.pickle'), 'wb') as file:
-            pickle.dump(board_hash, file)
+        boards = np.where(digits == 2, -1, digits).astype('i1')
+        boards[:, 0] = 0
 
-        self._board_hashes = board_hash
+        wins = np.zeros(NUM_HASHES, dtype=bool)
+        for a, b, c in LINES:
+            wins |= (boards[:, a] != 0) & (boards[:, a] == boards[:, b]) & (boards[:, a] == boards[:, c])
 
+        child_hash = hashes[:, None, None] + np.array(PLAYER_DIGIT)[None, :, :]
+        child_hash[:, :, 0] = NO_MOVE
+        child_hash[~empty] = NO_MOVE
+        child_hash = child_hash.astype(np.int32)
+        child_wins = (child_hash != NO_MOVE) & wins[np.maximum(child_hash, 0)]
+        empty_masks = (empty << np.arange(10)).sum(axis=1).astype(np.uint16)
 
-    def __precompute_win_states(self):
-        """ Precomputes all possible win states and stores them into a hash for faster computation. """
-        if not self._board_hashes:
-            raise FileNotFoundError("board_hashes.pickle was not generated or found.")
+        return {'boards': boards, 'win_states': wins, 'child_hash': child_hash, 'child_wins': child_wins,
+                'empty_masks': empty_masks}
 
-        win_states_dict = {}
+    def legal_moves(self, state: np.ndarray, curr_board: int):
+        """ Returns the empty squares of the board in play.
 
-        for board, hash_value in self._board_hashes.items():
-            win_states_dict[hash_value] = Game.is_terminal_node(np.frombuffer(board, dtype='i1'))
+        Arguments:
+            state (numpy array): Numpy array representing current state of the game.
+            curr_board (int): The current board that the next player must be made on.
 
-        with open(os.path.join(SAVE_PATH, 'win_states.pickle'), 'wb') as file:
-            pickle.dump(win_states_dict, file)
+        Returns:
+            List of ints (1-9) in cell order.
 
-        self._win_states = win_states_dict
+        """
+        return list(self.empty_cells(state[curr_board]))
 
-    def generate_moves(self, state: np.ndarray, curr_board: int, player: int):
+    def generate_moves(self, state: np.ndarray, curr_board: int, player: int, moves=None):
         """ Generates all possible moves for current player by looking at empty squares as potential moves
             Player 1 = 1, Player 2 = -1.
 
+        The hash of each child board is one addition to the parent hash, and the children share one copy of the global
+        state, so a child is only valid until the next one is generated.
+
         Arguments:
             state (numpy array): Numpy array representing current state of the game.
             curr_board (int): The current board that the next player must be made on.
             player (int): The current player.
+            moves (list of int, optional): Empty squares in the order they should be generated. Defaults to cell order.
 
         """
-        # create local copy current board in play
-        board = np.frombuffer(self._hash_to_board[state[curr_board]], dtype='i1')  # read-only
-        modifiable_board = np.empty_like(board)
-        modifiable_board[:] = board
+        board_hash = int(state[curr_board])
 
         # create a local copy of the global state
-        updated_state = np.empty_like(state)
-        updated_state[:] = state
-
-        for i in np.where(modifiable_board == 0)[0][1:]:
-            # set board
-            modifiable_board[i] = player
+        updated_state = state.copy()
 
-            # create a copy of global state and pass that down to the child
-            prev_board = updated_state[curr_board]
-            updated_state[curr_board] = self.board_to_hash(modifiable_board)
+        if moves is None:
+            moves = self._empty_cells[board_hash]
 
+        for i in moves:
+            updated_state[curr_board] = board_hash + PLAYER_DIGIT[i][player]
             yield GameTreeNode(updated_state, i, parent=curr_board)
 
-            # reset board
-            modifiable_board[i] = 0
-            updated_state[curr_board] = prev_board
+        updated_state[curr_board] = board_hash
 
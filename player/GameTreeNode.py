@@ -13,6 +13,8 @@ class GameTreeNode:
 
     """
 
+    __slots__ = ('_state', '_board', '_parent', '_children', '_alpha')
+
     def __init__(self, state: np.ndarray, board: int, parent=None):
 
         self._state = state
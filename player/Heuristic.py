@@ -1,10 +1,14 @@
 import numpy as np
-import itertools
-import pickle
-import os
 from typing import Tuple
+from player.Game import CELL_WEIGHTS, LINES, NUM_HASHES
+from player.TableCache import TableCache, fingerprint
 
-SAVE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Columns of the feature table: the number of lines of a board in each state
+FEATURES = ('winner', 'loser', 'my_two', 'my_one', 'opp_two', 'opp_one')
+
+# Name of the feature table and fingerprint of everything it is built from
+FEATURE_TABLE = 'heuristic_features'
+FEATURE_FINGERPRINT = fingerprint(FEATURE_TABLE, FEATURES, LINES, CELL_WEIGHTS.tolist())
 
 
 class Heuristic:
@@ -61,13 +65,21 @@ class Heuristic:
         influence on the overall heuristic value).
 
     Attributes:
-        _precalc_boards (dict[int: int]): Maps board hash to a precalculated heuristic value.
+        cache (TableCache): Cache the feature table is loaded from.
+        _features (numpy array): Memory-mapped table of shape (NUM_HASHES, 6) of the FEATURES of every board hash.
+        _precalc_boards (numpy array): Precalculated heuristic value of every board hash, the product of the
+            feature table and the parameters.
 
     """
 
-    def __init__(self):
+    def __init__(self, cache: TableCache = None):
+        self.cache = cache if cache is not None else TableCache()
+        self._features = None
         self._precalc_boards = None
 
+        # Python list view of _precalc_boards for the per-node lookups of the search
+        self._values = None
+
         # Parameters that affect heuristic. These are the default values
         self._alpha = 45
         self._beta = 10
@@ -79,17 +91,12 @@ class Heuristic:
     def load(self):
         """ Loads hashed heuristic files used during search to minimise computation """
 
-        if not self._precalc_boards:
-            try:
-                # load heuristic_values dict mapping hash values -> heuristic values
-                with open(os.path.join(SAVE_PATH, 'heuristic_values.pickle'), 'rb') as file:
-                    self._precalc_boards = pickle.load(file)
-
-            except FileNotFoundError as e:
-                self.__precompute_heuristic_values()
+        if self._features is None:
+            self._features = self.cache.load(FEATURE_TABLE, FEATURE_FINGERPRINT, self.__precompute_features)
+            self.__compute_values()
 
     def set_params(self, alpha: int, beta: int, gamma: int, delta: int, win: int, lose: int):
-        """ Sets parameters for heuristic function """
+        """ Sets parameters for heuristic function. Values that were already loaded are recomputed for them. """
 
         self._alpha = alpha
         self._beta = beta
@@ -98,6 +105,61 @@ class Heuristic:
         self._win = win
         self._lose = lose
 
+        if self._features is not None:
+            self.__compute_values()
+
+    def weights(self) -> np.ndarray:
+        """ Returns the weight of each of the FEATURES in the heuristic value of a board. """
+        return np.array([self._win, self._lose, self._alpha, self._beta, -self._gamma, -self._delta])
+
+    def __compute_values(self):
+        """ Computes the heuristic value of every board from the feature table and the parameters. """
+        self._precalc_boards = self._features @ self.weights()
+        self._values = self._precalc_boards.tolist()
+
+    @staticmethod
+    def __precompute_features() -> np.ndarray:
+        """ Counts the lines of every board hash in each of the FEATURES.
+
+        A line with pieces of only one player counts as one, two or three (a win) of that player, matching the
+        __calculate_* functions below.
+
+        Returns:
+            Numpy array of shape (NUM_HASHES, 6).
+
+        """
+        hashes = np.arange(NUM_HASHES)[:, None]
+        digits = np.zeros((NUM_HASHES, 10), dtype=np.int64)
+        digits[:, 1:] = hashes // CELL_WEIGHTS[1:] % 3
+
+        features = np.zeros((NUM_HASHES, len(FEATURES)), dtype=np.int8)
+        for line in LINES:
+            mine = (digits[:, line] == 1).sum(axis=1)
+            theirs = (digits[:, line] == 2).sum(axis=1)
+
+            features[:, 0] += mine == 3
+            features[:, 1] += theirs == 3
+            features[:, 2] += (mine == 2) & (theirs == 0)
+            features[:, 3] += (mine == 1) & (theirs == 0)
+            features[:, 4] += (theirs == 2) & (mine == 0)
+            features[:, 5] += (theirs == 1) & (mine == 0)
+
+        return features
+
+    @property
+    def board_values(self) -> np.ndarray:
+        """ Numpy array: Heuristic value of every board hash, for scoring many boards at once. """
+        return self._precalc_boards
+
+    def board_heuristic(self, board_hash: int) -> int:
+        """ Returns the precalculated heuristic value of a single board.
+
+        Arguments:
+            board_hash (int): Hash of the board, as in Game.
+
+        """
+        return self._values[board_hash]
+
     @staticmethod
     def calculate_diagonal(board: np.ndarray) -> Tuple[int, int, int, int, int, int]:
         """ Calculates the heuristic value for each diagonal in a Tic-Tac-Toe board.
@@ -329,6 +391,9 @@ class Heuristic:
         gamma, delta, win and lose- which are stored as global variables above. We multiply in the form of
         heuristic = win*winner + lose*loser + alpha*my_two + beta*my_one - gamma*opp_two - delta*opp_one.
 
+        The values used by the search come from the feature table instead, which counts the same lines for every board
+        at once. This function is kept as the reference they are checked against.
+
         Args:
             board (numpy.ndarray): Numpy Representation of a single Tic-Tac-Toe board with shape (10,)
 
@@ -369,24 +434,5 @@ class Heuristic:
             heuristic (float): Heuristic value of the global board
 
         """
-        return sum([self._precalc_boards[b] for b in global_board]) / depth
-
-    def __precompute_heuristic_values(self):
-        """ Precomputes heuristic values and saves them into a file for later access. """
-
-        # generate all possible boards
-        result = itertools.product([0, 1, -1], repeat=9)  # creates a generator
-
-        heuristic_dict = {}
-        for counter, i in enumerate(result):
-            i = list(i)
-            i.insert(0, 0)  # add leading zero to match formatting of np.array in agent.py
-            if i.count(1) < 5 or i.count(-1) < 5:
-                heuristic_dict[counter] = self.__calculate_board_heuristic(np.array(i, dtype='i1'))
-
-        with open(os.path.join(SAVE_PATH, 'heuristic_values.pickle'), 'wb') as file:
-            pickle.dump(heuristic_dict, file)
-
-        self._precalc_boards = heuristic_dict
-
-
+        values = self._values
+        return sum([values[b] for b in global_board]) / depth
@@ -0,0 +1,221 @@
+import math
+import random
+import time
+from typing import Tuple
+from player.Game import Game
+from player.Heuristic import Heuristic
+
+# Heuristic values are divided by this before the logistic function when used as priors
+PRIOR_SCALE = 200
+
+# Result of a playout from the point of view of the player who made the move into a node
+WIN = 1.0
+DRAW = 0.5
+LOSS = 0.0
+
+
+class MCTSNode:
+    """ Node of the Monte Carlo search tree.
+
+    Arguments:
+        state (tuple of int): Hashes of the 10 boards.
+        board (int): The board the next move has to be made on.
+        player (int): The player that made the move into this node (1 or -1).
+        move (int, optional): The cell that was played to reach this node.
+        parent (MCTSNode, optional): The node the move was made from.
+
+    """
+
+    __slots__ = ('state', 'board', 'player', 'move', 'parent', 'children', 'untried', 'visits', 'wins', 'result')
+
+    def __init__(self, state: Tuple[int, ...], board: int, player: int, move: int = None, parent: 'MCTSNode' = None):
+        self.state = state
+        self.board = board
+        self.player = player
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.untried = None
+        self.visits = 0
+        self.wins = 0.0
+
+        # WIN if the move into this node won the game, DRAW if it sent the opponent to a full board
+        self.result = None
+
+
+class MCTS:
+    """ Monte Carlo Tree Search (UCT) engine. An alternative to AlphaBeta.
+
+    Playouts play random moves until a sub-board is won or a player is sent to a full board (a draw), using the
+    precomputed win states of Game. Nodes can optionally start with virtual visits whose win rate comes from the
+    Heuristic value of the position. The tree is kept between moves: set_root() reuses the subtree of the new position
+    when it is a child or grandchild of the previous root.
+
+    Attributes:
+        game (Game): Game class instance.
+        eval_cls (Heuristic): Heuristic class instance, used for priors.
+        time_limit (float): Seconds per call to run().
+        exploration (float): UCT exploration constant.
+        prior_visits (int): Virtual visits given to new nodes from the heuristic. 0 disables priors.
+        iteration_limit (int, optional): Maximum playouts per call to run().
+        playouts (int): Number of playouts done by the last call to run().
+        playouts_per_second (float): Playout rate of the last call to run().
+
+    """
+
+    def __init__(self, game: Game, eval_cls: Heuristic, time_limit: float = 1.0, exploration: float = 1.4,
+                 prior_visits: int = 0, iteration_limit: int = None, seed: int = None):
+        self._game = game
+        self._eval_cls = eval_cls
+        self._time_limit = time_limit
+        self._exploration = exploration
+        self._prior_visits = prior_visits
+        self._iteration_limit = iteration_limit
+        self._random = random.Random(seed)
+        self._root = None
+
+        self.playouts = 0
+        self.playouts_per_second = 0.0
+
+    @property
+    def root(self) -> MCTSNode:
+        """ MCTSNode: Root of the current tree. """
+        return self._root
+
+    def set_root(self, state, board: int):
+        """ Makes the position with player 1 to move the root of the tree, reusing the old tree if possible.
+
+        Arguments:
+            state (iterable of int): Hashes of the 10 boards.
+            board (int): The board player 1 has to move on.
+
+        """
+        state = tuple(int(b) for b in state)
+
+        if self._root is not None:
+            for node in self.__descendants(self._root, 2):
+                if node.board == board and node.state == state and node.player == -1:
+                    node.parent = None
+                    self._root = node
+                    return
+
+        self._root = MCTSNode(state, board, -1)
+
+    def run(self) -> int:
+        """ Runs playouts from the root until the time or iteration limit is reached.
+
+        Returns:
+            Int that represents the move with the most visits.
+
+        """
+        root = self._root
+        deadline = time.perf_counter() + self._time_limit
+        start = time.perf_counter()
+        playouts = 0
+
+        while self._iteration_limit is None or playouts < self._iteration_limit:
+            # check the clock every 16 playouts
+            if playouts & 15 == 0 and time.perf_counter() >= deadline:
+                break
+
+            node = self.__select(root)
+            result = node.result if node.result is not None else self.__playout(node)
+            self.__backpropagate(node, result)
+            playouts += 1
+
+        self.playouts = playouts
+        self.playouts_per_second = playouts / max(time.perf_counter() - start, 1e-9)
+
+        if not root.children:
+            # not a single playout finished, play any legal move
+            return self._game.empty_cells(root.state[root.board])[0]
+
+        return max(root.children, key=lambda c: c.visits).move
+
+    @staticmethod
+    def __descendants(node: MCTSNode, depth: int):
+        """ Yields the nodes up to depth plies below node. """
+        frontier = [node]
+        for _ in range(depth):
+            frontier = [c for n in frontier for c in n.children]
+            yield from frontier
+
+    def __select(self, node: MCTSNode) -> MCTSNode:
+        """ Walks down the tree by UCT and expands one new child. """
+        while node.result is None:
+            if node.untried is None:
+                node.untried = list(self._game.empty_cells(node.state[node.board]))
+                self._random.shuffle(node.untried)
+
+            if node.untried:
+                return self.__expand(node, node.untried.pop())
+
+            if not node.children:
+                return node
+
+            log_visits = math.log(node.visits)
+            c = self._exploration
+            node = max(node.children, key=lambda n: n.wins / n.visits + c * math.sqrt(log_visits / n.visits))
+
+        return node
+
+    def __expand(self, node: MCTSNode, move: int) -> MCTSNode:
+        """ Adds the child reached by playing move from node. """
+        player = -node.player
+        state = list(node.state)
+        state[node.board] = self._game.play_move(state[node.board], move, player)
+
+        child = MCTSNode(tuple(state), move, player, move, node)
+        if self._game.is_win(state[node.board]):
+            child.result = WIN
+        elif not self._game.empty_cells(state[move]):
+            child.result = DRAW
+
+        if self._prior_visits and child.result is None:
+            value = player * self._eval_cls.compute_heuristic(child.state, 1) / PRIOR_SCALE
+            child.visits = self._prior_visits
+            child.wins = self._prior_visits / (1 + math.exp(-max(min(value, 50), -50)))
+
+        node.children.append(child)
+        return child
+
+    def __playout(self, node: MCTSNode) -> float:
+        """ Plays random moves from node until the game ends.
+
+        Returns:
+            WIN, DRAW or LOSS for the player who moved into node.
+
+        """
+        game = self._game
+        choice = self._random.choice
+        state = list(node.state)
+        board = node.board
+        player = -node.player
+
+        while True:
+            cells = game.empty_cells(state[board])
+            if not cells:
+                return DRAW
+
+            cell = choice(cells)
+            state[board] = game.play_move(state[board], cell, player)
+            if game.is_win(state[board]):
+                return WIN if player == node.player else LOSS
+
+            board = cell
+            player = -player
+
+    @staticmethod
+    def __backpropagate(node: MCTSNode, result: float):
+        """ Adds the result of a playout to every node on the path to the root.
+
+        Arguments:
+            node (MCTSNode): The node the playout started from.
+            result (float): WIN, DRAW or LOSS for the player who moved into node.
+
+        """
+        while node is not None:
+            node.visits += 1
+            node.wins += result
+            result = 1.0 - result
+            node = node.parent
@@ -0,0 +1,122 @@
+from typing import List
+
+# Number of killer moves kept per ply
+KILLER_SLOTS = 2
+
+# Sort scores that put the transposition table move first, then killers, then the counter move, then history
+HASH_MOVE_SCORE = 1 << 40
+KILLER_SCORE = 1 << 32
+COUNTER_MOVE_SCORE = 1 << 31
+
+
+class MoveOrdering:
+    """ Orders the moves of a node so that alpha beta cutoffs happen on the first or second move.
+
+    Three tables are learnt from the cutoffs of the search:
+        1) Killer moves: the last KILLER_SLOTS moves that caused a cutoff at each ply.
+        2) History: how much (sub-board, cell, player) has caused cutoffs, weighted by remaining depth squared.
+        3) Counter moves: the reply that refuted the previous move (previous sub-board, previous cell).
+
+    The tables are kept between searches. age() halves the history and shifts the killers to the plies they will
+    have in the next search.
+
+    Attributes:
+        max_ply (int): Number of plies killer moves are kept for.
+
+    """
+
+    def __init__(self, max_ply: int = 32):
+        self.max_ply = max_ply
+
+        self._killers = [[None] * KILLER_SLOTS for _ in range(max_ply)]
+
+        # indexed by [sub-board][cell][player]. player -1 is stored at index 2 (== -1)
+        self._history = [[[0, 0, 0] for _ in range(10)] for _ in range(10)]
+
+        # indexed by [previous sub-board][previous cell]
+        self._counter_moves = [[None] * 10 for _ in range(10)]
+
+        # sort score of each cell of the node being ordered, and its bound __getitem__ used as the sort key, which
+        # would otherwise be created again by every call to order
+        self._scores = [0] * 10
+        self._score_of = self._scores.__getitem__
+
+    def order(self, moves: List[int], ply: int, sub_board: int, player: int, prev_board: int = None,
+              hash_move: int = None) -> List[int]:
+        """ Sorts the moves of a node in place from most to least promising.
+
+        Arguments:
+            moves (list of int): Legal moves (empty cells of the board in play).
+            ply (int): Depth of the node from the root of the search.
+            sub_board (int): The board in play.
+            player (int): The player to move.
+            prev_board (int, optional): Board the previous move was made on. None at the root.
+            hash_move (int, optional): Best move stored in the transposition table or found by the previous iteration.
+
+        Returns:
+            moves, in search order.
+
+        """
+        # scores are indexed by cell, so scoring a node reuses one list instead of building a dict
+        scores = self._scores
+        history = self._history[sub_board]
+        for m in moves:
+            scores[m] = history[m][player]
+
+        if prev_board is not None:
+            counter = self._counter_moves[prev_board][sub_board]
+            if counter in moves:
+                scores[counter] += COUNTER_MOVE_SCORE
+
+        if ply < self.max_ply:
+            for slot, killer in enumerate(self._killers[ply]):
+                if killer in moves:
+                    scores[killer] += KILLER_SCORE >> slot
+
+        if hash_move in moves:
+            scores[hash_move] += HASH_MOVE_SCORE
+
+        moves.sort(key=self._score_of, reverse=True)
+        return moves
+
+    def cutoff(self, move: int, ply: int, sub_board: int, player: int, remaining_depth: int, prev_board: int = None):
+        """ Records a move that caused a beta cutoff.
+
+        Arguments:
+            move (int): Cell that was played.
+            ply (int): Depth of the node from the root of the search.
+            sub_board (int): The board the move was made on.
+            player (int): The player that made the move.
+            remaining_depth (int): Depth left below the node.
+            prev_board (int, optional): Board the previous move was made on. None at the root.
+
+        """
+        self._history[sub_board][move][player] += remaining_depth * remaining_depth
+
+        if ply < self.max_ply:
+            killers = self._killers[ply]
+            if killers[0] != move:
+                killers[1:] = killers[:-1]
+                killers[0] = move
+
+        if prev_board is not None:
+            self._counter_moves[prev_board][sub_board] = move
+
+    def age(self, plies: int = 2):
+        """ Prepares the tables for the next search.
+
+        Arguments:
+            plies (int): Number of plies the root moves forward by (our move and the opponent's reply).
+
+        """
+        plies = min(plies, self.max_ply)
+        for board in self._history:
+            for cell in board:
+                cell[1] >>= 1
+                cell[2] >>= 1
+
+        self._killers = self._killers[plies:] + [[None] * KILLER_SLOTS for _ in range(plies)]
+
+    def clear(self):
+        """ Resets all the tables. """
+        self.__init__(self.max_ply)
@@ -0,0 +1,214 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from player.AlphaBeta import AlphaBeta
+from player.Game import Game, SAVE_PATH
+from player.GameTreeNode import GameTreeNode
+from player.Heuristic import Heuristic
+from player.MoveOrdering import MoveOrdering
+from player.Symmetry import canonical, transform, INVERSES, PERMUTATIONS
+from player.TranspositionTable import Zobrist, TranspositionTable
+
+BOOK_PATH = os.path.join(SAVE_PATH, 'opening_book.npy')
+
+# One book entry: canonical Zobrist key of the position and the best move in the canonical image
+ENTRY_DTYPE = np.dtype([('key', '<u8'), ('move', 'u1')])
+
+# Tables of the worker process, created once by _init_worker
+_game = None
+_heuristic = None
+
+
+def _init_worker():
+    """ Loads the precomputed Game and Heuristic tables once per worker process. """
+    global _game, _heuristic
+
+    _game = Game()
+    _game.load()
+    _heuristic = Heuristic()
+    _heuristic.load()
+
+
+def _search_position(boards: np.ndarray, curr_board: int, depth: int, extension_plies: int) -> int:
+    """ Searches a book position in a worker and returns the best move. """
+    state = np.array([_game.board_to_hash(b) for b in boards])
+    search = AlphaBeta(GameTreeNode(state, curr_board), _game, _heuristic, depth, tt=TranspositionTable(16),
+                       ordering=MoveOrdering(), extension_plies=extension_plies)
+    return search.run()
+
+
+def opening_positions(plies: int):
+    """ Yields the positions after the random first moves of the server, with player 1 (us) to move.
+
+    Plies 1 is the position of second_move (one opponent piece) and plies 2 the position of third_move (our random
+    piece and the opponent's reply).
+
+    Yields:
+        Tuple (global board, board in play).
+
+    """
+    for board in range(1, 10):
+        for cell in range(1, 10):
+            if plies == 1:
+                boards = np.zeros(shape=(10, 10), dtype='i1')
+                boards[board][cell] = -1
+                yield boards, cell
+                continue
+
+            for reply in range(1, 10):
+                if board == cell and reply == cell:
+                    continue
+                boards = np.zeros(shape=(10, 10), dtype='i1')
+                boards[board][cell] = 1
+                boards[cell][reply] = -1
+                yield boards, reply
+
+
+class OpeningBook:
+    """ Best moves of the opening positions, computed offline.
+
+    The book is a sorted array of (key, move) entries saved with numpy. Positions are stored once per symmetry class
+    under the Zobrist key of their canonical image (see player.Symmetry), with the move in that image, so a lookup
+    transforms the position, binary searches the key and maps the move back.
+
+    The book starts from the positions after the server's random first moves (see opening_positions). Deeper plies
+    follow the book move and every opponent reply, two plies at a time.
+
+    Attributes:
+        path (str): File the book is loaded from and saved to.
+        entries (numpy array): Sorted array of ENTRY_DTYPE.
+
+    """
+
+    def __init__(self, path: str = BOOK_PATH):
+        self.path = path
+        self.entries = np.zeros(0, dtype=ENTRY_DTYPE)
+        self._zobrist = Zobrist()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self) -> bool:
+        """ Loads the book from self.path.
+
+        Returns:
+            False if there is no book file, in which case the book stays empty.
+
+        """
+        try:
+            self.entries = np.load(self.path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def save(self):
+        """ Writes the book to self.path. """
+        np.save(self.path, self.entries)
+
+    def lookup(self, boards: np.ndarray, curr_board: int):
+        """ Returns the book move of a position with player 1 to move, or None if it is not in the book.
+
+        Arguments:
+            boards (numpy array): 10x10 global board.
+            curr_board (int): The board in play.
+
+        """
+        if not len(self.entries):
+            return None
+
+        key, symmetry = canonical(self._zobrist, boards, curr_board)
+        index = np.searchsorted(self.entries['key'], key)
+        if index == len(self.entries) or self.entries['key'][index] != key:
+            return None
+
+        return int(INVERSES[symmetry][self.entries['move'][index]])
+
+    def build(self, plies: int = 2, depth: int = 7, workers: int = None, extension_plies: int = 4):
+        """ Searches every opening position up to plies deep and replaces the entries with the results.
+
+        Arguments:
+            plies (int): Number of plies played before the deepest book position.
+            depth (int): Depth of the alpha beta search of every position.
+            workers (int, optional): Number of processes to search with. Defaults to the number of cores.
+            extension_plies (int): Forcing extensions of the search, as in Agent.
+
+        """
+        book = {}
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker) as executor:
+            for first in range(1, min(plies, 2) + 1):
+                level = list(opening_positions(first))
+                ply = first
+                while True:
+                    searched = self.__search_level(executor, book, level, depth, extension_plies)
+                    ply += 2
+                    if ply > plies:
+                        break
+                    level = self.__replies(searched)
+
+        keys = np.fromiter(book.keys(), dtype=np.uint64, count=len(book))
+        moves = np.fromiter(book.values(), dtype=np.uint8, count=len(book))
+        order = np.argsort(keys)
+
+        self.entries = np.zeros(len(book), dtype=ENTRY_DTYPE)
+        self.entries['key'] = keys[order]
+        self.entries['move'] = moves[order]
+
+    def __search_level(self, executor: ProcessPoolExecutor, book: dict, level, depth: int, extension_plies: int):
+        """ Searches the canonical images of the positions of one level that are not in the book yet.
+
+        Returns:
+            List of (canonical global board, board in play, book move) of the positions searched.
+
+        """
+        unique = {}
+        for boards, curr in level:
+            key, symmetry = canonical(self._zobrist, boards, curr)
+            if key not in book and key not in unique:
+                unique[key] = (transform(boards, symmetry), int(PERMUTATIONS[symmetry][curr]))
+
+        positions = list(unique.values())
+        moves = executor.map(_search_position, [b for b, _ in positions], [c for _, c in positions],
+                             [depth] * len(positions), [extension_plies] * len(positions), chunksize=4)
+
+        searched = []
+        for key, (boards, curr), move in zip(unique, positions, moves):
+            book[key] = move
+            searched.append((boards, curr, move))
+        return searched
+
+    @staticmethod
+    def __replies(searched):
+        """ Returns the positions after the book move and every opponent reply that does not end the game. """
+        level = []
+        for boards, curr, move in searched:
+            after = boards.copy()
+            after[curr][move] = 1
+            if Game.is_terminal_node(after[curr]):
+                continue
+
+            for reply in range(1, 10):
+                if after[move][reply] != 0:
+                    continue
+                position = after.copy()
+                position[move][reply] = -1
+                if Game.is_terminal_node(position[move]) or not (position[reply][1:] == 0).any():
+                    continue
+                level.append((position, reply))
+        return level
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the opening book")
+    parser.add_argument('--plies', type=int, default=2)
+    parser.add_argument('--depth', type=int, default=7)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    book = OpeningBook()
+    book.build(args.plies, args.depth, args.workers)
+    book.save()
+    print("{} positions searched to depth {} in {:.1f}s, saved to {} ({} bytes)".format(
+        len(book), args.depth, time.perf_counter() - start, book.path, os.path.getsize(book.path)))
@@ -0,0 +1,156 @@
+import gc
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from player.AlphaBeta import AlphaBeta, NULL_WINDOW, gc_paused
+from player.Game import Game
+from player.GameTreeNode import GameTreeNode
+from player.Heuristic import Heuristic
+from player.MoveOrdering import MoveOrdering
+from player.Symmetry import distinct_moves
+from player.TranspositionTable import TranspositionTable
+
+# Tables of the worker process, created once by _init_worker
+_game = None
+_heuristic = None
+_tt = None
+_ordering = None
+_alpha = None
+_algorithm = None
+_options = None
+
+# Number of the search the worker's tables were last prepared for
+_search_id = None
+
+
+def _init_worker(alpha, algorithm: str, tt_size_mb: int, options: dict):
+    """ Loads the precomputed Game and Heuristic tables once per worker process. """
+    global _game, _heuristic, _tt, _ordering, _alpha, _algorithm, _options
+
+    _game = Game()
+    _game.load()
+    _heuristic = Heuristic()
+    _heuristic.load()
+
+    _tt = TranspositionTable(tt_size_mb)
+    _ordering = MoveOrdering()
+    _alpha = alpha
+    _algorithm = algorithm
+    _options = options
+
+    # the tables live as long as the process, so the collector never needs to look at them again
+    gc.freeze()
+
+
+def _search_root_move(state: np.ndarray, curr_board: int, move: int, depth: int, search_id: int):
+    """ Searches a single root move in a worker.
+
+    The search starts from the best score any worker has finished with so far (minus a null window so that a move
+    that ties with it still gets its exact score) and publishes its own score when it is done. The move ordering is
+    aged and the transposition table starts a new generation once per search, by the first task of it the worker
+    gets, not once per root move.
+
+    Returns:
+        Tuple (score, nodes generated).
+
+    """
+    global _search_id
+    if search_id != _search_id:
+        _search_id = search_id
+        _ordering.age()
+        _tt.new_search()
+
+    alpha = _alpha.value - NULL_WINDOW
+
+    search = AlphaBeta(GameTreeNode(state, curr_board), _game, _heuristic, depth, tt=_tt, ordering=_ordering,
+                       algorithm=_algorithm, root_moves=[move], new_search=False, **_options)
+    with gc_paused():
+        search.run(alpha)
+
+    with _alpha.get_lock():
+        if search.score > _alpha.value:
+            _alpha.value = search.score
+
+    return search.score, search.nodes_generated
+
+
+class ParallelSearch:
+    """ Root-parallel alpha beta search over a pool of worker processes.
+
+    The moves of the root are split between the workers, one task per move. Every worker loads the Game and Heuristic
+    tables once when the pool starts and keeps its own transposition table and move ordering between tasks. The best
+    score found so far is shared through a multiprocessing.Value and used as alpha by the tasks that start after it.
+
+    Ties are broken by cell order, so the answer is the same as AlphaBeta.run without move ordering. Forcing
+    extensions have a node budget per search (see AlphaBeta), which here is spent per root move, so lines cut short by
+    it in the serial search can be searched further.
+
+    Attributes:
+        workers (int): Number of worker processes.
+        nodes_generated (int): Number of nodes visited by all workers during the last search.
+        score (float): Value of the root found by the last search.
+
+    """
+
+    def __init__(self, workers: int = None, algorithm: str = 'alphabeta', tt_size_mb: int = 16,
+                 symmetry: bool = False, **search_options):
+        """
+        Arguments:
+            workers (int, optional): Number of worker processes. Defaults to the number of cores.
+            algorithm (str): One of player.AlphaBeta.ALGORITHMS.
+            tt_size_mb (int): Size of the transposition table of every worker.
+            symmetry (bool): Only search one root move of every set of symmetric ones, as AlphaBeta does.
+            search_options: Keyword arguments of the AlphaBeta search of every root move, e.g. extension_plies.
+
+        """
+        self.workers = workers or os.cpu_count()
+        self.nodes_generated = 0
+        self.score = None
+
+        self._symmetry = symmetry
+        self._searches = 0
+        self._alpha = multiprocessing.Value('d', -math.inf)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(self._alpha, algorithm, tt_size_mb, search_options))
+
+    def run(self, node: GameTreeNode, game: Game, depth: int) -> int:
+        """ Searches node to depth using every worker.
+
+        Arguments:
+            node (GameTreeNode): The root node.
+            game (Game): Game class instance used to list the root moves.
+            depth (int): Depth to run search to.
+
+        Returns:
+            Int that represents the best move found.
+
+        """
+        moves = game.legal_moves(node.state, node.get_board_num())
+        if self._symmetry:
+            moves = distinct_moves(node.state, node.get_board_num(), moves)
+
+        with self._alpha.get_lock():
+            self._alpha.value = -math.inf
+
+        self._searches += 1
+        futures = [self._executor.submit(_search_root_move, node.state, node.get_board_num(), m, depth,
+                                         self._searches) for m in moves]
+        results = [f.result() for f in futures]
+
+        self.nodes_generated = sum(nodes for _, nodes in results)
+
+        best = max(range(len(moves)), key=lambda i: results[i][0])
+        self.score = results[best][0]
+        return moves[best]
+
+    def close(self):
+        """ Shuts the worker processes down. """
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
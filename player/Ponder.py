@@ -0,0 +1,53 @@
+import threading
+from player.AlphaBeta import AlphaBeta
+
+
+class Ponder:
+    """ Runs an iterative deepening search of a predicted position in a background thread.
+
+    Used to search on the opponent's time: the position after the opponent's most likely reply is searched while we
+    wait for the server. The search is started by the constructor.
+
+    Attributes:
+        search (AlphaBeta): The search being run. Its root is the predicted position.
+        move (int): The opponent reply the search assumes.
+        best_move (int): Best move of the deepest completed iteration, set once the search has stopped.
+
+    """
+
+    def __init__(self, search: AlphaBeta, move: int):
+        self.search = search
+        self.move = move
+        self.best_move = None
+
+        self._thread = threading.Thread(target=self.__run, daemon=True)
+        self._thread.start()
+
+    def __run(self):
+        self.best_move = self.search.run_iterative_deepening()
+
+    @property
+    def completed_depth(self) -> int:
+        """ Int: Deepest iteration the background search has completed so far. """
+        return self.search.completed_depth
+
+    def wait(self, timeout: float = None) -> int:
+        """ Lets the search continue for up to timeout seconds (until it finishes if None), then stops it.
+
+        Returns:
+            Int that represents the best move found.
+
+        """
+        self._thread.join(timeout)
+        return self.stop()
+
+    def stop(self) -> int:
+        """ Cancels the search and waits for the thread to exit.
+
+        Returns:
+            Int that represents the best move found.
+
+        """
+        self.search.cancel()
+        self._thread.join()
+        return self.best_move
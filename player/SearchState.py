@@ -0,0 +1,95 @@
+from player.Game import Game
+from player.Heuristic import Heuristic
+from player.TranspositionTable import Zobrist
+
+# A game has at most 81 moves, so no line is longer than this
+MAX_PLIES = 81
+
+
+class SearchState:
+    """ Mutable position searched by AlphaBeta, changed in place by make_move and undone by unmake_move.
+
+    A move changes a single sub-board, so the heuristic sum of the global board, the Zobrist key and the board in play
+    are updated from the one board that changed rather than recomputed from all ten. Evaluating a position is then a
+    single division (see Heuristic.compute_heuristic). What unmake_move restores is kept in lists preallocated for
+    every ply, so making and taking back a move allocates nothing but the new ints.
+
+    Attributes:
+        boards (list of int): Hashes of the 10 boards, as in GameTreeNode.state.
+        board (int): The board in play.
+        parent (int): The board the last move was made on, or the parent of the root node.
+        value (int): Sum of the heuristic values of the boards.
+        key (int): Zobrist key of the position, or None without a Zobrist instance.
+        ply (int): Number of moves made since the root.
+
+    """
+
+    __slots__ = ('_game', '_board_heuristic', '_zobrist', 'boards', 'board', 'parent', 'value', 'key', 'ply',
+                 '_boards', '_hashes', '_parents', '_values', '_keys')
+
+    def __init__(self, game: Game, eval_cls: Heuristic, state, curr_board: int, parent: int = None,
+                 zobrist: Zobrist = None):
+        self._game = game
+        self._board_heuristic = eval_cls.board_heuristic
+        self._zobrist = zobrist
+
+        self.boards = [int(b) for b in state]
+        self.board = curr_board
+        self.parent = parent
+        self.value = sum(self._board_heuristic(b) for b in self.boards)
+        self.key = zobrist.key(game, self.boards, curr_board) if zobrist is not None else None
+
+        # board, board hash, parent, value and key before the move made at each ply
+        self.ply = 0
+        self._boards = [0] * MAX_PLIES
+        self._hashes = [0] * MAX_PLIES
+        self._parents = [None] * MAX_PLIES
+        self._values = [0] * MAX_PLIES
+        self._keys = [None] * MAX_PLIES
+
+    def make_move(self, cell: int, player: int):
+        """ Plays player in cell of the board in play, which becomes cell.
+
+        Arguments:
+            cell (int): Empty cell (1-9) of the board in play.
+            player (int): 1 or -1.
+
+        """
+        board = self.board
+        old = self.boards[board]
+        new = self._game.play_move(old, cell, player)
+        ply = self.ply
+        self._boards[ply] = board
+        self._hashes[ply] = old
+        self._parents[ply] = self.parent
+        self._values[ply] = self.value
+        self._keys[ply] = self.key
+        self.ply = ply + 1
+
+        self.boards[board] = new
+        self.value += self._board_heuristic(new) - self._board_heuristic(old)
+        if self.key is not None:
+            zobrist = self._zobrist
+            self.key ^= zobrist.board_in_play(board) ^ zobrist.move(board, cell, player) ^ zobrist.board_in_play(cell)
+        self.parent = board
+        self.board = cell
+
+    def unmake_move(self):
+        """ Takes back the last move made. """
+        ply = self.ply - 1
+        self.ply = ply
+        self.board = board = self._boards[ply]
+        self.boards[board] = self._hashes[ply]
+        self.parent = self._parents[ply]
+        self.value = self._values[ply]
+        self.key = self._keys[ply]
+
+    def is_terminal(self) -> bool:
+        """ Checks if the board the last move was made on has three in a row, as Game.is_terminal. """
+        if not self.parent:
+            return self._game.is_win(self.boards[self.board])
+        return self._game.is_win(self.boards[self.parent])
+
+    def heuristic(self, depth: int) -> float:
+        """ Returns the heuristic value of the position at depth, equal to Heuristic.compute_heuristic. """
+        return self.value / depth
@@ -0,0 +1,154 @@
+import math
+import time
+from player.Game import Game
+from player.TranspositionTable import EXACT, LOWER, UPPER
+
+# Score of a win on the first move. A win k plies later scores WIN_SCORE - k, so faster wins are preferred
+WIN_SCORE = 1000
+DRAW_SCORE = 0
+
+# Number of nodes solved between checks of the deadline
+CHECK_INTERVAL = 1024
+
+
+class SolverBudgetExceeded(Exception):
+    """ Exception that is raised inside the solver when it runs out of nodes or time.
+
+    """
+    pass
+
+
+class Solver:
+    """ Exact endgame solver.
+
+    Depth-unbounded minimax search with alpha beta pruning that scores positions as win, loss or draw instead of using
+    the heuristic. A player who is sent to a full board cannot move and the game is a draw. Wins are scored by
+    WIN_SCORE minus their distance from the root so that the quickest win (and the slowest loss) is chosen. Solved
+    positions are memoised for the duration of a call to solve(). A position is always the same number of plies from
+    the root, so the stored scores stay valid.
+
+    Attributes:
+        game (Game): Game class instance.
+        node_limit (int, optional): Number of nodes the solver may visit before giving up.
+        nodes_generated (int): Number of nodes visited by the last call to solve().
+
+    """
+
+    def __init__(self, game: Game, node_limit: int = None):
+        self._game = game
+        self._node_limit = node_limit
+        self._memo = {}
+        self._deadline = None
+        self._next_check = 0
+
+        self.nodes_generated = 0
+
+    def solve(self, state, curr_board: int, deadline: float = None):
+        """ Solves the position with player 1 to move.
+
+        Arguments:
+            state (iterable of int): Hashes of the 10 boards.
+            curr_board (int): The board player 1 has to move on.
+            deadline (float, optional): time.perf_counter() value the solver has to give up at.
+
+        Returns:
+            Tuple (score, move) where score > 0 is a win, 0 a draw and < 0 a loss for player 1, or None if the node
+            limit or the deadline was reached first. move is None if there are no legal moves.
+
+        """
+        self.nodes_generated = 0
+        self._memo = {}
+        self._deadline = deadline
+        self._next_check = 0
+        state = [int(b) for b in state]
+
+        try:
+            return self.__solve(state, curr_board, 1, 0, -math.inf, math.inf)
+        except SolverBudgetExceeded:
+            return None
+
+    def __check_limits(self):
+        """ Raises SolverBudgetExceeded once the node limit or the deadline has been passed. """
+        if self._node_limit is not None and self.nodes_generated > self._node_limit:
+            raise SolverBudgetExceeded()
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise SolverBudgetExceeded()
+
+        self._next_check = self.nodes_generated + CHECK_INTERVAL
+        if self._node_limit is not None:
+            self._next_check = min(self._next_check, self._node_limit + 1)
+
+    def __ordered_moves(self, state, board: int, player: int):
+        """ Orders the moves so that moves which let the opponent win straight away are searched last. """
+        game = self._game
+        safe, unsafe = [], []
+        for cell in game.empty_cells(state[board]):
+            target = state[board] if cell == board else state[cell]
+            if cell == board:
+                target = game.play_move(target, cell, player)
+            if any(game.is_win(game.play_move(target, c, -player)) for c in game.empty_cells(target)):
+                unsafe.append(cell)
+            else:
+                safe.append(cell)
+        return safe + unsafe
+
+    def __solve(self, state, board: int, player: int, ply: int, alpha: float, beta: float):
+        """ Returns (score, best move) of a position. Scores are from player 1's point of view. """
+        self.nodes_generated += 1
+        if self.nodes_generated >= self._next_check:
+            self.__check_limits()
+
+        game = self._game
+        cells = game.empty_cells(state[board])
+        if not cells:
+            return DRAW_SCORE, None
+
+        # a win on this move is always best
+        for cell in cells:
+            if game.is_win(game.play_move(state[board], cell, player)):
+                return player * (WIN_SCORE - ply), cell
+
+        key = (tuple(state), board, player)
+        entry = self._memo.get(key)
+        if entry is not None:
+            score, bound, move = entry
+            if bound == EXACT:
+                return score, move
+            elif bound == LOWER:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                return score, move
+
+        alpha_orig, beta_orig = alpha, beta
+        best_val = -math.inf if player == 1 else math.inf
+        best_move = None
+        old = state[board]
+
+        for cell in self.__ordered_moves(state, board, player):
+            state[board] = game.play_move(old, cell, player)
+            value, _ = self.__solve(state, cell, -player, ply + 1, alpha, beta)
+            state[board] = old
+
+            if player == 1:
+                if value > best_val:
+                    best_val, best_move = value, cell
+                alpha = max(alpha, best_val)
+            else:
+                if value < best_val:
+                    best_val, best_move = value, cell
+                beta = min(beta, best_val)
+
+            if beta <= alpha:
+                break
+
+        if best_val <= alpha_orig:
+            bound = UPPER
+        elif best_val >= beta_orig:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self._memo[key] = (best_val, bound, best_move)
+
+        return best_val, best_move
@@ -0,0 +1,145 @@
+import numpy as np
+from player.Game import CELL_WEIGHTS, NUM_HASHES
+from player.TranspositionTable import Zobrist
+
+
+def _symmetries():
+    """ Builds the 8 symmetries of the square (4 rotations, each optionally mirrored) as permutations of cells 0-9.
+
+    PERMUTATIONS[s][c] is the cell that cell c moves to under symmetry s. Cell 0 is unused and always maps to itself.
+
+    """
+    grid = np.arange(1, 10).reshape(3, 3)
+    permutations = []
+    for turns in range(4):
+        for mirror in (False, True):
+            moved = np.rot90(grid, turns)
+            if mirror:
+                moved = np.fliplr(moved)
+
+            perm = np.zeros(10, dtype=np.intp)
+            perm[moved.ravel()] = np.arange(1, 10)
+            permutations.append(perm)
+    return np.array(permutations)
+
+
+# The 8 symmetries as permutations of the cells, the first one is the identity
+PERMUTATIONS = _symmetries()
+
+# INVERSES[s] undoes PERMUTATIONS[s]
+INVERSES = np.argsort(PERMUTATIONS, axis=1)
+
+
+def _hash_images():
+    """ Builds the image of every board hash (see player.Game) under every symmetry.
+
+    Returns:
+        Numpy array of shape (8, NUM_HASHES) where [s][h] is the hash of board h after applying symmetry s.
+
+    """
+    digits = np.zeros((NUM_HASHES, 10), dtype=np.int64)
+    digits[:, 1:] = np.arange(NUM_HASHES)[:, None] // CELL_WEIGHTS[1:] % 3
+    return np.array([digits[:, inverse] @ CELL_WEIGHTS for inverse in INVERSES], dtype=np.int32)
+
+
+# HASH_IMAGES[s][h] is the hash of sub-board h after symmetry s, so a position given as board hashes can be
+# transformed without going back to boards
+HASH_IMAGES = _hash_images()
+
+
+def transform(boards: np.ndarray, symmetry: int) -> np.ndarray:
+    """ Applies a symmetry to the outer board and every sub-board of a global board.
+
+    Arguments:
+        boards (numpy array): 10x10 global board.
+        symmetry (int): Index into PERMUTATIONS.
+
+    Returns:
+        New 10x10 global board where the piece in cell c of board b has moved to cell perm[c] of board perm[b].
+
+    """
+    inverse = INVERSES[symmetry]
+    return boards[inverse[:, None], inverse[None, :]]
+
+
+def transform_all(boards: np.ndarray) -> np.ndarray:
+    """ Returns the 8 images of a global board as an array of shape (8, 10, 10), in PERMUTATIONS order. """
+    return boards[INVERSES[:, :, None], INVERSES[:, None, :]]
+
+
+def canonical(zobrist: Zobrist, boards: np.ndarray, curr_board: int):
+    """ Finds the image of a position with the smallest Zobrist key.
+
+    Symmetric positions have the same canonical key, so tables keyed by it store them once.
+
+    Arguments:
+        zobrist (Zobrist): Keys used to compare the images.
+        boards (numpy array): 10x10 global board.
+        curr_board (int): The board in play.
+
+    Returns:
+        Tuple (key, symmetry) of the canonical image. A cell c of the canonical image is cell INVERSES[symmetry][c] of
+        the position.
+
+    """
+    keys = zobrist.boards_key(transform_all(boards), PERMUTATIONS[:, curr_board])
+    symmetry = int(np.argmin(keys))
+    return int(keys[symmetry]), symmetry
+
+
+def transform_state(state, symmetry: int) -> np.ndarray:
+    """ Applies a symmetry to a position given as board hashes.
+
+    Arguments:
+        state (iterable of int): Hashes of the 10 boards.
+        symmetry (int): Index into PERMUTATIONS.
+
+    Returns:
+        Numpy array of the 10 hashes of the image, where the hash of board b has moved to board perm[b].
+
+    """
+    return HASH_IMAGES[symmetry][np.asarray(state)[INVERSES[symmetry]]]
+
+
+def canonical_state(zobrist: Zobrist, state, curr_board: int):
+    """ Finds the image of a position given as board hashes with the smallest Zobrist key.
+
+    Gives the same key and symmetry as canonical() for the same position, from one lookup per sub-board and symmetry,
+    so caches keyed by board hashes can store symmetric positions once.
+
+    Arguments:
+        zobrist (Zobrist): Keys used to compare the images.
+        state (iterable of int): Hashes of the 10 boards.
+        curr_board (int): The board in play.
+
+    Returns:
+        Tuple (key, symmetry) of the canonical image. A cell c of the canonical image is cell INVERSES[symmetry][c] of
+        the position.
+
+    """
+    state = np.asarray(state)
+    images = HASH_IMAGES[np.arange(8)[:, None], state[INVERSES]]
+    keys = zobrist.hashes_key(images, PERMUTATIONS[:, curr_board])
+    symmetry = int(np.argmin(keys))
+    return int(keys[symmetry]), symmetry
+
+
+def distinct_moves(state, curr_board: int, moves):
+    """ Drops the moves that lead to a position symmetric to the position after another move.
+
+    A symmetry that maps a position onto itself maps its moves onto moves with the same value, so only one move of each
+    such orbit has to be searched. Most positions have no symmetry besides the identity, but the opening ones do.
+
+    Arguments:
+        state (iterable of int): Hashes of the 10 boards.
+        curr_board (int): The board in play.
+        moves (list of int): Legal moves of the position.
+
+    Returns:
+        List of the moves that are the smallest cell of their orbit, in the order given.
+
+    """
+    state = np.asarray(state)
+    stabilizer = [perm for s, perm in enumerate(PERMUTATIONS)
+                  if perm[curr_board] == curr_board and (transform_state(state, s) == state).all()]
+    return [m for m in moves if all(m <= perm[m] for perm in stabilizer)]
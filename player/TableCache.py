@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import struct
+import time
+import zlib
+import numpy as np
+
+# Directory the tables are saved in
+TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tables')
+
+# Version of the file layout below. Files of another version are rebuilt
+FORMAT_VERSION = 1
+
+# A table file is MAGIC, the length of the JSON header as a little endian uint32, the header, padding up to a multiple
+# of DATA_ALIGNMENT bytes and the raw C order data of the array
+MAGIC = b'UTTTTBL\0'
+DATA_ALIGNMENT = 64
+SUFFIX = '.tbl'
+
+
+class StaleTable(Exception):
+    """ Exception that is raised when a table file cannot be used as it is and has to be rebuilt.
+
+    """
+    pass
+
+
+def fingerprint(*params) -> str:
+    """ Returns a short digest of the parameters a table is built from. """
+    return hashlib.sha1(repr(params).encode()).hexdigest()[:16]
+
+
+class TableCache:
+    """ Directory of precomputed tables that are memory-mapped read-only and rebuilt when they are out of date.
+
+    Every file carries a header with the format version, the fingerprint of the parameters the table was built from
+    and a CRC32 checksum of the data. A table is rebuilt when its file is missing, has another format version or
+    fingerprint, or fails the checksum. Mapping a valid file does not copy it, so every process that opens a table
+    shares one physical copy of it through the page cache.
+
+    Attributes:
+        path (str): Directory the tables are saved in.
+        verify (bool): Check the checksum of every table that is opened.
+        events (list of tuple): (name, action, seconds) for every table opened, where action is 'mapped' or the reason
+            it was built ('missing', 'version', 'fingerprint', 'corrupt' or 'checksum').
+
+    """
+
+    def __init__(self, path: str = TABLE_PATH, verify: bool = True):
+        self.path = path
+        self.verify = verify
+        self.events = []
+
+    def load(self, name: str, params_fingerprint: str, build) -> np.ndarray:
+        """ Returns a table, building and saving it first if the saved one is out of date.
+
+        Arguments:
+            name (str): Name of the table file.
+            params_fingerprint (str): Fingerprint of the parameters the table has to be built from.
+            build (callable): Returns the table as a numpy array.
+
+        Returns:
+            Read-only numpy memmap.
+
+        """
+        start = time.perf_counter()
+        try:
+            table = self.__open(name, params_fingerprint)
+            action = 'mapped'
+        except StaleTable as e:
+            action = str(e)
+            self.save(name, params_fingerprint, build())
+            table = self.__open(name, params_fingerprint)
+
+        self.events.append((name, action, time.perf_counter() - start))
+        return table
+
+    def save(self, name: str, params_fingerprint: str, table: np.ndarray):
+        """ Writes a table with its header. The file is replaced atomically, so a process loading it never sees half a
+        table.
+
+        """
+        table = np.ascontiguousarray(table)
+        header = json.dumps({'format': FORMAT_VERSION, 'fingerprint': params_fingerprint,
+                             'checksum': zlib.crc32(table), 'dtype': table.dtype.str,
+                             'shape': list(table.shape)}).encode()
+        prefix = len(MAGIC) + 4 + len(header)
+        padding = -prefix % DATA_ALIGNMENT
+
+        os.makedirs(self.path, exist_ok=True)
+        path = os.path.join(self.path, name + SUFFIX)
+        temp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temp, 'wb') as file:
+            file.write(MAGIC + struct.pack('<I', len(header)) + header + b' ' * padding)
+            file.write(table.tobytes())
+        os.replace(temp, path)
+
+    def report(self) -> str:
+        """ Returns one line per table opened with what was done and how long it took. """
+        return '\n'.join('{:<18} {:<12} {:>8.1f} ms'.format(name, action, seconds * 1000)
+                         for name, action, seconds in self.events)
+
+    def __open(self, name: str, params_fingerprint: str) -> np.ndarray:
+        """ Maps a saved table after checking its header.
+
+        Raises:
+            StaleTable: With the reason the table has to be rebuilt as its message.
+
+        """
+        path = os.path.join(self.path, name + SUFFIX)
+        try:
+            with open(path, 'rb') as file:
+                magic = file.read(len(MAGIC) + 4)
+                if len(magic) < len(MAGIC) + 4 or not magic.startswith(MAGIC):
+                    raise StaleTable('corrupt')
+                length, = struct.unpack('<I', magic[len(MAGIC):])
+                header = json.loads(file.read(length).decode())
+        except FileNotFoundError:
+            raise StaleTable('missing')
+        except (ValueError, UnicodeDecodeError):
+            raise StaleTable('corrupt')
+
+        if header.get('format') != FORMAT_VERSION:
+            raise StaleTable('version')
+        if header.get('fingerprint') != params_fingerprint:
+            raise StaleTable('fingerprint')
+
+        offset = len(MAGIC) + 4 + length
+        offset += -offset % DATA_ALIGNMENT
+        dtype, shape = np.dtype(header['dtype']), tuple(header['shape'])
+        if os.path.getsize(path) != offset + dtype.itemsize * int(np.prod(shape)):
+            raise StaleTable('corrupt')
+
+        table = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+        if self.verify and zlib.crc32(table) != header['checksum']:
+            raise StaleTable('checksum')
+        return table
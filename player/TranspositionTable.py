@@ -0,0 +1,207 @@
+import numpy as np
+from player.Game import Game, CELL_WEIGHTS, NUM_HASHES
+
+# Fixed seed so that keys are identical between runs and processes
+ZOBRIST_SEED = 20190406
+
+# Rough size in bytes of one stored entry (tuple + boxed ints/floats), used to turn the memory cap into a slot count
+ENTRY_BYTES = 160
+
+# Bound types stored with each entry
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class Zobrist:
+    """ Zobrist keys for the global state of the game.
+
+    Every (sub-board, cell, player) triple and every board in play is assigned a random 63 bit number. The key of a
+    position is the XOR of the numbers of all occupied cells and of the board in play, so a move only needs a few
+    XORs to update it.
+
+    """
+
+    def __init__(self, seed: int = ZOBRIST_SEED):
+        rng = np.random.RandomState(seed)
+        cells = rng.randint(0, 2 ** 63 - 1, size=(10, 10, 2), dtype=np.int64).tolist()
+
+        # indexed by [sub-board][cell][player]. player 1 is stored at index 1 and player -1 at index 2 (== -1)
+        self._cells = [[[0, c[0], c[1]] for c in board] for board in cells]
+        self._board_in_play = rng.randint(0, 2 ** 63 - 1, size=10, dtype=np.int64).tolist()
+
+        # the same numbers as arrays, indexed by [sub-board][cell][cell value] (value -1 is index 2)
+        self._cell_array = np.array(self._cells, dtype=np.uint64)
+        self._board_in_play_array = np.array(self._board_in_play, dtype=np.uint64)
+
+        # XOR of the numbers of every board hash in every sub-board, built on first use by hashes_key
+        self._hash_keys = None
+
+    def key(self, game: Game, state: np.ndarray, curr_board: int) -> int:
+        """ Computes the key of a position from scratch.
+
+        Arguments:
+            game (Game): Game class instance used to turn board hashes back into boards.
+            state (numpy array): Numpy array of the 10 board hashes.
+            curr_board (int): The current board in play.
+
+        """
+        key = self._board_in_play[curr_board]
+        for b in range(1, 10):
+            board = game.hash_to_board(state[b])
+            for cell in range(1, 10):
+                if board[cell] != 0:
+                    key ^= self._cells[b][cell][board[cell]]
+        return key
+
+    def boards_key(self, boards: np.ndarray, curr_board):
+        """ Computes the key of positions given as global boards.
+
+        Gives the same key as key() for the same position, without going through the board hashes.
+
+        Arguments:
+            boards (numpy array): 10x10 global board of 0, 1 and -1, or a stack of them with shape (..., 10, 10).
+            curr_board (int or numpy array): The board in play of each position.
+
+        Returns:
+            numpy uint64 key, or array of keys for a stack of positions.
+
+        """
+        values = self._cell_array[np.arange(10)[:, None], np.arange(10)[None, :], boards]
+        keys = np.bitwise_xor.reduce(values.reshape(values.shape[:-2] + (100,)), axis=-1)
+        return keys ^ self._board_in_play_array[curr_board]
+
+    def hashes_key(self, states: np.ndarray, curr_board):
+        """ Computes the key of positions given as board hashes.
+
+        Gives the same key as key() for the same position, with one table lookup per sub-board.
+
+        Arguments:
+            states (numpy array): The 10 board hashes of a position, or a stack of them with shape (..., 10).
+            curr_board (int or numpy array): The board in play of each position.
+
+        Returns:
+            numpy uint64 key, or array of keys for a stack of positions.
+
+        """
+        if self._hash_keys is None:
+            # digits[h, c] is the base 3 digit of cell c in hash h, which is also the index of its cell value
+            digits = np.zeros((NUM_HASHES, 10), dtype=np.int64)
+            digits[:, 1:] = np.arange(NUM_HASHES)[:, None] // CELL_WEIGHTS[1:] % 3
+
+            hash_keys = np.zeros((10, NUM_HASHES), dtype=np.uint64)
+            for b in range(1, 10):
+                hash_keys[b] = np.bitwise_xor.reduce(self._cell_array[b, np.arange(10), digits], axis=1)
+            self._hash_keys = hash_keys
+
+        values = self._hash_keys[np.arange(10), states]
+        return np.bitwise_xor.reduce(values, axis=-1) ^ self._board_in_play_array[curr_board]
+
+    def move(self, sub_board: int, cell: int, player: int) -> int:
+        """ Returns the number to XOR into a key when player places a piece in cell of sub_board. """
+        return self._cells[sub_board][cell][player]
+
+    def board_in_play(self, board: int) -> int:
+        """ Returns the number to XOR into a key when board becomes (or stops being) the board in play. """
+        return self._board_in_play[board]
+
+
+class TranspositionTable:
+    """ Bounded transposition table for the alpha beta search.
+
+    The table has two tiers of the same size. A new entry goes into the depth-preferred slot of its bucket if that
+    slot is empty, belongs to an older search or was searched to a lower depth; otherwise it goes into the
+    always-replace slot. Scores depend on the depth of the search root (see Heuristic.compute_heuristic), so entries
+    from an older search are only used for their best move.
+
+    Attributes:
+        zobrist (Zobrist): Keys used to index the table.
+        size_mb (int): Memory cap in megabytes.
+        probes (int): Number of lookups.
+        hits (int): Number of lookups that found an entry.
+        cutoffs (int): Number of nodes that returned straight from an entry.
+        stores (int): Number of entries written.
+
+    """
+
+    def __init__(self, size_mb: int = 32):
+        self.zobrist = Zobrist()
+        self.size_mb = size_mb
+
+        self._buckets = max(1, size_mb * 1024 * 1024 // (2 * ENTRY_BYTES))
+        self._depth_preferred = [None] * self._buckets
+        self._always_replace = [None] * self._buckets
+        self._generation = 0
+
+        self.probes = 0
+        self.hits = 0
+        self.cutoffs = 0
+        self.stores = 0
+
+    @property
+    def generation(self) -> int:
+        """ Int: Counter of the search the table is currently being used by. """
+        return self._generation
+
+    def new_search(self):
+        """ Marks the start of a new search. Entries from previous searches only keep their best move. """
+        self._generation += 1
+
+    def clear(self):
+        """ Removes every entry. The counters keep accumulating. """
+        self._depth_preferred = [None] * self._buckets
+        self._always_replace = [None] * self._buckets
+
+    def probe(self, key: int):
+        """ Looks up a position.
+
+        Arguments:
+            key (int): Zobrist key of the position.
+
+        Returns:
+            Tuple (key, depth, bound, score, best_move, generation) or None if the position is not stored.
+
+        """
+        self.probes += 1
+        index = key % self._buckets
+
+        entry = self._depth_preferred[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+
+        entry = self._always_replace[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+
+        return None
+
+    def store(self, key: int, depth: int, bound: int, score: float, best_move: int):
+        """ Stores the result of searching a position.
+
+        Arguments:
+            key (int): Zobrist key of the position.
+            depth (int): Remaining depth the position was searched to.
+            bound (int): EXACT, LOWER or UPPER.
+            score (float): Value returned by the search.
+            best_move (int): Best move found, or None.
+
+        """
+        self.stores += 1
+        index = key % self._buckets
+        entry = (key, depth, bound, score, best_move, self._generation)
+
+        old = self._depth_preferred[index]
+        if old is None or old[0] == key or old[5] != self._generation or depth >= old[1]:
+            self._depth_preferred[index] = entry
+            if old is not None and old[0] != key:
+                # demote the previous occupant instead of losing it
+                self._always_replace[index] = old
+        else:
+            self._always_replace[index] = entry
+
+    def stats(self) -> dict:
+        """ Returns the counters of the table as a dictionary. """
+        return {'probes': self.probes, 'hits': self.hits, 'cutoffs': self.cutoffs, 'stores': self.stores,
+                'hit_rate': self.hits / self.probes if self.probes else 0.0}
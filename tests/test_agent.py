@@ -0,0 +1,185 @@
+import socket
+import threading
+import time
+import pytest
+from agent import Agent, DEFAULT_DEPTH
+from player.Game import Game
+from player.Heuristic import Heuristic
+from player.SearchState import MAX_PLIES
+from tests.test_parallel_search import MIDGAME_BOARD
+
+
+@pytest.fixture(scope='module')
+def game_cls():
+    g = Game()
+    g.load()
+    return g
+
+
+@pytest.fixture(scope='module')
+def heuristic_func():
+    h = Heuristic()
+    h.load()
+    return h
+
+
+@pytest.fixture(scope='function')
+def agent(game_cls, heuristic_func):
+    a = Agent(game_cls, heuristic_func, depth=4, ponder=True)
+    a.parse("start(x)")
+    return a
+
+
+def legal_moves(agent):
+    return [i for i in range(1, 10) if agent._boards[agent._curr][i] == 0]
+
+
+def test_ponder_hit(agent):
+    """ Checks that the background search is used when it guessed the opponent's reply """
+    agent.parse("second_move(5,3)")
+    agent.start_pondering()
+    predicted = agent._pondering.move
+
+    move = agent.parse("next_move({})".format(predicted))
+
+    assert agent._ponder_hits == 1 and agent._ponder_misses == 0
+    assert agent._ponder_depth_gained >= 0
+    assert agent._boards[predicted][move] == 1
+
+
+def test_ponder_miss(agent):
+    """ Checks that the background search is dropped when the opponent plays something else """
+    agent.parse("second_move(5,3)")
+    agent.start_pondering()
+    predicted = agent._pondering.move
+    other = next(m for m in legal_moves(agent) if m != predicted)
+
+    move = agent.parse("next_move({})".format(other))
+
+    assert agent._ponder_hits == 0 and agent._ponder_misses == 1
+    assert agent._pondering is None
+    assert agent._boards[other][move] == 1
+
+
+def test_ponder_miss_ages_tables_once(agent, monkeypatch):
+    """ Checks that the background search and the search after a miss age the move ordering once between them """
+    agent.parse("second_move(5,3)")
+    aged = []
+    monkeypatch.setattr(agent._ordering, 'age', lambda: aged.append(1))
+    generation = agent._tt.generation
+
+    agent.start_pondering()
+    other = next(m for m in legal_moves(agent) if m != agent._pondering.move)
+    agent.parse("next_move({})".format(other))
+    assert len(aged) == 1 and agent._tt.generation == generation + 1
+
+    # without pondering the search ages them itself
+    agent.parse("next_move({})".format(legal_moves(agent)[0]))
+    assert len(aged) == 2 and agent._tt.generation == generation + 2
+
+
+def test_game_end_stops_pondering(agent):
+    agent.parse("second_move(5,3)")
+    agent.start_pondering()
+
+    agent.parse("win(x)")
+
+    assert agent._pondering is None
+
+
+def test_mcts_engine(game_cls, heuristic_func):
+    a = Agent(game_cls, heuristic_func, time_limit=0.1, engine='mcts')
+    a.parse("start(x)")
+    move = a.parse("second_move(5,3)")
+
+    assert a._boards[3][move] == 1
+
+
+def test_mtdf_algorithm(game_cls, heuristic_func):
+    a = Agent(game_cls, heuristic_func, depth=4, algorithm='mtdf')
+    a.parse("start(x)")
+    move = a.parse("second_move(5,3)")
+
+    assert a._boards[3][move] == 1
+
+
+def test_unknown_engine(game_cls, heuristic_func):
+    with pytest.raises(ValueError):
+        Agent(game_cls, heuristic_func, engine='random')
+    with pytest.raises(ValueError):
+        Agent(game_cls, heuristic_func, algorithm='minimax')
+
+
+def test_reuse_tree(game_cls, heuristic_func):
+    """ Checks that the next search is seeded when the opponent plays the reply the last search expected """
+    a = Agent(game_cls, heuristic_func, depth=4, reuse_tree=True)
+    a.parse("start(x)")
+    a.parse("second_move(5,3)")
+    reply = a._expected[1]
+
+    a.parse("next_move({})".format(reply))
+
+    assert not a._search_log[0][2] and a._search_log[1][2]
+
+
+def test_run_frames_commands_and_stops_at_eof(game_cls, heuristic_func):
+    """ Checks that a command split across two segments is parsed once and that a closed connection ends the run """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('localhost', 0))
+    server.listen(1)
+
+    a = Agent(game_cls, heuristic_func, depth=2)
+    thread = threading.Thread(target=a.run, args=(server.getsockname()[1],))
+    thread.start()
+    connection, _ = server.accept()
+    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    connection.sendall(b"start(x)\nsecond_mo")
+    time.sleep(0.05)
+    connection.sendall(b"ve(5,3)\n")
+    move = int(connection.makefile().readline())
+
+    connection.close()
+    thread.join(5)
+    server.close()
+
+    assert not thread.is_alive()
+    assert a._boards[3][move] == 1
+    assert len(a._reply_latencies) == 1
+    total, move_time = a._reply_latencies[0]
+    assert total >= move_time > 0
+
+
+def test_time_limit_deepens_past_default_depth(game_cls, heuristic_func):
+    """ Checks that with a time limit the search is not capped at the fixed search depth """
+    assert Agent(game_cls, heuristic_func)._depth == DEFAULT_DEPTH
+    assert Agent(game_cls, heuristic_func, time_limit=1)._depth == MAX_PLIES
+    assert Agent(game_cls, heuristic_func, depth=5, time_limit=1)._depth == 5
+
+    # the default depth is searched in a few milliseconds here
+    a = Agent(game_cls, heuristic_func, time_limit=0.3, endgame_empty_cells=0)
+    a.parse("start(x)")
+    a._boards = MIDGAME_BOARD.copy()
+    a._curr = 8
+    a.play()
+
+    assert a._move_time >= 0.25
+
+
+def test_statistics_without_games(game_cls, heuristic_func, capsys):
+    """ Checks that a server that closes before start( leaves statistics that can be printed """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('localhost', 0))
+    server.listen(1)
+
+    a = Agent(game_cls, heuristic_func, depth=2)
+    thread = threading.Thread(target=a.run, args=(server.getsockname()[1],))
+    thread.start()
+    connection, _ = server.accept()
+    connection.close()
+    thread.join(5)
+    server.close()
+
+    assert not thread.is_alive()
+    a.print_game_statistics()
+    assert "Games played: 0" in capsys.readouterr().out
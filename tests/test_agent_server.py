@@ -0,0 +1,92 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from agent import Agent
+from player.AgentServer import AgentServer, _init_worker, _handle_command, _close_game
+from player.Game import Game
+from player.Heuristic import Heuristic
+from player.OpeningBook import OpeningBook
+
+
+@pytest.fixture(scope='module')
+def server():
+    with AgentServer(2, depth=2) as s:
+        yield s
+
+
+async def game_server(replies: list, delay: float, end: bool):
+    """ Starts a game server that sends the opening of a game, reads our move, and then ends or closes the connection.
+
+    Returns:
+        Tuple (asyncio server, its port).
+
+    """
+    async def handle(reader, writer):
+        await asyncio.sleep(delay)
+        # the second command is split across two writes
+        writer.write(b"start(x)\nsecond_mo")
+        await writer.drain()
+        await asyncio.sleep(0.05)
+        writer.write(b"ve(5,3)\n")
+        await writer.drain()
+        replies.append(int(await reader.readline()))
+        if end:
+            writer.write(b"end.\n")
+            await writer.drain()
+        writer.close()
+
+    s = await asyncio.start_server(handle, 'localhost', 0)
+    return s, s.sockets[0].getsockname()[1]
+
+
+def test_concurrent_games(server: AgentServer):
+    """ Checks that games over several connections are played at once and that each one gets a legal move """
+    async def play():
+        replies = []
+        servers = [await game_server(replies, delay, end) for delay, end in ((0.2, True), (0, False), (0.1, True))]
+        await asyncio.wait_for(server.run([port for _, port in servers]), 60)
+        for s, _ in servers:
+            s.close()
+        return replies
+
+    replies = asyncio.run(play())
+
+    assert len(replies) == 3
+    # every game is on board 3 after second_move(5,3) and only cell 5 of board 5 is taken
+    assert all(1 <= move <= 9 for move in replies)
+    assert server.games_finished == 3
+    assert len(server.reply_latencies) == 3
+    assert all(total >= move_time > 0 for total, move_time in server.reply_latencies)
+
+
+
+def test_queueing_delay_counts_against_time_limit():
+    """ Checks that the time a command waited for its worker is taken off the move's time limit, and that a command
+    that waited longer than the limit still gets the move of a depth 1 search """
+    options = {'time_limit': 0.3, 'endgame_empty_cells': 0, 'ponder': False}
+
+    # the worker side runs in a worker process, as in the server, so that its tables and gc.freeze stay there
+    with ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(options,)) as executor:
+        replies = []
+        for game_id, waited in enumerate((0.25, 1.0)):
+            executor.submit(_handle_command, game_id, "start(x)", time.time()).result()
+            replies.append(executor.submit(_handle_command, game_id, "second_move(5,3)",
+                                           time.time() - waited).result())
+            executor.submit(_close_game, game_id).result()
+
+    game = Game()
+    game.load()
+    heuristic = Heuristic()
+    heuristic.load()
+    book = OpeningBook()
+    book.load()
+    depth_1 = Agent(game, heuristic, depth=1, endgame_empty_cells=0, book=book if len(book) else None)
+    depth_1.parse("start(x)")
+    expected = depth_1.parse("second_move(5,3)")
+
+    (partly_waited, partly_time), (overdue, overdue_time) = replies
+    assert 1 <= partly_waited <= 9
+    assert partly_time < 0.15
+    assert overdue == expected
+    assert overdue_time < 0.05
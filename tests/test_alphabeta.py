@@ -1,22 +1,26 @@
+import gc
+import math
 import os
-import pickle
+import tracemalloc
 
 import numpy as np
 import pytest
 
-from player.AlphaBeta import AlphaBeta
+from player.AlphaBeta import AlphaBeta, gc_paused
 from player.Game import Game
 from player.GameTreeNode import GameTreeNode
 from player.Heuristic import Heuristic
+from player.MoveOrdering import MoveOrdering
+from player.TranspositionTable import TranspositionTable
+from tests.test_parallel_search import MIDGAME_BOARD
 
 
 # FILE PATHS
+PLAYER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'player')
 NPY_OUTPUT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'numpy_output')
-SAVE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Load in a Python dictionary that maps hash values of boards to their actual Numpy representation.
-with open(os.path.join(SAVE_PATH, 'hash_board.pickle'), 'rb') as file:
-    hash_to_board = pickle.load(file)
+# Table that maps hash values of boards to their actual Numpy representation.
+hash_to_board = Game().boards
 
 # Preconfigured boards
 INITIAL_BOARD = np.zeros((10, 10), dtype="i1")
@@ -299,6 +303,330 @@ def test_avoid_loss_in_next_move_5(game_cls, heuristic_func):
     assert best_move == 4
 
 
+def test_iterative_deepening_matches_fixed_depth(filled_board_state, game_cls, heuristic_func):
+    """ Checks that iterative deepening to depth 3 finds the same move as a depth 3 search """
+
+    m = AlphaBeta(filled_board_state, game_cls, heuristic_func, 3)
+    best_move = m.run_iterative_deepening()
+
+    assert best_move == 2
+    assert m.completed_depth == 3
+
+
+def test_iterative_deepening_node_limit(game_cls, heuristic_func):
+    """ Checks that the search stops at the node budget and still returns a legal move """
+
+    parameterized_state = np.array([game_cls.board_to_hash(b) for b in INITIAL_BOARD])
+    start_node = GameTreeNode(parameterized_state, 5)
+    m = AlphaBeta(start_node, game_cls, heuristic_func, 9, node_limit=2000)
+    best_move = m.run_iterative_deepening()
+
+    assert m.nodes_generated <= 2000
+    assert 0 < m.completed_depth < 9
+    assert best_move in game_cls.legal_moves(parameterized_state, 5)
+
+
+def test_iterative_deepening_cancelled(filled_board_state, game_cls, heuristic_func):
+    """ Checks that a cancelled search still completes depth 1 and returns its move """
+
+    m = AlphaBeta(filled_board_state, game_cls, heuristic_func, 7)
+    m.cancel()
+    best_move = m.run_iterative_deepening()
+
+    assert m.completed_depth == 1
+    assert best_move == AlphaBeta(filled_board_state, game_cls, heuristic_func, 1).run()
+
+
+def test_iterative_deepening_without_time(game_cls, heuristic_func):
+    """ Checks that a search with no time left plays the move of a depth 1 search instead of the first legal cell """
+
+    parameterized_state = np.array([game_cls.board_to_hash(b) for b in MIDGAME_BOARD])
+
+    for algorithm in ('alphabeta', 'pvs', 'mtdf'):
+        m = AlphaBeta(GameTreeNode(parameterized_state, 1), game_cls, heuristic_func, 20, time_limit=0,
+                      tt=TranspositionTable(4), algorithm=algorithm)
+        best_move = m.run_iterative_deepening()
+
+        assert m.completed_depth == 1
+        # cell 5 wins board 1, cell 2 is the first legal cell
+        assert best_move == AlphaBeta(GameTreeNode(parameterized_state, 1), game_cls, heuristic_func, 1).run() == 5
+
+
+def test_transposition_table_reduces_nodes(game_cls, heuristic_func):
+    """ Checks that a transposition table finds the same move with fewer nodes """
+
+    state = np.array([[0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, -1, -1, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 1, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                      [0, 1, 0, 0, 0, -1, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0, 0, 0, 0]], dtype='i1')
+
+    parameterized_state = np.array([game_cls.board_to_hash(b) for b in state])
+
+    plain = AlphaBeta(GameTreeNode(parameterized_state, 3), game_cls, heuristic_func, 6)
+    plain_move = plain.run()
+
+    tt = TranspositionTable(4)
+    with_tt = AlphaBeta(GameTreeNode(parameterized_state, 3), game_cls, heuristic_func, 6, tt=tt)
+
+    assert with_tt.run() == plain_move
+    assert with_tt.nodes_generated < plain.nodes_generated
+    assert tt.hits > 0 and tt.cutoffs > 0
+
+    # the table also orders the moves of each iteration of iterative deepening
+    plain = AlphaBeta(GameTreeNode(parameterized_state, 3), game_cls, heuristic_func, 6)
+    with_tt = AlphaBeta(GameTreeNode(parameterized_state, 3), game_cls, heuristic_func, 6, tt=TranspositionTable(4))
+
+    assert with_tt.run_iterative_deepening() == plain.run_iterative_deepening()
+    assert with_tt.nodes_generated < plain.nodes_generated
+
+
+def test_move_ordering_reduces_nodes(game_cls, heuristic_func):
+    """ Checks that killer, history and counter move ordering finds the best move with fewer nodes """
+
+    state = np.array([[0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                      [0, -1, 0, 1, 0, 0, 0, 1, 0, -1],
+                      [0, 0, 0, 0, -1, 1, 0, -1, 0, 1],
+                      [0, 0, 1, -1, 0, 0, -1, 0, 0, 0],
+                      [0, 0, 0, 0, -1, 1, 0, 0, 1, 0],
+                      [0, 1, 0, 0, 0, -1, -1, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0, 0, 1, 1],
+                      [0, 0, -1, -1, 1, 0, 0, 0, 0, 0],
+                      [0, 1, -1, 0, 0, 0, 0, 0, -1, 0],
+                      [0, -1, 1, 1, 0, 0, 0, 0, 0, -1]], dtype='i1')
+
+    parameterized_state = np.array([game_cls.board_to_hash(b) for b in state])
+
+    plain = AlphaBeta(GameTreeNode(parameterized_state, 3), game_cls, heuristic_func, 5)
+    ordered = AlphaBeta(GameTreeNode(parameterized_state, 3), game_cls, heuristic_func, 5, ordering=MoveOrdering())
+
+    assert ordered.run_iterative_deepening() == plain.run_iterative_deepening() == 4
+    assert ordered.nodes_generated < plain.nodes_generated
+
+
+def test_pvs_matches_alphabeta(game_cls, heuristic_func):
+    """ Checks that Principal Variation Search with aspiration windows finds the same move as alpha beta """
+
+    for boards, curr in [(FILLED_BOARD, 4), (INITIAL_BOARD, 5)]:
+        parameterized_state = np.array([game_cls.board_to_hash(b) for b in boards])
+
+        alphabeta = AlphaBeta(GameTreeNode(parameterized_state, curr), game_cls, heuristic_func, 5,
+                              tt=TranspositionTable(4), ordering=MoveOrdering())
+        pvs = AlphaBeta(GameTreeNode(parameterized_state, curr), game_cls, heuristic_func, 5,
+                        tt=TranspositionTable(4), ordering=MoveOrdering(), algorithm='pvs')
+
+        assert pvs.run_iterative_deepening() == alphabeta.run_iterative_deepening()
+
+
+def test_mtdf_matches_alphabeta(game_cls, heuristic_func):
+    """ Checks that MTD(f) converges on the same score and move as a full window search """
+
+    for boards, curr in [(FILLED_BOARD, 4), (INITIAL_BOARD, 5)]:
+        parameterized_state = np.array([game_cls.board_to_hash(b) for b in boards])
+
+        alphabeta = AlphaBeta(GameTreeNode(parameterized_state, curr), game_cls, heuristic_func, 5)
+        mtdf = AlphaBeta(GameTreeNode(parameterized_state, curr), game_cls, heuristic_func, 5, algorithm='mtdf')
+
+        assert mtdf.run() == alphabeta.run()
+        assert mtdf.score == alphabeta.score
+        assert mtdf.mtdf_passes > 1
+
+        deepening = AlphaBeta(GameTreeNode(parameterized_state, curr), game_cls, heuristic_func, 5, algorithm='mtdf')
+
+        assert deepening.run_iterative_deepening() == alphabeta.run_iterative_deepening()
+        assert deepening.score == alphabeta.score
+
+
+def test_selective_pruning(game_cls, heuristic_func):
+    """ Checks the counters of late move reductions and futility pruning and that disabled settings change nothing """
+
+    parameterized_state = np.array([game_cls.board_to_hash(b) for b in INITIAL_BOARD])
+    plain = AlphaBeta(GameTreeNode(parameterized_state, 5), game_cls, heuristic_func, 6, tt=TranspositionTable(4),
+                      ordering=MoveOrdering())
+    move = plain.run_iterative_deepening()
+
+    # no node has more than 9 moves, and no move gains an infinite amount
+    unused = AlphaBeta(GameTreeNode(parameterized_state, 5), game_cls, heuristic_func, 6, tt=TranspositionTable(4),
+                       ordering=MoveOrdering(), lmr_moves=9, futility_margin=math.inf)
+
+    assert unused.run_iterative_deepening() == move
+    assert unused.nodes_generated == plain.nodes_generated
+    assert unused.reductions == 0 and unused.futility_prunes == 0
+
+    pruned = AlphaBeta(GameTreeNode(parameterized_state, 5), game_cls, heuristic_func, 6, tt=TranspositionTable(4),
+                       ordering=MoveOrdering(), lmr_moves=1, futility_margin=0)
+    pruned.run_iterative_deepening()
+
+    assert pruned.reductions > 0 and 0 <= pruned.reduction_researches <= pruned.reductions
+    assert pruned.futility_prunes > 0
+    assert pruned.nodes_generated < plain.nodes_generated
+
+
+def test_extension_sees_threat_past_horizon(game_cls, heuristic_func):
+    """ Checks that a move sending the opponent to a board they can win is found at depth 1 with extensions """
+
+    state = np.zeros(shape=(10, 10), dtype='i1')
+    state[1] = [0, 0, -1, -1, 0, 0, 0, 0, 0, 0]
+    state[2][5] = 1
+    state[5][1] = 1
+    state[5][5] = -1
+    parameterized_state = np.array([game_cls.board_to_hash(b) for b in state])
+
+    plain = AlphaBeta(GameTreeNode(parameterized_state, 3), game_cls, heuristic_func, 1, root_moves=[1])
+    plain.run()
+    extended = AlphaBeta(GameTreeNode(parameterized_state, 3), game_cls, heuristic_func, 1, root_moves=[1],
+                         extension_plies=2)
+    extended.run()
+
+    assert extended.extensions == 1
+    assert extended.score < plain.score - 1000
+
+    # no extensions once the budget is spent
+    exhausted = AlphaBeta(GameTreeNode(parameterized_state, 3), game_cls, heuristic_func, 1, root_moves=[1],
+                          extension_plies=2, extension_budget=0)
+    exhausted.run()
+
+    assert exhausted.extensions == 0 and exhausted.score == plain.score
+
+
+def test_principal_variation(game_cls, heuristic_func):
+    """ Checks that the principal variation starts with the best move and only contains legal moves """
+
+    boards, curr = INITIAL_BOARD, 5
+    parameterized_state = np.array([game_cls.board_to_hash(b) for b in boards])
+    search = AlphaBeta(GameTreeNode(parameterized_state, curr), game_cls, heuristic_func, 5, tt=TranspositionTable(4),
+                       ordering=MoveOrdering())
+    best_move = search.run()
+    pv = search.principal_variation()
+
+    assert pv[0] == best_move and 1 < len(pv) <= 5
+
+    boards = boards.copy()
+    player = 1
+    for move in pv:
+        assert boards[curr][move] == 0
+        boards[curr][move] = player
+        curr, player = move, -player
+
+
+def test_seeded_search_matches(game_cls, heuristic_func):
+    """ Checks that seeding a search with a first move and a score guess does not change its result """
+
+    parameterized_state = np.array([game_cls.board_to_hash(b) for b in FILLED_BOARD])
+    plain = AlphaBeta(GameTreeNode(parameterized_state, 4), game_cls, heuristic_func, 5)
+    move = plain.run()
+
+    for guess in (plain.score, plain.score - 100, plain.score + 100):
+        seeded = AlphaBeta(GameTreeNode(parameterized_state, 4), game_cls, heuristic_func, 5, first_move=9,
+                           guess=guess)
+
+        assert seeded.run() == move and seeded.score == plain.score
+
+
+def test_unknown_algorithm(filled_board_state, game_cls, heuristic_func):
+    with pytest.raises(ValueError):
+        AlphaBeta(filled_board_state, game_cls, heuristic_func, 3, algorithm='minimax')
+
+
+def test_batch_frontier_matches_search(game_cls, heuristic_func):
+    """ Checks that scoring the last two plies in numpy batches gives the same move and score as searching them """
+
+    for boards, curr in [(FILLED_BOARD, 4), (INITIAL_BOARD, 5)]:
+        parameterized_state = np.array([game_cls.board_to_hash(b) for b in boards])
+
+        for algorithm in ('alphabeta', 'pvs'):
+            for depth in (2, 3, 5):
+                plain = AlphaBeta(GameTreeNode(parameterized_state, curr), game_cls, heuristic_func, depth,
+                                  algorithm=algorithm)
+                batched = AlphaBeta(GameTreeNode(parameterized_state, curr), game_cls, heuristic_func, depth,
+                                    algorithm=algorithm, batch_frontier=True)
+
+                assert batched.run() == plain.run()
+                assert batched.score == plain.score
+
+    # with a transposition table and move ordering the batches store exact scores
+    parameterized_state = np.array([game_cls.board_to_hash(b) for b in FILLED_BOARD])
+    plain = AlphaBeta(GameTreeNode(parameterized_state, 4), game_cls, heuristic_func, 5, tt=TranspositionTable(4),
+                      ordering=MoveOrdering())
+    batched = AlphaBeta(GameTreeNode(parameterized_state, 4), game_cls, heuristic_func, 5, tt=TranspositionTable(4),
+                        ordering=MoveOrdering(), batch_frontier=True)
+    assert batched.run_iterative_deepening() == plain.run_iterative_deepening()
+    assert batched.score == plain.score
+
+
+def test_iterative_matches_recursive(game_cls, heuristic_func):
+    """ Checks that the search driven by an explicit stack visits the same nodes and finds the same result """
+
+    for boards, curr in [(FILLED_BOARD, 4), (INITIAL_BOARD, 5)]:
+        parameterized_state = np.array([game_cls.board_to_hash(b) for b in boards])
+
+        for algorithm in ('alphabeta', 'pvs', 'mtdf'):
+            for kwargs in ({}, {'extension_plies': 4}, {'lmr_moves': 2, 'futility_margin': 300}):
+                searches = [AlphaBeta(GameTreeNode(parameterized_state, curr), game_cls, heuristic_func, 5,
+                                      tt=TranspositionTable(4), ordering=MoveOrdering(), algorithm=algorithm,
+                                      iterative=iterative, **kwargs) for iterative in (False, True)]
+                recursive, iterative = [(s.run_iterative_deepening(), s.score, s.nodes_generated, s.researches,
+                                         s.reductions, s.principal_variation()) for s in searches]
+
+                assert iterative == recursive
+
+
+# Memory blocks a search may leave allocated per node searched. A search only allocates its root children and a few
+# other objects of its own; the tables and lists used at every node are reused or replaced
+BLOCKS_PER_NODE = 0.1
+
+
+def test_search_allocates_nothing_per_node(game_cls, heuristic_func):
+    """ Checks with tracemalloc snapshots that a search set up as the agent's does not keep any object per node it
+    searches """
+
+    state = np.zeros((10, 10), dtype='i1')
+    state[1][2] = state[1][3] = state[5][5] = -1
+    state[2][5] = state[5][1] = 1
+    parameterized_state = np.array([game_cls.board_to_hash(b) for b in state])
+
+    tt = TranspositionTable()
+    ordering = MoveOrdering()
+
+    def search():
+        return AlphaBeta(GameTreeNode(parameterized_state, 3), game_cls, heuristic_func, 6, tt=tt, ordering=ordering,
+                         extension_plies=4, symmetry=True)
+
+    # the first search fills the caches of Game and the tables. The second one is traced, so that the entries the
+    # measured search replaces are freed in the snapshots too
+    search().run()
+    tracemalloc.start()
+    try:
+        search().run()
+        measured_search = search()
+        before = tracemalloc.take_snapshot()
+        measured_search.run()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    player_code = [tracemalloc.Filter(True, os.path.join(PLAYER_DIR, '*'))]
+    kept = sum(stat.count_diff for stat in after.filter_traces(player_code).compare_to(
+        before.filter_traces(player_code), 'lineno'))
+
+    assert measured_search.nodes_generated > 1000
+    assert kept / measured_search.nodes_generated < BLOCKS_PER_NODE
+
+
+def test_gc_paused():
+    assert gc.isenabled()
+    with gc_paused():
+        with gc_paused():
+            assert not gc.isenabled()
+        assert not gc.isenabled()
+    assert gc.isenabled()
+
+
 if __name__ == "__main__":
     import cProfile
 
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from player.AlphaBeta import AlphaBeta
+from player.BitBoard import BitBoardGame, BitBoardHeuristic, BASE3_TO_BITBOARD
+from player.Benchmark import POSITIONS
+from player.Game import Game
+from player.GameTreeNode import GameTreeNode
+from player.Heuristic import Heuristic
+from player.MoveOrdering import MoveOrdering
+from player.TranspositionTable import TranspositionTable
+
+
+@pytest.fixture(scope='module')
+def game_cls():
+    g = Game()
+    g.load()
+    return g
+
+
+@pytest.fixture(scope='module')
+def heuristic_func():
+    h = Heuristic()
+    h.load()
+    return h
+
+
+def test_tables_match_game(game_cls: Game):
+    """ Checks every board against the base 3 hashes of Game """
+    bit_game = BitBoardGame()
+
+    for board_hash, bitboard in enumerate(BASE3_TO_BITBOARD):
+        board = game_cls.hash_to_board(board_hash)
+
+        assert bit_game.board_to_hash(board) == bitboard
+        assert (bit_game.hash_to_board(bitboard) == board).all()
+        assert bit_game.empty_cells(bitboard) == game_cls.empty_cells(board_hash)
+        assert bit_game.is_win(bitboard) == game_cls.is_win(board_hash)
+        if not game_cls.is_win(board_hash):
+            for player in (1, -1):
+                assert bit_game.winning_cells(bitboard, player) == game_cls.winning_cells(board_hash, player)
+
+
+def test_generate_moves():
+    bit_game = BitBoardGame()
+    board = np.array([0, 1, 1, 0, -1, -1, 0, 0, 0, 0], dtype='i1')
+    state = [0] * 10
+    state[5] = bit_game.board_to_hash(board)
+
+    children = [(child.move, child.state[5]) for child in bit_game.generate_moves(state, 5, -1)]
+
+    assert [move for move, _ in children] == [3, 6, 7, 8, 9]
+    assert bit_game.is_win(dict(children)[6])
+    assert state[5] == bit_game.board_to_hash(board)
+
+
+def test_search_matches_numpy(game_cls: Game, heuristic_func: Heuristic):
+    """ Checks that the search finds the same move, score and node count on both representations """
+    bit_game = BitBoardGame()
+    bit_heuristic = BitBoardHeuristic()
+    bit_heuristic.load(heuristic_func)
+
+    for boards, curr in POSITIONS.values():
+        state = np.array([game_cls.board_to_hash(b) for b in boards])
+        numpy_search = AlphaBeta(GameTreeNode(state, curr), game_cls, heuristic_func, 5, tt=TranspositionTable(4),
+                                 ordering=MoveOrdering())
+        bit_search = AlphaBeta(GameTreeNode([bit_game.board_to_hash(b) for b in boards], curr), bit_game,
+                               bit_heuristic, 5, tt=TranspositionTable(4), ordering=MoveOrdering())
+
+        assert bit_search.run_iterative_deepening() == numpy_search.run_iterative_deepening()
+        assert bit_search.score == numpy_search.score
+        assert bit_search.nodes_generated == numpy_search.nodes_generated
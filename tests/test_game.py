@@ -1,6 +1,6 @@
 import numpy as np
 import pytest
-from player.Game import Game
+from player.Game import Game, NO_MOVE, NUM_HASHES
 from player.GameTreeNode import GameTreeNode
 
 
@@ -28,3 +28,52 @@ def test_not_win_state(game_cls: Game):
     node = GameTreeNode(parameterized_board, 4)
     assert game_cls.is_terminal(node) is False
 
+
+
+def test_winning_cells(game_cls: Game):
+    board = np.array([0, 1, 1, 0, -1, -1, 0, 0, 0, 0], dtype='i1')
+    board_hash = game_cls.board_to_hash(board)
+
+    assert game_cls.winning_cells(board_hash, 1) == (3,)
+    assert game_cls.winning_cells(board_hash, -1) == (6,)
+
+
+def test_move_tables(game_cls: Game):
+    """ Checks the dense move tables against playing the moves on boards """
+    for board_hash in (0, 1234, 19682):
+        board = game_cls.hash_to_board(board_hash)
+        for cell in range(1, 10):
+            for player in (1, -1):
+                if board[cell] != 0:
+                    assert game_cls.child_hash[board_hash, cell, player] == NO_MOVE
+                    continue
+
+                child = board.copy()
+                child[cell] = player
+                assert game_cls.child_hash[board_hash, cell, player] == game_cls.board_to_hash(child)
+                assert game_cls.child_wins[board_hash, cell, player] == Game.is_terminal_node(child)
+
+        assert game_cls.empty_masks[board_hash] == sum(1 << c for c in range(1, 10) if board[c] == 0)
+
+
+def test_generate_moves(game_cls: Game):
+    board = np.array([0, 1, 1, 0, -1, -1, 0, 0, 0, 0], dtype='i1')
+    state = np.zeros(10, dtype=np.int64)
+    state[5] = game_cls.board_to_hash(board)
+
+    for child in game_cls.generate_moves(state, 5, -1):
+        expected = board.copy()
+        expected[child.move] = -1
+        assert child.parent == 5
+        assert child.state[5] == game_cls.board_to_hash(expected)
+    assert state[5] == game_cls.board_to_hash(board)
+
+
+def test_tables_are_memory_mapped(game_cls: Game):
+    """ Checks that the tables are shared read-only mappings and that hashing matches the board table """
+    for table in (game_cls.boards, game_cls.win_states, game_cls.child_hash, game_cls.child_wins, game_cls.empty_masks):
+        assert isinstance(table, np.memmap)
+        assert not table.flags.writeable
+
+    for board_hash in range(0, NUM_HASHES, 97):
+        assert game_cls.board_to_hash(game_cls.hash_to_board(board_hash)) == board_hash
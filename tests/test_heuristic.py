@@ -261,3 +261,19 @@ def test_calculate_diagonal3(heuristic_func, partial_board):
     """ Checks that refactored calculate_diagonal is equivalent to the original """
     assert calculate_diagonal(partial_board.state[2]) == heuristic_func.calculate_diagonal(partial_board.state[2])
 
+
+
+def test_set_params_takes_effect(heuristic_func, game_cls):
+    """ Checks that the values follow set_params and match the per-board calculation they replace """
+    calculate = heuristic_func._Heuristic__calculate_board_heuristic
+    hashes = range(0, 3 ** 9, 7)
+
+    for params in [(45, 10, 90, 10, 1000000, -100000), (60, 20, 80, 15, 1000, -1000)]:
+        heuristic_func.set_params(*params)
+        for board_hash in hashes:
+            assert heuristic_func.board_heuristic(board_hash) == calculate(game_cls.hash_to_board(board_hash))
+
+    parameterized_board = [game_cls.board_to_hash(s) for s in PARTIAL_BOARD]
+    before = heuristic_func.compute_heuristic(parameterized_board, 1)
+    heuristic_func.set_params(60, 20, 180, 15, 1000, -1000)
+    assert heuristic_func.compute_heuristic(parameterized_board, 1) != before
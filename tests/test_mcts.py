@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from player.Game import Game
+from player.Heuristic import Heuristic
+from player.MCTS import MCTS
+
+FILLED_BOARD = np.array([[0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                         [0, -1, 0, 0, -1, 1, 0, 0, 1, 0],
+                         [0, 1, 0, 0, 0, 1, 0, 0, -1, 0],
+                         [0, 0, -1, 1, 0, -1, 1, 0, 0, 0],
+                         [0, 0, 0, 0, 1, 1, -1, 0, 1, -1],
+                         [0, 0, -1, -1, -1, 0, 0, 1, 0, 1],
+                         [0, -1, 1, 1, 0, -1, 0, 0, 0, 1],
+                         [0, 1, 0, -1, 1, 0, -1, 0, 0, 0],
+                         [0, 0, 0, -1, 0, 0, 1, -1, 0, 1],
+                         [0, 0, 0, 0, -1, 0, -1, -1, -1, 1]], dtype='i1')
+
+
+@pytest.fixture(scope='module')
+def game_cls():
+    g = Game()
+    g.load()
+    return g
+
+
+@pytest.fixture(scope='module')
+def heuristic_func():
+    h = Heuristic()
+    h.load()
+    return h
+
+
+def test_play_move_matches_board_to_hash(game_cls):
+    board = np.zeros(10, dtype='i1')
+    h = game_cls.board_to_hash(board)
+    for cell, player in [(5, 1), (1, -1), (9, 1)]:
+        board[cell] = player
+        h = game_cls.play_move(h, cell, player)
+        assert h == game_cls.board_to_hash(board)
+
+
+@pytest.mark.parametrize('prior_visits', [0, 10])
+def test_finds_win_in_one(game_cls, heuristic_func, prior_visits):
+    """ Checks that MCTS plays the move that completes three in a row """
+    m = MCTS(game_cls, heuristic_func, time_limit=10, iteration_limit=2000, prior_visits=prior_visits, seed=1)
+    m.set_root([game_cls.board_to_hash(b) for b in FILLED_BOARD], 4)
+
+    assert m.run() == 2
+    assert m.playouts == 2000
+
+
+def test_tree_is_reused(game_cls, heuristic_func):
+    """ Checks that the subtree of the position two plies down becomes the new root """
+    m = MCTS(game_cls, heuristic_func, iteration_limit=3000, seed=1)
+    boards = np.zeros((10, 10), dtype='i1')
+    boards[5][3] = -1
+    m.set_root([game_cls.board_to_hash(b) for b in boards], 3)
+    move = m.run()
+
+    boards[3][move] = 1
+    reply = m.root.children[0].children[0] if m.root.children[0].move == move else \
+        next(c for c in m.root.children if c.move == move).children[0]
+    boards[move][reply.move] = -1
+    visits = reply.visits
+
+    m.set_root([game_cls.board_to_hash(b) for b in boards], reply.move)
+    assert m.root is reply
+    assert m.root.visits == visits > 0
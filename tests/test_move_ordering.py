@@ -0,0 +1,36 @@
+from player.MoveOrdering import MoveOrdering
+
+
+def test_default_order_is_cell_order():
+    """ Checks that moves keep their order when nothing has been learnt yet """
+    o = MoveOrdering()
+    assert o.order([1, 2, 3, 7], 0, 5, 1) == [1, 2, 3, 7]
+
+
+def test_hash_move_killers_and_counter_move():
+    """ Checks the priority: hash move, killers, counter move and finally history """
+    o = MoveOrdering()
+    o.cutoff(9, 3, 5, 1, 4)     # history only (different ply)
+    o.cutoff(2, 1, 5, 1, 1)     # killer at ply 1
+    o.cutoff(8, 2, 4, -1, 1, prev_board=6)     # counter move for a move from board 6 into board 4
+
+    assert o.order([1, 2, 3, 9], 1, 5, 1) == [2, 9, 1, 3]
+    assert o.order([1, 2, 3, 9], 1, 5, 1, hash_move=3) == [3, 2, 9, 1]
+    assert o.order([1, 3, 8], 5, 4, -1, prev_board=6) == [8, 1, 3]
+
+
+def test_history_is_per_player():
+    o = MoveOrdering()
+    o.cutoff(7, 10, 2, -1, 3)
+
+    assert o.order([1, 7], 0, 2, -1) == [7, 1]
+    assert o.order([1, 7], 0, 2, 1) == [1, 7]
+
+
+def test_age_shifts_killers_and_halves_history():
+    o = MoveOrdering()
+    o.cutoff(4, 2, 1, 1, 2)
+    o.age()
+
+    assert o._killers[0][0] == 4
+    assert o._history[1][4][1] == 2
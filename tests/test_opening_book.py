@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from agent import Agent
+from player.Game import Game
+from player.Heuristic import Heuristic
+from player.OpeningBook import OpeningBook, opening_positions
+from player.Symmetry import PERMUTATIONS, transform
+
+
+@pytest.fixture(scope='module')
+def game_cls():
+    g = Game()
+    g.load()
+    return g
+
+
+@pytest.fixture(scope='module')
+def heuristic_func():
+    h = Heuristic()
+    h.load()
+    return h
+
+
+@pytest.fixture(scope='module')
+def book(tmp_path_factory):
+    b = OpeningBook(str(tmp_path_factory.mktemp('book') / 'book.npy'))
+    b.build(plies=1, depth=2, workers=1)
+    b.save()
+    return b
+
+
+def test_opening_positions():
+    assert len(list(opening_positions(1))) == 81
+    assert len(list(opening_positions(2))) == 81 * 9 - 9
+
+
+def test_symmetric_positions_are_stored_once(book: OpeningBook):
+    """ The 81 second_move positions fall into 15 classes under the 8 symmetries """
+    assert len(book) == 15
+    assert (np.diff(book.entries['key'].astype(np.float64)) > 0).all()
+
+
+def test_lookup(book: OpeningBook):
+    """ Checks that every second_move position has a legal book move that follows the position's symmetries """
+    for boards, curr in opening_positions(1):
+        move = book.lookup(boards, curr)
+        assert move is not None and boards[curr][move] == 0
+
+    # board 1 and cell 2 are only fixed by the identity, so the move maps exactly
+    boards = np.zeros((10, 10), dtype='i1')
+    boards[1][2] = -1
+    move = book.lookup(boards, 2)
+    for s, perm in enumerate(PERMUTATIONS):
+        assert book.lookup(transform(boards, s), perm[2]) == perm[move]
+
+    # not an opening position
+    boards[2][move] = 1
+    boards[move][5] = -1
+    assert book.lookup(boards, 5) is None
+
+
+def test_load(book: OpeningBook, tmp_path):
+    loaded = OpeningBook(book.path)
+
+    assert loaded.load()
+    assert (loaded.entries == book.entries).all()
+    assert not OpeningBook(str(tmp_path / 'missing.npy')).load()
+    assert OpeningBook(str(tmp_path / 'missing.npy')).lookup(np.zeros((10, 10), dtype='i1'), 1) is None
+
+
+def test_agent_plays_book_move(book: OpeningBook, game_cls: Game, heuristic_func: Heuristic):
+    a = Agent(game_cls, heuristic_func, depth=2, book=book)
+    a.parse("start(x)")
+    move = a.parse("second_move(4,7)")
+
+    boards = np.zeros((10, 10), dtype='i1')
+    boards[4][7] = -1
+    assert move == book.lookup(boards, 7)
+    assert a._book_moves == 1
+
+
+def test_agent_plays_third_move_book_move(game_cls: Game, heuristic_func: Heuristic, tmp_path):
+    """ third_move(4,7,2): our random piece in cell 7 of board 4 and the opponent's reply in cell 2 of board 7 """
+    book = OpeningBook(str(tmp_path / 'book.npy'))
+    book.build(plies=2, depth=1, workers=1)
+
+    a = Agent(game_cls, heuristic_func, depth=2, book=book)
+    a.parse("start(x)")
+    move = a.parse("third_move(4,7,2)")
+
+    boards = np.zeros((10, 10), dtype='i1')
+    boards[4][7] = 1
+    boards[7][2] = -1
+    assert a._boards[4][7] == 1 and a._boards[7][2] == -1
+    assert move == book.lookup(boards, 2)
+    assert a._book_moves == 1
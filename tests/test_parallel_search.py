@@ -0,0 +1,89 @@
+import math
+import multiprocessing
+import numpy as np
+import pytest
+from player import ParallelSearch as parallel
+from player.AlphaBeta import AlphaBeta
+from player.Game import Game
+from player.GameTreeNode import GameTreeNode
+from player.Heuristic import Heuristic
+from player.ParallelSearch import ParallelSearch
+
+MIDGAME_BOARD = np.array([[0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                          [0, -1, 0, 1, 0, 0, 0, 1, 0, -1],
+                          [0, 0, 0, 0, -1, 1, 0, -1, 0, 1],
+                          [0, 0, 1, -1, 0, 0, -1, 0, 0, 0],
+                          [0, 0, 0, 0, -1, 1, 0, 0, 1, 0],
+                          [0, 1, 0, 0, 0, -1, -1, 0, 0, 0],
+                          [0, 0, 0, 0, 0, 0, 0, 0, 1, 1],
+                          [0, 0, -1, -1, 1, 0, 0, 0, 0, 0],
+                          [0, 1, -1, 0, 0, 0, 0, 0, -1, 0],
+                          [0, -1, 1, 1, 0, 0, 0, 0, 0, -1]], dtype='i1')
+
+
+@pytest.fixture(scope='module')
+def game_cls():
+    g = Game()
+    g.load()
+    return g
+
+
+@pytest.fixture(scope='module')
+def heuristic_func():
+    h = Heuristic()
+    h.load()
+    return h
+
+
+@pytest.fixture(scope='module')
+def pool():
+    with ParallelSearch(2) as p:
+        yield p
+
+
+@pytest.mark.parametrize('curr, depth', [(3, 5), (8, 4)])
+def test_parallel_matches_serial(game_cls, heuristic_func, pool, curr, depth):
+    """ Checks that splitting the root between workers gives the same move and score as the serial search """
+    parameterized_state = np.array([game_cls.board_to_hash(b) for b in MIDGAME_BOARD])
+
+    serial = AlphaBeta(GameTreeNode(parameterized_state, curr), game_cls, heuristic_func, depth)
+    move = serial.run()
+
+    assert pool.run(GameTreeNode(parameterized_state, curr), game_cls, depth) == move
+    assert pool.score == serial.score
+    assert pool.nodes_generated > 0
+
+
+@pytest.mark.parametrize('curr, depth', [(3, 5), (8, 4)])
+def test_parallel_uses_search_options(game_cls, heuristic_func, curr, depth):
+    """ Checks that the options of the agent's search reach the workers """
+    parameterized_state = np.array([game_cls.board_to_hash(b) for b in MIDGAME_BOARD])
+    options = dict(extension_plies=4, lmr_moves=3, futility_margin=40)
+
+    serial = AlphaBeta(GameTreeNode(parameterized_state, curr), game_cls, heuristic_func, depth, symmetry=True,
+                       **options)
+    move = serial.run()
+
+    with ParallelSearch(2, symmetry=True, **options) as pool:
+        assert pool.run(GameTreeNode(parameterized_state, curr), game_cls, depth) == move
+        assert pool.score == serial.score
+
+
+def test_tables_are_aged_once_per_search(game_cls, monkeypatch):
+    """ Checks that a worker ages its move ordering and transposition table once per search, not once per root move """
+    # the worker is set up in this process, so its globals and the frozen heap are put back when the test ends
+    for name in ('_game', '_heuristic', '_tt', '_ordering', '_alpha', '_algorithm', '_options', '_search_id'):
+        monkeypatch.setattr(parallel, name, getattr(parallel, name))
+    monkeypatch.setattr(parallel.gc, 'freeze', lambda: None)
+    parallel._init_worker(multiprocessing.Value('d', -math.inf), 'alphabeta', 1, {})
+    state = np.array([game_cls.board_to_hash(b) for b in MIDGAME_BOARD])
+    aged = []
+    monkeypatch.setattr(parallel._ordering, 'age', lambda: aged.append(1))
+    generation = parallel._tt.generation
+
+    for move in game_cls.legal_moves(state, 3):
+        parallel._search_root_move(state, 3, move, 3, 1)
+    assert len(aged) == 1 and parallel._tt.generation == generation + 1
+
+    parallel._search_root_move(state, 3, 1, 3, 2)
+    assert len(aged) == 2 and parallel._tt.generation == generation + 2
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from player.BitBoard import BitBoardGame, BitBoardHeuristic
+from player.Game import Game
+from player.Heuristic import Heuristic
+from player.SearchState import SearchState
+from player.TranspositionTable import Zobrist
+
+BOARDS = np.zeros((10, 10), dtype='i1')
+BOARDS[1][2] = 1
+BOARDS[2][5] = -1
+BOARDS[5][1] = 1
+BOARDS[5][3] = 1
+
+
+@pytest.fixture(scope='module')
+def game_cls():
+    g = Game()
+    g.load()
+    return g
+
+
+@pytest.fixture(scope='module')
+def heuristic_func():
+    h = Heuristic()
+    h.load()
+    return h
+
+
+def check_line(game, heuristic, state: np.ndarray, curr_board: int):
+    """ Plays a line of moves and checks the incremental values against recomputing them, then takes it back """
+    zobrist = Zobrist()
+    s = SearchState(game, heuristic, state, curr_board, zobrist=zobrist)
+    start = (list(s.boards), s.board, s.parent, s.value, s.key)
+
+    player = -1
+    for cell in (5, 9, 5, 2):
+        s.make_move(cell, player)
+        player = -player
+
+        assert s.board == cell
+        assert s.heuristic(3) == heuristic.compute_heuristic(s.boards, 3)
+        assert s.key == zobrist.key(game, s.boards, s.board)
+
+    # board 5 now has 1 in cells 1, 2 and 3
+    assert s.is_terminal()
+
+    for _ in range(4):
+        s.unmake_move()
+    assert (list(s.boards), s.board, s.parent, s.value, s.key) == start
+    assert not s.is_terminal()
+
+
+def test_make_unmake(game_cls: Game, heuristic_func: Heuristic):
+    check_line(game_cls, heuristic_func, np.array([game_cls.board_to_hash(b) for b in BOARDS]), 1)
+
+
+def test_make_unmake_bitboard(heuristic_func: Heuristic):
+    bit_game = BitBoardGame()
+    bit_heuristic = BitBoardHeuristic()
+    bit_heuristic.load(heuristic_func)
+
+    check_line(bit_game, bit_heuristic, [bit_game.board_to_hash(b) for b in BOARDS], 1)
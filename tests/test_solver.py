@@ -0,0 +1,117 @@
+import time
+import numpy as np
+import pytest
+from agent import Agent
+from player.Game import Game
+from player.Heuristic import Heuristic
+from player.Solver import Solver, WIN_SCORE, DRAW_SCORE
+from tests.test_alphabeta import FILLED_BOARD
+
+# A full board that nobody has won
+DRAWN_BOARD = [0, 1, -1, 1, 1, -1, -1, -1, 1, 1]
+
+
+@pytest.fixture(scope='module')
+def game_cls():
+    g = Game()
+    g.load()
+    return g
+
+
+@pytest.fixture(scope='module')
+def heuristic_func():
+    h = Heuristic()
+    h.load()
+    return h
+
+
+def to_state(game_cls: Game, boards) -> np.ndarray:
+    return np.array([game_cls.board_to_hash(np.array(b)) for b in boards])
+
+
+def test_win_in_one(game_cls: Game):
+    """ Checks that the solver takes an immediate win """
+    score, move = Solver(game_cls).solve(to_state(game_cls, FILLED_BOARD), 4)
+
+    assert move == 2
+    assert score == WIN_SCORE
+
+
+def test_no_moves_is_draw(game_cls: Game):
+    """ Checks that a player who is sent to a full board draws """
+    boards = np.zeros(shape=(10, 10), dtype='i1')
+    boards[1] = DRAWN_BOARD
+
+    assert Solver(game_cls).solve(to_state(game_cls, boards), 1) == (DRAW_SCORE, None)
+
+
+def test_sending_to_full_board_is_draw(game_cls: Game):
+    """ Checks the score of a move that sends the opponent to a full board """
+    boards = np.zeros(shape=(10, 10), dtype='i1')
+    boards[1] = DRAWN_BOARD
+    boards[1][4] = 0
+    boards[4] = DRAWN_BOARD
+
+    assert Solver(game_cls).solve(to_state(game_cls, boards), 1) == (DRAW_SCORE, 4)
+
+
+def test_forced_loss(game_cls: Game):
+    """ Checks that a lost position is scored as a loss one ply away """
+    boards = np.zeros(shape=(10, 10), dtype='i1')
+    boards[1] = [0, 1, 0, 0, 1, -1, 1, -1, 1, -1]
+    boards[2] = [0, -1, -1, 0, 0, 0, 0, 0, 0, 0]
+    boards[3] = [0, -1, -1, 0, 0, 0, 0, 0, 0, 0]
+
+    score, move = Solver(game_cls).solve(to_state(game_cls, boards), 1)
+
+    # both moves on board 1 send the opponent to a board they can win on
+    assert score == -(WIN_SCORE - 1)
+    assert move in (2, 3)
+
+
+def test_node_limit(game_cls: Game):
+    """ Checks that the solver gives up on positions it cannot solve within its budget """
+    solver = Solver(game_cls, node_limit=100)
+
+    assert solver.solve(np.zeros(10, dtype=int), 5) is None
+    assert solver.nodes_generated == 101
+
+
+def test_deadline(game_cls: Game):
+    """ Checks that the solver gives up once its deadline has passed """
+    solver = Solver(game_cls)
+
+    assert solver.solve(np.zeros(10, dtype=int), 5, deadline=time.perf_counter()) is None
+    assert solver.nodes_generated == 1
+
+
+def test_agent_uses_solver(game_cls: Game, heuristic_func: Heuristic):
+    """ Checks that the agent plays solved moves without searching """
+    a = Agent(game_cls, heuristic_func, depth=4, endgame_empty_cells=81)
+    a.parse("start(x)")
+    a._boards = FILLED_BOARD.copy()
+    a._curr = 4
+
+    assert a.play() == 2
+    assert a._solved_moves == 1
+
+
+def test_agent_solver_time_and_retries(game_cls: Game, heuristic_func: Heuristic, monkeypatch):
+    """ Checks that a failed solve only takes its share of the move's time and is not retried until the next game """
+    a = Agent(game_cls, heuristic_func, time_limit=0.2, endgame_empty_cells=81, solver_node_limit=None)
+    calls = []
+    solve = a._solver.solve
+    monkeypatch.setattr(a._solver, 'solve', lambda *args: calls.append(args) or solve(*args))
+    a.parse("start(x)")
+
+    start = time.perf_counter()
+    move = a.parse("second_move(5,3)")
+    assert time.perf_counter() - start < 0.4
+    assert a._boards[3][move] == 1 and a._solved_moves == 0
+
+    a.parse("next_move({})".format(next(c for c in range(1, 10) if a._boards[move][c] == 0)))
+    assert len(calls) == 1
+
+    a.parse("start(x)")
+    a.parse("second_move(5,3)")
+    assert len(calls) == 2
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from player.AlphaBeta import AlphaBeta
+from player.Game import Game
+from player.GameTreeNode import GameTreeNode
+from player.Heuristic import Heuristic
+from player.Symmetry import PERMUTATIONS, INVERSES, canonical, canonical_state, distinct_moves, transform, \
+    transform_all, transform_state
+from player.TranspositionTable import Zobrist
+
+BOARDS = np.zeros((10, 10), dtype='i1')
+BOARDS[1][2] = 1
+BOARDS[2][6] = -1
+BOARDS[6][9] = 1
+
+
+@pytest.fixture(scope='module')
+def game_cls():
+    g = Game()
+    g.load()
+    return g
+
+
+@pytest.fixture(scope='module')
+def heuristic_func():
+    h = Heuristic()
+    h.load()
+    return h
+
+
+def to_state(game: Game, boards: np.ndarray) -> np.ndarray:
+    return np.array([game.board_to_hash(b) for b in boards])
+
+
+def test_permutations():
+    """ Checks that there are 8 distinct symmetries that keep the centre and the corners in place as a set """
+    assert len({tuple(p) for p in PERMUTATIONS}) == 8
+    assert (PERMUTATIONS[0] == np.arange(10)).all()
+
+    for perm, inverse in zip(PERMUTATIONS, INVERSES):
+        assert perm[0] == 0 and perm[5] == 5
+        assert set(perm[[1, 3, 7, 9]]) == {1, 3, 7, 9}
+        assert (perm[inverse] == np.arange(10)).all()
+
+
+def test_transform_moves_pieces():
+    for s, perm in enumerate(PERMUTATIONS):
+        moved = transform(BOARDS, s)
+
+        assert moved[perm[1]][perm[2]] == 1 and moved[perm[2]][perm[6]] == -1 and moved[perm[6]][perm[9]] == 1
+        assert np.count_nonzero(moved) == 3
+        assert (transform_all(BOARDS)[s] == moved).all()
+
+
+def test_canonical_key_is_shared_by_symmetric_positions():
+    z = Zobrist()
+    key, symmetry = canonical(z, BOARDS, 9)
+
+    # the canonical image has the canonical key
+    assert z.boards_key(transform(BOARDS, symmetry), PERMUTATIONS[symmetry][9]) == key
+
+    for s, perm in enumerate(PERMUTATIONS):
+        assert canonical(z, transform(BOARDS, s), perm[9])[0] == key
+
+    # a different board in play is a different position
+    assert canonical(z, BOARDS, 6)[0] != key
+
+
+def test_canonical_state_matches_canonical(game_cls: Game):
+    z = Zobrist()
+    state = to_state(game_cls, BOARDS)
+
+    for s in range(8):
+        image = transform_state(state, s)
+        assert (image == to_state(game_cls, transform(BOARDS, s))).all()
+        assert z.hashes_key(image, 4) == z.boards_key(transform(BOARDS, s), 4) == z.key(game_cls, image, 4)
+
+    for curr in range(1, 10):
+        assert canonical_state(z, state, curr) == canonical(z, BOARDS, curr)
+
+
+def test_distinct_moves(game_cls: Game, heuristic_func: Heuristic):
+    empty = np.zeros(10, dtype=np.int64)
+    assert distinct_moves(empty, 5, list(range(1, 10))) == [1, 2, 5]
+    # with a corner in play only the diagonal through it is a symmetry
+    assert distinct_moves(empty, 1, list(range(1, 10))) == [1, 2, 3, 5, 6, 9]
+    # a position without symmetries keeps all its moves
+    state = to_state(game_cls, BOARDS)
+    assert distinct_moves(state, 5, game_cls.legal_moves(state, 5)) == game_cls.legal_moves(state, 5)
+
+    node = GameTreeNode(empty, 5)
+    scores = []
+    for symmetry in (False, True):
+        search = AlphaBeta(node, game_cls, heuristic_func, 4, symmetry=symmetry)
+        search.run()
+        scores.append((search.score, search.nodes_generated))
+    assert scores[0][0] == scores[1][0] and scores[1][1] < scores[0][1]
@@ -0,0 +1,57 @@
+import os
+import numpy as np
+from player.TableCache import TableCache, fingerprint, SUFFIX
+
+TABLE = np.arange(100, dtype=np.int32).reshape(10, 10)
+
+
+def build_counter():
+    """ Returns a build function that counts its calls """
+    calls = []
+
+    def build():
+        calls.append(1)
+        return TABLE
+
+    return build, calls
+
+
+def test_table_is_built_once(tmp_path):
+    build, calls = build_counter()
+
+    table = TableCache(str(tmp_path)).load('t', 'a', build)
+    assert (table == TABLE).all() and not table.flags.writeable
+
+    cache = TableCache(str(tmp_path))
+    assert (cache.load('t', 'a', build) == TABLE).all()
+    assert len(calls) == 1
+    assert [action for _, action, _ in cache.events] == ['mapped']
+
+
+def test_stale_tables_are_rebuilt(tmp_path):
+    build, calls = build_counter()
+    TableCache(str(tmp_path)).load('t', 'a', build)
+
+    # other parameters
+    cache = TableCache(str(tmp_path))
+    cache.load('t', 'b', build)
+
+    # a flipped byte of the data
+    path = os.path.join(str(tmp_path), 't' + SUFFIX)
+    with open(path, 'r+b') as file:
+        file.seek(-1, os.SEEK_END)
+        file.write(b'\xff')
+    assert (cache.load('t', 'b', build) == TABLE).all()
+
+    # a truncated file
+    with open(path, 'r+b') as file:
+        file.truncate(20)
+    cache.load('t', 'b', build)
+
+    assert [action for _, action, _ in cache.events] == ['fingerprint', 'checksum', 'corrupt']
+    assert len(calls) == 4
+
+
+def test_fingerprint():
+    assert fingerprint(1, 2) == fingerprint(1, 2)
+    assert fingerprint(1, 2) != fingerprint(2, 1)
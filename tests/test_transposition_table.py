@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from player.Game import Game
+from player.Heuristic import Heuristic
+from player.SearchState import SearchState
+from player.TranspositionTable import TranspositionTable, EXACT, LOWER, UPPER
+
+
+@pytest.fixture(scope='function')
+def game_cls():
+    g = Game()
+    g.load()
+    return g
+
+
+def test_incremental_key_matches_full_key(game_cls: Game):
+    """ Checks that updating a key move by move gives the same key as hashing the position from scratch """
+    tt = TranspositionTable(1)
+    z = tt.zobrist
+
+    boards = np.zeros((10, 10), dtype='i1')
+    state = np.array([game_cls.board_to_hash(b) for b in boards])
+    key = z.key(game_cls, state, 5)
+
+    for sub_board, cell, player in [(5, 3, 1), (3, 9, -1), (9, 5, 1)]:
+        boards[sub_board][cell] = player
+        key ^= z.move(sub_board, cell, player) ^ z.board_in_play(sub_board) ^ z.board_in_play(cell)
+
+    state = np.array([game_cls.board_to_hash(b) for b in boards])
+    assert key == z.key(game_cls, state, 5)
+    assert key == z.boards_key(boards, 5)
+
+
+def test_transposed_positions_share_a_key(game_cls: Game):
+    """ Checks that the same position reached through different move orders has the same key and table entry """
+    heuristic = Heuristic()
+    heuristic.load()
+    tt = TranspositionTable(1)
+    empty = np.array([game_cls.board_to_hash(b) for b in np.zeros((10, 10), dtype='i1')])
+
+    keys = []
+    for moves in ([2, 1, 3, 1], [3, 1, 2, 1], [2, 1, 3, 2]):
+        state = SearchState(game_cls, heuristic, empty, 1, zobrist=tt.zobrist)
+        player = 1
+        for cell in moves:
+            state.make_move(cell, player)
+            player = -player
+        keys.append(state.key)
+
+    # both orders put our pieces in cells 2 and 3 of board 1 and theirs in cell 1 of boards 2 and 3
+    assert keys[0] == keys[1] != keys[2]
+
+    tt.store(keys[0], 4, EXACT, 2.5, 6)
+    assert tt.probe(keys[1])[1:5] == (4, EXACT, 2.5, 6)
+    assert tt.probe(keys[2]) is None
+
+
+def test_store_and_probe():
+    tt = TranspositionTable(1)
+    tt.store(12345, 3, LOWER, 10.5, 7)
+
+    assert tt.probe(12345)[1:5] == (3, LOWER, 10.5, 7)
+    assert tt.probe(54321) is None
+    assert tt.hits == 1 and tt.probes == 2
+
+
+def test_depth_preferred_replacement():
+    """ Checks that a shallower entry does not evict a deeper one from the same search """
+    tt = TranspositionTable(1)
+    buckets = tt._buckets
+
+    tt.store(1, 5, EXACT, 1.0, 1)
+    tt.store(1 + buckets, 2, UPPER, 2.0, 2)
+
+    assert tt.probe(1)[1] == 5
+    assert tt.probe(1 + buckets)[1] == 2
+
+    # an entry from a newer search takes the depth-preferred slot and the old one is demoted
+    tt.new_search()
+    tt.store(1 + 2 * buckets, 1, EXACT, 3.0, 3)
+    assert tt.probe(1 + 2 * buckets) is not None
+    assert tt.probe(1) is not None
+    assert tt.probe(1 + buckets) is None